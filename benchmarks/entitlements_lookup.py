@@ -0,0 +1,124 @@
+"""
+Compiled entitlements benchmark
+
+For a sample of (view scope, identity) pairs found in policies_filters, runs
+the protected-view read
+    SELECT COUNT(*) FROM <base table> WHERE <RLS predicate>
+with the legacy predicate (CAST subquery on policies_filters) and with the
+compiled one (UNNEST of rls_entitlements), identity bound in place of
+SESSION_USER(), uncached. Reports bytes processed and latency for each.
+
+Runs against the real project in config.PROJECT_ID. --compile rebuilds
+rls_entitlements first (needed the first time).
+
+Usage:
+    python benchmarks/entitlements_lookup.py --compile
+    python benchmarks/entitlements_lookup.py --limit 20 --repeat 5 --json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud import bigquery
+
+from config import Config
+from services.entitlements_service import FIELD_TYPES, build_rls_filter, get_entitlements_service
+
+
+def samples(service, limit):
+    query = f"""
+    SELECT rls_type, ANY_VALUE(policy_name) AS policy_name, dataset_id, table_id, field_id,
+           IF(rls_type = 'group', rls_group, username) AS identity
+    FROM `{Config.FILTER_TABLE}`
+    WHERE project_id = @project_id
+      AND IF(rls_type = 'group', rls_group, username) IS NOT NULL
+    GROUP BY rls_type, dataset_id, table_id, field_id, identity
+    LIMIT @limit
+    """
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter("project_id", "STRING", service.project_id),
+        bigquery.ScalarQueryParameter("limit", "INT64", limit),
+    ])
+    return [dict(row) for row in service.client.query(query, job_config=job_config).result()]
+
+
+def run_shape(service, sample, field_type, compiled, repeat):
+    predicate = build_rls_filter(
+        sample['field_id'], field_type, sample['rls_type'], service.project_id,
+        sample['dataset_id'], sample['table_id'],
+        policy_name=sample['policy_name'], group=sample['identity'], compiled=compiled
+    ).replace("SESSION_USER()", "@identity")
+
+    query = (
+        f"SELECT COUNT(*) FROM `{service.project_id}.{sample['dataset_id']}.{sample['table_id']}`\n"
+        f"WHERE {predicate}"
+    )
+    job_config = bigquery.QueryJobConfig(
+        use_query_cache=False,
+        query_parameters=[bigquery.ScalarQueryParameter("identity", "STRING", sample['identity'])]
+    )
+
+    latencies = []
+    processed = billed = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        job = service.client.query(query, job_config=job_config)
+        job.result()
+        latencies.append((time.perf_counter() - started) * 1000)
+        processed, billed = job.total_bytes_processed, job.total_bytes_billed
+
+    return {
+        'processed_bytes': processed,
+        'billed_bytes': billed,
+        'p50_ms': round(statistics.median(latencies), 1),
+        'max_ms': round(max(latencies), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--compile', action='store_true', help='rebuild rls_entitlements first')
+    parser.add_argument('--limit', type=int, default=10, help='max (scope, identity) samples')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per shape')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    service = get_entitlements_service(Config.PROJECT_ID)
+    if args.compile:
+        print(f"compiled {service.rebuild_all()} entitlement row(s)", file=sys.stderr)
+
+    results = []
+    for sample in samples(service, args.limit):
+        field_type = service.get_field_type(sample['dataset_id'], sample['table_id'], sample['field_id'])
+        if not field_type or field_type.upper() not in FIELD_TYPES:
+            continue
+        results.append({
+            'scope': f"{sample['dataset_id']}.{sample['table_id']}.{sample['field_id']}",
+            'rls_type': sample['rls_type'],
+            'identity': sample['identity'],
+            'legacy': run_shape(service, sample, field_type, False, args.repeat),
+            'compiled': run_shape(service, sample, field_type, True, args.repeat),
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'scope':<45}{'legacy MB':>11}{'compiled MB':>13}{'legacy p50':>12}{'compiled p50':>14}")
+    print('-' * 95)
+    for r in results:
+        print(f"{r['scope'][:44]:<45}"
+              f"{r['legacy']['processed_bytes'] / 1024 / 1024:>11.3f}"
+              f"{r['compiled']['processed_bytes'] / 1024 / 1024:>13.3f}"
+              f"{r['legacy']['p50_ms']:>10.1f}ms"
+              f"{r['compiled']['p50_ms']:>12.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+policies_filters layout report
+
+Measures, per RLS view (one sample identity per policy), the bytes processed
+by the filter subquery the generated views run on every read. With
+--migrate, rewrites the table clustered by (dataset_id, table_id, username,
+rls_group) and reports the same lookups before and after.
+
+Runs against the real project in config.PROJECT_ID (uncached queries; each
+lookup is billed at least the 10 MB minimum).
+
+Usage:
+    python benchmarks/filter_table_layout.py              # current layout only
+    python benchmarks/filter_table_layout.py --migrate    # migrate + before/after
+    python benchmarks/filter_table_layout.py --json --limit 50
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.filter_table_layout_service import FilterTableLayoutService
+
+
+def mb(value):
+    return f"{(value or 0) / 1024 / 1024:10.3f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--migrate', action='store_true', help='migrate to the clustered layout')
+    parser.add_argument('--limit', type=int, default=20, help='max policies to sample')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    service = FilterTableLayoutService(Config.PROJECT_ID)
+
+    if args.migrate:
+        report = service.migrate_with_report(args.limit)
+    else:
+        report = {'layout': service.get_layout(), 'views': service.measure_lookups(args.limit)}
+
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+        return
+
+    if args.migrate:
+        print(f"layout before: {report['layout_before']['clustering_fields'] or 'not clustered'}")
+        print(f"layout after:  {report['layout_after']['clustering_fields']}")
+        print(f"{'policy':<40}{'MB before':>12}{'MB after':>12}")
+        print('-' * 64)
+        for view in report['views']:
+            print(f"{view['policy_name']:<40}{mb(view['processed_bytes_before']):>12}{mb(view['processed_bytes_after']):>12}")
+    else:
+        layout = report['layout']
+        print(f"layout: {layout['clustering_fields'] or 'not clustered'} "
+              f"({layout['num_rows']} rows, {mb(layout['num_bytes']).strip()} MB)")
+        print(f"{'policy':<40}{'MB estimated':>14}{'MB processed':>14}{'MB billed':>12}")
+        print('-' * 80)
+        for view in report['views']:
+            print(f"{view['policy_name']:<40}{mb(view['estimated_bytes']):>14}"
+                  f"{mb(view['processed_bytes']):>14}{mb(view['billed_bytes']):>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Login latency benchmark (/callback critical path)
+
+Compares the legacy callback flow (SELECT authorized_users, UPDATE last_login
+and INSERT audit, each waiting on a query job) with the fast path in
+services/authorized_users_service.py (cached lookup + queued last_login).
+
+Runs against a fake BigQuery backend that sleeps a configurable latency per
+query job, so no credentials or network are needed.
+
+Usage:
+    python benchmarks/login_latency.py --logins 500 --users 50 --latency-ms 300
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.authorized_users_service import AuthorizedUsersService
+
+
+class FakeQueryJob:
+    def __init__(self, rows, latency):
+        self.rows = rows
+        self.latency = latency
+
+    def result(self):
+        time.sleep(self.latency)
+        return iter(self.rows)
+
+
+class FakeBigQueryClient:
+    """Minimal stand-in for bigquery.Client.query() with per-job latency"""
+
+    def __init__(self, users, latency_ms, jitter_ms):
+        self.users = users
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.jobs = 0
+
+    def _latency(self):
+        return max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+    def query(self, sql, job_config=None):
+        self.jobs += 1
+        rows = []
+        if sql.lstrip().upper().startswith('SELECT'):
+            if job_config is not None and job_config.query_parameters:
+                email = job_config.query_parameters[0].value
+                rows = [u for u in self.users if u['email'] == email]
+            else:
+                rows = list(self.users)
+        return FakeQueryJob(rows, self._latency())
+
+
+def make_users(count):
+    return [
+        {
+            'user_id': f'u{i}',
+            'email': f'user{i}@sysmanager.com.br',
+            'name': f'User {i}',
+            'role': 'VIEWER',
+            'department': None,
+            'company': None,
+            'is_active': True
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_login(client, email):
+    """SELECT + UPDATE last_login + INSERT audit, each waited on"""
+    results = list(client.query(
+        "SELECT user_id, name, role, department, company, is_active FROM authorized_users WHERE email = @email",
+        job_config=_email_param(email)
+    ).result())
+    if not results:
+        return None
+    client.query("UPDATE authorized_users SET last_login = CURRENT_TIMESTAMP() WHERE email = @email").result()
+    client.query("INSERT INTO audit_logs (...) VALUES (...)").result()
+    return results[0]
+
+
+def fast_login(service, email):
+    """Cached lookup; last_login only queued"""
+    user = service.get_user(email)
+    if not user or not user.get('is_active'):
+        return None
+    service.record_login(email)
+    return user
+
+
+def _email_param(email):
+    from google.cloud import bigquery
+    return bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ScalarQueryParameter("email", "STRING", email)]
+    )
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name, samples, jobs):
+    print(f"{name:<8} n={len(samples):<5} "
+          f"p50={percentile(samples, 50):8.2f} ms  "
+          f"p99={percentile(samples, 99):8.2f} ms  "
+          f"mean={statistics.mean(samples):8.2f} ms  "
+          f"query jobs={jobs}")
+
+
+def run(logins, user_count, latency_ms, jitter_ms, ttl_seconds):
+    users = make_users(user_count)
+    emails = [random.choice(users)['email'] for _ in range(logins)]
+
+    # Legacy: one fresh client per login, three sequential jobs
+    legacy_samples = []
+    legacy_jobs = 0
+    for email in emails:
+        started = time.perf_counter()
+        client = FakeBigQueryClient(users, latency_ms, jitter_ms)
+        legacy_login(client, email)
+        legacy_samples.append((time.perf_counter() - started) * 1000)
+        legacy_jobs += client.jobs
+
+    # Fast path: shared client + cache, last_login merged in background
+    client = FakeBigQueryClient(users, latency_ms, jitter_ms)
+    service = AuthorizedUsersService('benchmark', client=client,
+                                     ttl_seconds=ttl_seconds, flush_interval=3600)
+    fast_samples = []
+    for email in emails:
+        started = time.perf_counter()
+        fast_login(service, email)
+        fast_samples.append((time.perf_counter() - started) * 1000)
+    service.flush_last_logins()
+
+    print(f"fake backend latency: {latency_ms} ms (+/- {jitter_ms} ms) per query job")
+    report('legacy', legacy_samples, legacy_jobs)
+    report('fast', fast_samples, client.jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--ttl-seconds', type=int, default=60)
+    args = parser.parse_args()
+
+    run(args.logins, args.users, args.latency_ms, args.jitter_ms, args.ttl_seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+RLS snapshot export throughput benchmark
+
+Streams a synthetic policies_filters table through
+services/rls_snapshot_service.py (the same write path used for real exports)
+and compares it with materializing the whole result before writing.
+
+The fake client yields Arrow record batches page by page, like
+RowIterator.to_arrow_iterable(), so no credentials or network are needed.
+Reports rows/s, output size and peak Arrow memory for each mode.
+
+Usage:
+    python benchmarks/snapshot_export.py --rows 1000000 --page-size 10000
+    python benchmarks/snapshot_export.py --format arrow --compression lz4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.rls_snapshot_service import RLSSnapshotService
+
+try:
+    import pyarrow as pa
+except ImportError:
+    print("This benchmark requires pyarrow (pip install pyarrow)")
+    sys.exit(1)
+
+
+class FakeRowIterator:
+    def __init__(self, rows, page_size, peak):
+        self.rows = rows
+        self.page_size = page_size
+        self.peak = peak
+
+    def to_arrow_iterable(self, bqstorage_client=None):
+        for start in range(0, self.rows, self.page_size):
+            count = min(self.page_size, self.rows - start)
+            ids = range(start, start + count)
+            batch = pa.RecordBatch.from_pydict({
+                'rls_type': ['users' if i % 4 else 'group' for i in ids],
+                'policy_name': [f'view_{i % 50}' for i in ids],
+                'project_id': ['benchmark-project'] * count,
+                'dataset_id': [f'dataset_{i % 5}' for i in ids],
+                'table_id': [f'table_{i % 50}' for i in ids],
+                'field_id': ['region'] * count,
+                'filter_value': [f'value_{i % 200}' for i in ids],
+                'username': [f'user{i % 20000}@sysmanager.com.br' if i % 4 else None for i in ids],
+                'rls_group': [None if i % 4 else f'group{i % 100}@sysmanager.com.br' for i in ids],
+                'created_at': pa.array([1700000000000000 + i for i in ids], pa.timestamp('us', tz='UTC')),
+            })
+            self.peak[0] = max(self.peak[0], pa.total_allocated_bytes())
+            yield batch
+
+
+class FakeBigQueryClient:
+    """get_table + list_rows(page_size=...) over a synthetic table"""
+
+    def __init__(self, rows, peak):
+        self.rows = rows
+        self.peak = peak
+
+    def get_table(self, table_id):
+        return table_id
+
+    def list_rows(self, table, page_size=None):
+        return FakeRowIterator(self.rows, page_size, self.peak)
+
+
+def run_streaming(rows, page_size, fmt, compression, path):
+    peak = [0]
+    service = RLSSnapshotService('benchmark', client=FakeBigQueryClient(rows, peak), page_size=page_size)
+    service._bqstorage_client = lambda: None
+
+    started = time.perf_counter()
+    written = service.export_table('benchmark.rls_manager.policies_filters', path, fmt, compression)
+    return written, time.perf_counter() - started, peak[0]
+
+
+def run_materialized(rows, page_size, fmt, compression, path):
+    """Baseline: collect every page into one table, then write it"""
+    peak = [0]
+    client = FakeBigQueryClient(rows, peak)
+
+    started = time.perf_counter()
+    table = pa.Table.from_batches(list(client.list_rows(None, page_size).to_arrow_iterable()))
+    peak[0] = max(peak[0], pa.total_allocated_bytes())
+    written = RLSSnapshotService.write_batches(table.to_batches(), path, fmt, compression)
+    elapsed = time.perf_counter() - started
+    del table
+    return written, elapsed, peak[0]
+
+
+def report(name, rows, elapsed, peak, path):
+    size = os.path.getsize(path)
+    print(f"{name:<13} rows={rows:<10,} "
+          f"time={elapsed:7.2f} s  "
+          f"throughput={rows / elapsed:12,.0f} rows/s  "
+          f"file={size / 1024 / 1024:8.2f} MB  "
+          f"peak arrow mem={peak / 1024 / 1024:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--page-size', type=int, default=10000)
+    parser.add_argument('--format', choices=['parquet', 'arrow'], default='parquet')
+    parser.add_argument('--compression', default='zstd')
+    parser.add_argument('--skip-materialized', action='store_true',
+                        help='only run the streaming export')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'policies_filters.' + args.format)
+
+        print(f"{args.rows:,} rows, page size {args.page_size:,}, {args.format}/{args.compression}")
+        rows, elapsed, peak = run_streaming(args.rows, args.page_size, args.format, args.compression, path)
+        report('streaming', rows, elapsed, peak, path)
+
+        if not args.skip_materialized:
+            os.remove(path)
+            rows, elapsed, peak = run_materialized(args.rows, args.page_size, args.format, args.compression, path)
+            report('materialized', rows, elapsed, peak, path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Startup import-time benchmark
+
+Measures, in a fresh interpreter per module, the cumulative import time
+(python -X importtime) of the modules main.py loads at startup and of every
+page module in allpages.PAGE_MANIFEST, which should now load only on first
+request. Also reports whether the startup set pulls in the Google Cloud SDKs.
+
+Usage:
+    python benchmarks/startup_imports.py
+    python benchmarks/startup_imports.py --json > startup.json
+    python benchmarks/startup_imports.py --budget-ms 1500   # exit 1 if over
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Modules imported while main.py starts (before ui.run)
+STARTUP_MODULES = [
+    'config',
+    'translations',
+    'theme',
+    'home',
+    'allpages',
+    'pages.login_page',
+    'services.audit_service',
+    'services.authorized_users_service',
+]
+
+HEAVY_SDKS = [
+    'google.cloud.bigquery',
+    'google.cloud.datacatalog_v1',
+    'google.cloud.resourcemanager_v3',
+]
+
+_LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\s*)(\S+)')
+
+
+def page_modules():
+    """Page modules from the allpages manifest (parsed, not imported)"""
+    with open(os.path.join(ROOT, 'allpages.py'), encoding='utf-8') as f:
+        source = f.read()
+    return sorted(set(re.findall(r"'(pages\.\w+)'", source)))
+
+
+def measure(statement):
+    """
+    Run `statement` with -X importtime
+
+    Returns:
+        ({module: cumulative_us}, total_us of top-level imports, error)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    cumulative = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2))
+            if not match.group(3):
+                total += int(match.group(2))
+    error = None
+    if result.returncode != 0:
+        error = (result.stderr.strip().splitlines() or ['failed'])[-1]
+    return cumulative, total, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='fail (exit 1) if the startup set takes longer than this')
+    args = parser.parse_args()
+
+    report = {'startup': {}, 'pages': {}, 'startup_total_ms': 0.0, 'heavy_sdks_at_startup': []}
+
+    # Per-module, each in its own interpreter
+    for module in STARTUP_MODULES:
+        times, _, error = measure(f'import {module}')
+        report['startup'][module] = {'ms': round(times.get(module, 0) / 1000, 1), 'error': error}
+
+    for module in page_modules():
+        times, _, error = measure(f'import {module}')
+        report['pages'][module] = {'ms': round(times.get(module, 0) / 1000, 1), 'error': error}
+
+    # Whole startup set in one interpreter (shared deps counted once)
+    statement = '; '.join(f'import {m}' for m in STARTUP_MODULES)
+    times, total, _ = measure(statement)
+    report['startup_total_ms'] = round(total / 1000, 1)
+    report['heavy_sdks_at_startup'] = [sdk for sdk in HEAVY_SDKS if sdk in times]
+
+    # Translation check that used to run at import
+    try:
+        from translations import validate_translations
+        report['missing_translations'] = validate_translations()
+    except Exception as e:
+        report['missing_translations'] = str(e)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'module':<45}{'import ms':>12}")
+        print('-' * 57)
+        print('startup:')
+        for module, data in report['startup'].items():
+            print(f"  {module:<43}{data['ms']:>12.1f}" + (f"  ERROR: {data['error']}" if data['error'] else ''))
+        print('pages (lazy, first request):')
+        for module, data in report['pages'].items():
+            print(f"  {module:<43}{data['ms']:>12.1f}" + (f"  ERROR: {data['error']}" if data['error'] else ''))
+        print('-' * 57)
+        print(f"{'startup total':<45}{report['startup_total_ms']:>12.1f}")
+        print(f"heavy SDKs at startup: {', '.join(report['heavy_sdks_at_startup']) or 'none'}")
+        print(f"missing translations: {report['missing_translations'] or 'none'}")
+
+    if args.budget_ms is not None and report['startup_total_ms'] > args.budget_ms:
+        print(f"Startup import time {report['startup_total_ms']} ms exceeds budget {args.budget_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Taxonomy bulk import/export RPC count
+
+Creates a taxonomy with N policy tags (a two-level tree) twice against an
+in-memory stand-in for the Data Catalog policy tag APIs, counting RPCs:
+    - tag by tag: DataCatalogService.create_taxonomy + create_policy_tag
+    - bulk: TaxonomyTransferService.import_taxonomies (inline source)
+then exports it and re-applies the export (no-op) and a changed copy
+(ReplaceTaxonomy). The bulk RPC count stays constant as N grows.
+
+No credentials or network needed.
+
+Usage:
+    python benchmarks/taxonomy_transfer.py --tags 10 100 1000
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud import datacatalog_v1
+
+from services.datacatalog_service import DataCatalogService
+from services.taxonomy_transfer_service import TaxonomyTransferService
+
+PARENT_PROJECT = 'benchmark-project'
+LOCATION = 'us-central1'
+
+
+class StandInCatalog:
+    """PolicyTagManager + PolicyTagManagerSerialization over one in-memory store"""
+
+    def __init__(self):
+        self.rpcs = Counter()
+        self.taxonomies = {}  # name -> Taxonomy
+        self.tags = {}        # taxonomy name -> [PolicyTag]
+        self._ids = 0
+
+    def _next_id(self):
+        self._ids += 1
+        return self._ids
+
+    # PolicyTagManager
+    def list_taxonomies(self, request):
+        self.rpcs['ListTaxonomies'] += 1
+        return [t for t in self.taxonomies.values() if t.name.startswith(request.parent + '/')]
+
+    def create_taxonomy(self, request):
+        self.rpcs['CreateTaxonomy'] += 1
+        taxonomy = datacatalog_v1.Taxonomy(request.taxonomy)
+        taxonomy.name = f"{request.parent}/taxonomies/{self._next_id()}"
+        self.taxonomies[taxonomy.name] = taxonomy
+        self.tags[taxonomy.name] = []
+        return taxonomy
+
+    def create_policy_tag(self, request):
+        self.rpcs['CreatePolicyTag'] += 1
+        tag = datacatalog_v1.PolicyTag(request.policy_tag)
+        tag.name = f"{request.parent}/policyTags/{self._next_id()}"
+        self.tags[request.parent].append(tag)
+        return tag
+
+    def list_policy_tags(self, request):
+        self.rpcs['ListPolicyTags'] += 1
+        return list(self.tags.get(request.parent, []))
+
+    # PolicyTagManagerSerialization
+    def _store_tree(self, taxonomy_name, serialized_tags, parent_tag=''):
+        for serialized in serialized_tags:
+            tag = datacatalog_v1.PolicyTag(
+                name=f"{taxonomy_name}/policyTags/{self._next_id()}",
+                display_name=serialized.display_name,
+                description=serialized.description,
+                parent_policy_tag=parent_tag
+            )
+            self.tags[taxonomy_name].append(tag)
+            self._store_tree(taxonomy_name, serialized.child_policy_tags, tag.name)
+
+    def import_taxonomies(self, request):
+        self.rpcs['ImportTaxonomies'] += 1
+        created = []
+        for serialized in request.inline_source.taxonomies:
+            taxonomy = datacatalog_v1.Taxonomy(
+                name=f"{request.parent}/taxonomies/{self._next_id()}",
+                display_name=serialized.display_name,
+                description=serialized.description,
+                activated_policy_types=serialized.activated_policy_types
+            )
+            self.taxonomies[taxonomy.name] = taxonomy
+            self.tags[taxonomy.name] = []
+            self._store_tree(taxonomy.name, serialized.policy_tags)
+            created.append(taxonomy)
+        return datacatalog_v1.ImportTaxonomiesResponse(taxonomies=created)
+
+    def replace_taxonomy(self, request):
+        self.rpcs['ReplaceTaxonomy'] += 1
+        self.tags[request.name] = []
+        self._store_tree(request.name, request.serialized_taxonomy.policy_tags)
+        return self.taxonomies[request.name]
+
+    def _serialize_tags(self, taxonomy_name, parent_tag=''):
+        return [
+            datacatalog_v1.SerializedPolicyTag(
+                policy_tag=tag.name,
+                display_name=tag.display_name,
+                description=tag.description,
+                child_policy_tags=self._serialize_tags(taxonomy_name, tag.name)
+            )
+            for tag in self.tags[taxonomy_name] if tag.parent_policy_tag == parent_tag
+        ]
+
+    def export_taxonomies(self, request):
+        self.rpcs['ExportTaxonomies'] += 1
+        return datacatalog_v1.ExportTaxonomiesResponse(taxonomies=[
+            datacatalog_v1.SerializedTaxonomy(
+                display_name=self.taxonomies[name].display_name,
+                description=self.taxonomies[name].description,
+                activated_policy_types=self.taxonomies[name].activated_policy_types,
+                policy_tags=self._serialize_tags(name)
+            )
+            for name in request.taxonomies
+        ])
+
+
+def build_document(n_tags, fanout=10):
+    """One taxonomy: n_tags tags as n_tags/fanout parents with up to fanout-1 children each"""
+    tags = []
+    remaining = n_tags
+    while remaining > 0:
+        children = min(fanout - 1, remaining - 1)
+        tags.append({
+            'display_name': f"group_{len(tags):04d}",
+            'description': 'benchmark',
+            'child_policy_tags': [
+                {'display_name': f"tag_{len(tags):04d}_{i:02d}", 'description': '', 'child_policy_tags': []}
+                for i in range(children)
+            ]
+        })
+        remaining -= children + 1
+    return {'taxonomies': [{
+        'display_name': 'Benchmark PII',
+        'description': 'benchmark taxonomy',
+        'activated_policy_types': ['FINE_GRAINED_ACCESS_CONTROL'],
+        'policy_tags': tags
+    }]}
+
+
+def tag_by_tag(catalog, document):
+    # Instância sem client real: o stand-in faz o papel do PolicyTagManagerClient
+    service = DataCatalogService.__new__(DataCatalogService)
+    service.project_id, service.location, service.client = PARENT_PROJECT, LOCATION, catalog
+    service.parent = f"projects/{PARENT_PROJECT}/locations/{LOCATION}"
+
+    taxonomy = document['taxonomies'][0]
+    taxonomy_name = service.create_taxonomy(taxonomy['display_name'], taxonomy['description'])
+    for tag in taxonomy['policy_tags']:
+        parent = service.create_policy_tag(taxonomy_name, tag['display_name'], tag['description'])
+        for child in tag['child_policy_tags']:
+            service.create_policy_tag(taxonomy_name, child['display_name'], child['description'], parent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tags', type=int, nargs='+', default=[10, 100, 1000], help='policy tags per taxonomy')
+    args = parser.parse_args()
+
+    print(f"{'tags':>6}{'tag by tag':>12}{'import':>9}{'export':>9}{'re-apply':>10}{'replace':>9}")
+    print('-' * 55)
+    for n_tags in args.tags:
+        document = build_document(n_tags)
+
+        legacy = StandInCatalog()
+        tag_by_tag(legacy, document)
+
+        catalog = StandInCatalog()
+        transfer = TaxonomyTransferService(PARENT_PROJECT, LOCATION, client=catalog, serialization_client=catalog)
+
+        transfer.import_taxonomies(document)
+        imported = sum(catalog.rpcs.values())
+
+        catalog.rpcs.clear()
+        exported = transfer.export_taxonomies()
+        export_rpcs = sum(catalog.rpcs.values())
+        assert transfer.count_tags(exported['taxonomies'][0]) == n_tags
+
+        catalog.rpcs.clear()
+        result = transfer.import_taxonomies(exported)
+        assert result['unchanged'] == ['Benchmark PII']
+        reapply_rpcs = sum(catalog.rpcs.values())
+
+        exported['taxonomies'][0]['policy_tags'][0]['description'] = 'changed'
+        catalog.rpcs.clear()
+        result = transfer.import_taxonomies(exported, replace=True)
+        assert len(result['replaced']) == 1
+        replace_rpcs = sum(catalog.rpcs.values())
+
+        print(f"{n_tags:>6}{sum(legacy.rpcs.values()):>12}{imported:>9}{export_rpcs:>9}"
+              f"{reapply_rpcs:>10}{replace_rpcs:>9}")
+
+
+if __name__ == '__main__':
+    main()
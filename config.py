@@ -45,3 +45,82 @@ class Config:
     VIEW_TYPE_RLS = 'RLS_VIEW'  # View com RLS aplicado
     VIEW_TYPE_CLS = 'CLS_VIEW'  # View com CLS/masking
     VIEW_TYPE_HYBRID = 'HYBRID_VIEW'  # View com RLS + CLS
+    
+    # ==================== Metadata Cache ====================
+    # Cache compartilhado de datasets/tabelas/schemas (services/metadata_cache_service.py)
+    METADATA_CACHE_TTL_SECONDS = int(os.getenv('METADATA_CACHE_TTL_SECONDS', '300'))
+    METADATA_CACHE_MAX_ENTRIES = int(os.getenv('METADATA_CACHE_MAX_ENTRIES', '2048'))
+    
+    # ==================== Audit Writer ====================
+    # Escrita de auditoria em lote (services/audit_service.py - AuditWriter)
+    AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '100'))
+    AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv('AUDIT_FLUSH_INTERVAL_SECONDS', '2'))
+    AUDIT_MAX_RETRIES = int(os.getenv('AUDIT_MAX_RETRIES', '5'))
+    AUDIT_SPILL_FILE = os.getenv('AUDIT_SPILL_FILE', '/tmp/audit_spill.jsonl')
+    
+    # ==================== Login Fast Path ====================
+    # Cache de authorized_users e MERGE em lote de last_login
+    # (services/authorized_users_service.py)
+    AUTHORIZED_USERS_CACHE_TTL_SECONDS = int(os.getenv('AUTHORIZED_USERS_CACHE_TTL_SECONDS', '60'))
+    LAST_LOGIN_FLUSH_INTERVAL_SECONDS = float(os.getenv('LAST_LOGIN_FLUSH_INTERVAL_SECONDS', '30'))
+    
+    # ==================== Client Registry ====================
+    # Pool HTTP compartilhado pelos clients BigQuery (services/client_registry.py)
+    # 0 = tamanho do pool do run.io_bound (min(32, cpu_count + 4))
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '0'))
+    
+    # ==================== RLS Snapshots ====================
+    # Export/restore de policies e policies_filters (services/rls_snapshot_service.py)
+    SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', '/tmp/rls_snapshots')
+    SNAPSHOT_PAGE_SIZE = int(os.getenv('SNAPSHOT_PAGE_SIZE', '10000'))
+    
+    # ==================== Filter Table Layout ====================
+    # Clustering de policies_filters (services/filter_table_layout_service.py)
+    # true = migra a tabela no startup se não estiver clusterizada
+    FILTER_TABLE_AUTO_CLUSTER = os.getenv('FILTER_TABLE_AUTO_CLUSTER', 'false').lower() == 'true'
+    
+    # ==================== Compiled Entitlements ====================
+    # Tabela derivada com os valores permitidos por (view, identidade), já
+    # convertidos para o tipo do campo (services/entitlements_service.py)
+    # true = views RLS novas leem rls_entitlements em vez de policies_filters
+    ENTITLEMENTS_TABLE = f'{PROJECT_ID}.{RLS_MANAGER_DATASET}.rls_entitlements'
+    RLS_COMPILED_ENTITLEMENTS = os.getenv('RLS_COMPILED_ENTITLEMENTS', 'false').lower() == 'true'
+    # Tentativas de recompilar ao revogar acesso antes de reportar falha
+    ENTITLEMENTS_REVOKE_MAX_RETRIES = int(os.getenv('ENTITLEMENTS_REVOKE_MAX_RETRIES', '3'))
+    
+    # ==================== CLS Materialized Snapshots ====================
+    # Views CLS em modo "materialized" (services/cls_materialization_service.py)
+    CLS_MATERIALIZED_REGISTRY = f'{PROJECT_ID}.{RLS_MANAGER_DATASET}.cls_materialized_views'
+    CLS_SNAPSHOT_CHECK_SECONDS = float(os.getenv('CLS_SNAPSHOT_CHECK_SECONDS', '300'))
+    CLS_SNAPSHOT_DEFAULT_REFRESH_MINUTES = int(os.getenv('CLS_SNAPSHOT_DEFAULT_REFRESH_MINUTES', '60'))
+    # true = inicia o refresher no startup (senão só quando houver views materializadas em uso)
+    CLS_SNAPSHOT_REFRESHER_ON_STARTUP = os.getenv('CLS_SNAPSHOT_REFRESHER_ON_STARTUP', 'false').lower() == 'true'
+    
+    # ==================== Dataset Inventory ====================
+    # get_dataset / contagem de tabelas em paralelo (services/dataset_inventory_service.py)
+    INVENTORY_MAX_WORKERS = int(os.getenv('INVENTORY_MAX_WORKERS', '16'))
+    INVENTORY_CALL_TIMEOUT_SECONDS = float(os.getenv('INVENTORY_CALL_TIMEOUT_SECONDS', '30'))
+    
+    # ==================== Policy Tag Coverage ====================
+    # Índice em memória de colunas x policy tags (services/policy_tag_coverage_service.py)
+    COVERAGE_INDEX_MAX_AGE_SECONDS = int(os.getenv('COVERAGE_INDEX_MAX_AGE_SECONDS', '300'))
+    
+    # ==================== Policy Tag Batch Apply ====================
+    # BigQueryCLSService.apply_tags: um update_table por tabela, tabelas em paralelo
+    POLICY_TAG_APPLY_MAX_WORKERS = int(os.getenv('POLICY_TAG_APPLY_MAX_WORKERS', '8'))
+    POLICY_TAG_APPLY_MAX_RETRIES = int(os.getenv('POLICY_TAG_APPLY_MAX_RETRIES', '5'))
+    
+    # ==================== Taxonomy Snapshot ====================
+    # Cache de taxonomias + árvore de policy tags (services/datacatalog_service.py)
+    TAXONOMY_SNAPSHOT_TTL_SECONDS = int(os.getenv('TAXONOMY_SNAPSHOT_TTL_SECONDS', '300'))
+    TAXONOMY_SNAPSHOT_MAX_WORKERS = int(os.getenv('TAXONOMY_SNAPSHOT_MAX_WORKERS', '8'))
+    
+    # ==================== Policy Tag IAM ====================
+    # Grants/revokes em lote nas policy tags (DataCatalogService.apply_tag_iam_edits)
+    TAG_IAM_MAX_WORKERS = int(os.getenv('TAG_IAM_MAX_WORKERS', '10'))
+    TAG_IAM_MAX_RETRIES = int(os.getenv('TAG_IAM_MAX_RETRIES', '5'))
+    
+    # ==================== Authorized View Registrar ====================
+    # Access entries agrupados por dataset (services/authorized_view_registrar.py)
+    AUTHORIZED_VIEW_COALESCE_SECONDS = float(os.getenv('AUTHORIZED_VIEW_COALESCE_SECONDS', '0.2'))
+    AUTHORIZED_VIEW_MAX_RETRIES = int(os.getenv('AUTHORIZED_VIEW_MAX_RETRIES', '5'))
@@ -249,11 +249,14 @@ except Exception as e:
 # All Pages
 # ========================================
 
-# Tentar criar outras páginas (não crítico)
+# Rotas registradas a partir do manifesto; cada módulo de página só é
+# importado no primeiro acesso à rota (não crítico)
+pages_registered = False
 try:
     import allpages
     allpages.create()
-    print("✓ All pages created successfully")
+    pages_registered = True
+    print("✓ All pages registered successfully (lazy)")
 except Exception as e:
     print(f"✗ Warning: Could not load all pages: {e}")
     # Não é crítico, podemos continuar
@@ -262,19 +265,18 @@ except Exception as e:
 # Dataset IAM Manager (Fallback)
 # ========================================
 
-try:
-    from pages.dataset_iam_manager import DatasetIAMManager
-    
+# Só registra se o manifesto falhou (a rota já existe em allpages, com
+# requires_auth)
+if not pages_registered:
     @ui.page('/datasetiammanager/')
     def dataset_iam_manager_page():
         if not app.storage.user.get('authenticated', False):
             ui.run_javascript('window.location.href = "/login"')
             return
-        DatasetIAMManager()
+        from pages.dataset_iam_manager import DatasetIAMManager
+        DatasetIAMManager().run()
     
-    print("✓ Dataset IAM Manager route registered successfully")
-except Exception as e:
-    print(f"✗ Warning: Could not register Dataset IAM Manager: {e}")
+    print("✓ Dataset IAM Manager fallback route registered")
 
 # ========================================
 # Home Page
@@ -309,6 +311,77 @@ def health():
     # Show current language  # <- NOVO
     current_lang = app.storage.user.get('language', 'not set')
     ui.label(f'Current language: {current_lang}')
+    
+    # Validação de traduções (fora do import para não pesar no cold start)
+    from translations import warn_missing_translations
+    missing = warn_missing_translations()
+    ui.label('Translations: ' + ('✓ Complete' if not missing else f'✗ Missing {sum(len(k) for k in missing.values())} key(s)'))
+
+# ========================================
+# Audit Writer Lifecycle
+# ========================================
+
+# Audit rows são gravados em lote por uma thread; flush no shutdown
+try:
+    from services.audit_service import get_audit_writer, shutdown_audit_writers
+    app.on_startup(lambda: get_audit_writer().start())
+    app.on_shutdown(shutdown_audit_writers)
+    print("✓ Audit writer lifecycle hooks registered")
+except Exception as e:
+    print(f"✗ Warning: Could not register audit writer hooks: {e}")
+
+# ========================================
+# Login Fast Path
+# ========================================
+
+# last_login é gravado em lote por uma thread; flush no shutdown
+# (import adiado para não carregar o SDK do BigQuery no cold start)
+def stop_last_login_writers():
+    from services.authorized_users_service import shutdown_authorized_users_services
+    shutdown_authorized_users_services()
+
+app.on_shutdown(stop_last_login_writers)
+
+# ========================================
+# Filter Table Layout
+# ========================================
+
+# policies_filters é lido por toda consulta às views RLS. Só com
+# FILTER_TABLE_AUTO_CLUSTER=true o startup verifica/migra o clustering (em
+# background); sem a flag o startup não faz nenhuma chamada de rede e o
+# layout é verificado com benchmarks/filter_table_layout.py
+from config import Config
+
+def check_filter_table_layout():
+    import threading
+    
+    def check():
+        from services.filter_table_layout_service import FilterTableLayoutService
+        FilterTableLayoutService(Config.PROJECT_ID).check_layout(auto_migrate=True)
+    
+    threading.Thread(target=check, name='filter-table-layout', daemon=True).start()
+
+if Config.FILTER_TABLE_AUTO_CLUSTER:
+    app.on_startup(check_filter_table_layout)
+
+# ========================================
+# CLS Materialized Snapshots
+# ========================================
+
+# Views CLS materializadas: refresh dos snapshots em thread de background.
+# O refresher inicia sob demanda (materialize / Manage page); no startup só
+# com CLS_SNAPSHOT_REFRESHER_ON_STARTUP=true
+def start_snapshot_refresher():
+    from services.cls_materialization_service import get_snapshot_refresher
+    get_snapshot_refresher(Config.PROJECT_ID).start()
+
+def stop_snapshot_refreshers():
+    from services.cls_materialization_service import shutdown_snapshot_refreshers
+    shutdown_snapshot_refreshers()
+
+if Config.CLS_SNAPSHOT_REFRESHER_ON_STARTUP:
+    app.on_startup(start_snapshot_refresher)
+app.on_shutdown(stop_snapshot_refreshers)
 
 # ========================================
 # Startup
@@ -19,7 +19,7 @@
 """
 
 from nicegui import ui
-from services.auth_service import get_current_user
+from services.auth_service import get_current_user, get_role_permissions
 from theme import get_text
 
 
@@ -34,6 +34,12 @@ def menu() -> None:
     """
     user = get_current_user()
     
+    # Todas as permissões do role em um único lookup (matriz em memória)
+    permissions = get_role_permissions(user.get('role'))
+    
+    def can_view(resource):
+        return permissions.get(resource, {}).get('can_view', False)
+    
     with ui.list():
         # ========================================
         # HOME - AZUL CIANO
@@ -49,95 +55,97 @@ def menu() -> None:
         # ========================================
         # ROW LEVEL SECURITY - VERDE
         # ========================================
-        with ui.expansion(
-            get_text('nav_rls'),
-            caption='Click to Expand',
-            icon='policy'
-        ).classes('w-full text-bold').style('font-size: 16px; color: #ffffff;'):
-            ui.query('.q-expansion-item__toggle-icon').style('color: #10b981 !important;')
+        if can_view('RLS_POLICIES'):
+            with ui.expansion(
+                get_text('nav_rls'),
+                caption='Click to Expand',
+                icon='policy'
+            ).classes('w-full text-bold').style('font-size: 16px; color: #ffffff;'):
+                ui.query('.q-expansion-item__toggle-icon').style('color: #10b981 !important;')
             
-            # 1. Create Views
-            with ui.item(on_click=lambda: ui.navigate.to('/createrlsusers/')):
-                with ui.item_section().props('avatar'):
-                    ui.icon('add_box').style('color: #10b981;')
-                with ui.item_section():
-                    ui.item_label('Create Views').classes(
-                        replace='text-bold'
-                    ).style('font-size: 14px; color: #94a3b8;')
-                    ui.item_label('5-step wizard to create RLS views').props('caption').style('font-size: 11px; color: #10b981;')
+                # 1. Create Views
+                with ui.item(on_click=lambda: ui.navigate.to('/createrlsusers/')):
+                    with ui.item_section().props('avatar'):
+                        ui.icon('add_box').style('color: #10b981;')
+                    with ui.item_section():
+                        ui.item_label('Create Views').classes(
+                            replace='text-bold'
+                        ).style('font-size: 14px; color: #94a3b8;')
+                        ui.item_label('5-step wizard to create RLS views').props('caption').style('font-size: 11px; color: #10b981;')
             
-            # 2. Assign to Policy
-            with ui.item(on_click=lambda: ui.navigate.to('/assignuserstopolicy/')):
-                with ui.item_section().props('avatar'):
-                    ui.icon('assignment_ind').style('color: #10b981;')
-                with ui.item_section():
-                    ui.item_label('Assign to Policy').classes(
-                        replace='text-bold'
-                    ).style('font-size: 14px; color: #94a3b8;')
-                    ui.item_label('Users, Groups & Service Accounts').props('caption').style('font-size: 11px; color: #10b981;')
+                # 2. Assign to Policy
+                with ui.item(on_click=lambda: ui.navigate.to('/assignuserstopolicy/')):
+                    with ui.item_section().props('avatar'):
+                        ui.icon('assignment_ind').style('color: #10b981;')
+                    with ui.item_section():
+                        ui.item_label('Assign to Policy').classes(
+                            replace='text-bold'
+                        ).style('font-size: 14px; color: #94a3b8;')
+                        ui.item_label('Users, Groups & Service Accounts').props('caption').style('font-size: 11px; color: #10b981;')
             
-            ui.separator().classes('my-2').style('background-color: #334155;')
+                ui.separator().classes('my-2').style('background-color: #334155;')
             
-            # 3. Create RLS for Groups (legacy)
-            with ui.item(on_click=lambda: ui.navigate.to('/createrlsgroups/')):
-                with ui.item_section().props('avatar'):
-                    ui.icon('groups').style('color: #10b981; opacity: 0.5;')
-                with ui.item_section():
-                    ui.item_label(get_text('menu_rls_groups')).classes(
-                        replace='text-bold'
-                    ).style('font-size: 14px; color: #64748b;')
-                    ui.item_label('Legacy - Group policies').props('caption').style('font-size: 11px; color: #64748b;')
+                # 3. Create RLS for Groups (legacy)
+                with ui.item(on_click=lambda: ui.navigate.to('/createrlsgroups/')):
+                    with ui.item_section().props('avatar'):
+                        ui.icon('groups').style('color: #10b981; opacity: 0.5;')
+                    with ui.item_section():
+                        ui.item_label(get_text('menu_rls_groups')).classes(
+                            replace='text-bold'
+                        ).style('font-size: 14px; color: #64748b;')
+                        ui.item_label('Legacy - Group policies').props('caption').style('font-size: 11px; color: #64748b;')
             
-            # 4. Assign Values to Groups (legacy)
-            with ui.item(on_click=lambda: ui.navigate.to('/assignvaluestogroup/')):
-                with ui.item_section().props('avatar'):
-                    ui.icon('assignment').style('color: #10b981; opacity: 0.5;')
-                with ui.item_section():
-                    ui.item_label(get_text('menu_rls_assign_values')).classes(
-                        replace='text-bold'
-                    ).style('font-size: 14px; color: #64748b;')
-                    ui.item_label('Legacy - Group values').props('caption').style('font-size: 11px; color: #64748b;')
+                # 4. Assign Values to Groups (legacy)
+                with ui.item(on_click=lambda: ui.navigate.to('/assignvaluestogroup/')):
+                    with ui.item_section().props('avatar'):
+                        ui.icon('assignment').style('color: #10b981; opacity: 0.5;')
+                    with ui.item_section():
+                        ui.item_label(get_text('menu_rls_assign_values')).classes(
+                            replace='text-bold'
+                        ).style('font-size: 14px; color: #64748b;')
+                        ui.item_label('Legacy - Group values').props('caption').style('font-size: 11px; color: #64748b;')
         
         # ========================================
         # COLUMN LEVEL SECURITY - AMARELO (SIMPLIFIED)
         # ========================================
-        with ui.expansion(
-            get_text('nav_cls'),
-            caption='Click to Expand',
-            icon='security'
-        ).classes('w-full text-bold').style('font-size: 16px; color: #ffffff;'):
+        if can_view('CLS_POLICIES'):
+            with ui.expansion(
+                get_text('nav_cls'),
+                caption='Click to Expand',
+                icon='security'
+            ).classes('w-full text-bold').style('font-size: 16px; color: #ffffff;'):
             
-            # 1. Create Protected View (CLS + Masking)
-            with ui.item(on_click=lambda: ui.navigate.to('/clsdynamiccolumns/')):
-                with ui.item_section().props('avatar'):
-                    ui.icon('add_circle').style('color: #f59e0b;')
-                with ui.item_section():
-                    ui.item_label(get_text('menu_cls_create_view')).classes(
-                        replace='text-bold'
-                    ).style('font-size: 14px; color: #94a3b8;')
-                    ui.item_label('CLS + Masking wizard').props('caption').style('font-size: 11px; color: #f59e0b;')
+                # 1. Create Protected View (CLS + Masking)
+                with ui.item(on_click=lambda: ui.navigate.to('/clsdynamiccolumns/')):
+                    with ui.item_section().props('avatar'):
+                        ui.icon('add_circle').style('color: #f59e0b;')
+                    with ui.item_section():
+                        ui.item_label(get_text('menu_cls_create_view')).classes(
+                            replace='text-bold'
+                        ).style('font-size: 14px; color: #94a3b8;')
+                        ui.item_label('CLS + Masking wizard').props('caption').style('font-size: 11px; color: #f59e0b;')
             
-            # 2. Manage Protected Views (RLS + CLS Integrated)
-            with ui.item(on_click=lambda: ui.navigate.to('/clsdynamicmanage/')):
-                with ui.item_section().props('avatar'):
-                    ui.icon('settings').style('color: #f59e0b;')
-                with ui.item_section():
-                    ui.item_label(get_text('menu_cls_manage_views')).classes(
-                        replace='text-bold'
-                    ).style('font-size: 14px; color: #94a3b8;')
-                    ui.item_label('RLS + CLS integrated').props('caption').style('font-size: 11px; color: #10b981;')
+                # 2. Manage Protected Views (RLS + CLS Integrated)
+                with ui.item(on_click=lambda: ui.navigate.to('/clsdynamicmanage/')):
+                    with ui.item_section().props('avatar'):
+                        ui.icon('settings').style('color: #f59e0b;')
+                    with ui.item_section():
+                        ui.item_label(get_text('menu_cls_manage_views')).classes(
+                            replace='text-bold'
+                        ).style('font-size: 14px; color: #94a3b8;')
+                        ui.item_label('RLS + CLS integrated').props('caption').style('font-size: 11px; color: #10b981;')
             
-            ui.separator().classes('my-2').style('background-color: #334155;')
+                ui.separator().classes('my-2').style('background-color: #334155;')
             
-            # 3. Schema Browser
-            with ui.item(on_click=lambda: ui.navigate.to('/clsschemabrowser/')):
-                with ui.item_section().props('avatar'):
-                    ui.icon('search').style('color: #f59e0b;')
-                with ui.item_section():
-                    ui.item_label(get_text('menu_cls_schema')).classes(
-                        replace='text-bold'
-                    ).style('font-size: 14px; color: #94a3b8;')
-                    ui.item_label('Browse BigQuery schemas').props('caption').style('font-size: 11px; color: #64748b;')
+                # 3. Schema Browser
+                with ui.item(on_click=lambda: ui.navigate.to('/clsschemabrowser/')):
+                    with ui.item_section().props('avatar'):
+                        ui.icon('search').style('color: #f59e0b;')
+                    with ui.item_section():
+                        ui.item_label(get_text('menu_cls_schema')).classes(
+                            replace='text-bold'
+                        ).style('font-size: 14px; color: #94a3b8;')
+                        ui.item_label('Browse BigQuery schemas').props('caption').style('font-size: 11px; color: #64748b;')
         
         # ========================================
         # IAM & SECURITY - VERMELHO
@@ -167,7 +175,7 @@ def menu() -> None:
                     ).style('font-size: 14px; color: #94a3b8;')
             
             # 3. Control Access (apenas OWNER e ADMIN)
-            if user.get('role') in ['OWNER', 'ADMIN']:
+            if user.get('role') in ['OWNER', 'ADMIN'] and can_view('USERS'):
                 with ui.item(on_click=lambda: ui.navigate.to('/controlaccess/')):
                     with ui.item_section().props('avatar'):
                         ui.icon('lock').style('color: #ef4444;')
@@ -179,10 +187,11 @@ def menu() -> None:
         # ========================================
         # AUDIT LOGS - ROXO
         # ========================================
-        with ui.item(on_click=lambda: ui.navigate.to('/auditlogs/')):
-            with ui.item_section().props('avatar'):
-                ui.icon('history').style('color: #a855f7;')
-            with ui.item_section():
-                ui.item_label(get_text('menu_audit_logs')).classes(
-                    replace='text-bold'
-                ).style('font-size: 16px; color: #ffffff;')
+        if can_view('AUDIT_LOGS'):
+            with ui.item(on_click=lambda: ui.navigate.to('/auditlogs/')):
+                with ui.item_section().props('avatar'):
+                    ui.icon('history').style('color: #a855f7;')
+                with ui.item_section():
+                    ui.item_label(get_text('menu_audit_logs')).classes(
+                        replace='text-bold'
+                    ).style('font-size: 16px; color: #ffffff;')
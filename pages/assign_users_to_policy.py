@@ -38,14 +38,18 @@ import theme
 from theme import get_text
 from config import Config
 from nicegui import ui, run
-from google.cloud import bigquery
 from google.api_core.exceptions import GoogleAPIError, NotFound
 from services.audit_service import AuditService
+from services.client_registry import lazy_bigquery_client
+from services.metadata_cache_service import get_metadata_cache
+from services.assignment_import_service import AssignmentImportService
+from services.entitlements_service import build_rls_filter, sync_entitlements
 import json
 import re
 
 config = Config()
-client = bigquery.Client(project=config.PROJECT_ID)
+client = lazy_bigquery_client(config.PROJECT_ID)
+metadata_cache = get_metadata_cache(config.PROJECT_ID)
 
 class RLSAssignUserstoPolicy:
     def __init__(self):
@@ -93,7 +97,7 @@ class RLSAssignUserstoPolicy:
         Get all datasets that end with '_views' (RLS views datasets)
         """
         try:
-            datasets = list(client.list_datasets())
+            datasets = metadata_cache.list_datasets()
             views_datasets = []
             
             for dataset in datasets:
@@ -129,13 +133,13 @@ class RLSAssignUserstoPolicy:
             
             for views_dataset in datasets_to_scan:
                 try:
-                    tables = list(client.list_tables(views_dataset))
+                    tables = metadata_cache.list_tables(views_dataset)
                     
                     for table in tables:
                         if table.table_type == 'VIEW':
                             # Get view details
                             view_ref = client.dataset(views_dataset).table(table.table_id)
-                            view = client.get_table(view_ref)
+                            view = metadata_cache.get_table(view_ref)
                             
                             # Extract metadata from description
                             base_dataset = None
@@ -283,7 +287,7 @@ class RLSAssignUserstoPolicy:
             if not self.selected_base_dataset or not self.selected_base_table:
                 return []
             table_ref = client.dataset(self.selected_base_dataset).table(self.selected_base_table)
-            table = client.get_table(table_ref)
+            table = metadata_cache.get_table(table_ref)
             return [field.name for field in table.schema]
         except Exception as e:
             print(f"Error getting fields: {e}")
@@ -482,6 +486,28 @@ class RLSAssignUserstoPolicy:
             
             client.query(query).result()
             
+            try:
+                sync_entitlements(self.project_id, self.selected_base_dataset, self.selected_base_table,
+                                  self.selected_policy_field, rls_type, [identity], revoke=True)
+            except Exception as e:
+                # A linha já saiu de policies_filters, mas a view compilada ainda concede o acesso
+                self.audit_service.log_action(
+                    action='DELETE_ASSIGNMENT',
+                    resource_type='RLS_ASSIGNMENT',
+                    resource_name=f"{identity} → {filter_value}",
+                    status='FAILED',
+                    error_message=str(e),
+                    details={
+                        'type': rls_type,
+                        'identity': identity,
+                        'filter_value': filter_value,
+                        'view': self.selected_view_name
+                    }
+                )
+                ui.notify(f"❌ Assignment deleted but access was NOT revoked: {e}", type="negative")
+                self.refresh_assignments_grid()
+                return
+            
             self.audit_service.log_action(
                 action='DELETE_ASSIGNMENT',
                 resource_type='RLS_ASSIGNMENT',
@@ -537,6 +563,9 @@ class RLSAssignUserstoPolicy:
             
             client.query(query).result()
             
+            sync_entitlements(self.project_id, self.selected_base_dataset, self.selected_base_table,
+                              self.selected_policy_field, rls_type, [email])
+            
             self.audit_service.log_action(
                 action='ADD_ASSIGNMENT',
                 resource_type='RLS_ASSIGNMENT',
@@ -557,6 +586,61 @@ class RLSAssignUserstoPolicy:
             ui.notify(f"Error adding assignment: {e}", type="negative")
             return False
 
+    def import_assignments_file(self, fileobj, file_name, progress_state):
+        """Bulk import assignments from an uploaded CSV/Parquet file (runs in io_bound)"""
+        def on_progress(fraction, message):
+            progress_state['value'] = fraction
+            progress_state['message'] = message
+        
+        try:
+            result = AssignmentImportService(self.project_id).import_assignments(
+                fileobj,
+                file_name,
+                policy_name=self.selected_view_name,
+                dataset_id=self.selected_base_dataset,
+                table_id=self.selected_base_table,
+                field_id=self.selected_policy_field,
+                progress=on_progress
+            )
+            
+            if result['inserted']:
+                for rls_type in ('users', 'group'):
+                    sync_entitlements(self.project_id, self.selected_base_dataset, self.selected_base_table,
+                                      self.selected_policy_field, rls_type)
+            
+            self.audit_service.log_action(
+                action='BULK_IMPORT_ASSIGNMENTS',
+                resource_type='RLS_ASSIGNMENT',
+                resource_name=f"{file_name} → {self.selected_view_name}",
+                status='SUCCESS',
+                details={
+                    'view': self.selected_view_name,
+                    'read': result['read'],
+                    'invalid': result['invalid'],
+                    'duplicates': result['duplicates'],
+                    'inserted': result['inserted']
+                }
+            )
+            
+            on_progress(1.0, (
+                f"✅ {result['inserted']:,} new assignment(s) imported "
+                f"({result['read']:,} rows read, {result['invalid']:,} invalid, "
+                f"{result['duplicates']:,} duplicate(s) in file)"
+            ))
+            return result
+            
+        except Exception as e:
+            print(f"[ERROR] Bulk import failed: {e}")
+            self.audit_service.log_action(
+                action='BULK_IMPORT_ASSIGNMENTS',
+                resource_type='RLS_ASSIGNMENT',
+                resource_name=f"{file_name} → {self.selected_view_name}",
+                status='FAILED',
+                error_message=str(e)
+            )
+            on_progress(0.0, f"❌ Import failed: {e}")
+            return None
+
     def change_view_field(self, new_field, new_value):
         """Change the filter field of the RLS view"""
         try:
@@ -586,7 +670,7 @@ class RLSAssignUserstoPolicy:
             
             # Get field type from base table
             table_ref = client.dataset(self.selected_base_dataset).table(self.selected_base_table)
-            table = client.get_table(table_ref)
+            table = metadata_cache.get_table(table_ref)
             field_type = None
             for schema_field in table.schema:
                 if schema_field.name == new_field:
@@ -604,37 +688,11 @@ class RLSAssignUserstoPolicy:
             CREATE OR REPLACE VIEW `{self.project_id}.{self.selected_views_dataset}.{self.selected_view_name}` AS
             SELECT *
             FROM `{self.project_id}.{self.selected_base_dataset}.{self.selected_base_table}`
-            WHERE {new_field} IN (
-              SELECT CAST(filter_value AS {field_type})
-              FROM `{config.FILTER_TABLE}`
-              WHERE rls_type = 'users'
-                AND project_id = '{self.project_id}'
-                AND dataset_id = '{self.selected_base_dataset}'
-                AND table_id = '{self.selected_base_table}'
-                AND field_id = '{new_field}'
-                AND username = SESSION_USER()
-            );
+            WHERE {build_rls_filter(new_field, field_type, 'users', self.project_id, self.selected_base_dataset, self.selected_base_table)};
             """
             
-            print(f"Executing SQL to update view...")
-            client.query(new_sql).result()
-            print(f"View SQL updated successfully")
-            
-            # Update metadata
-            rls_metadata['filter_field'] = new_field
-            rls_metadata['filter_field_type'] = field_type
-            rls_metadata['base_dataset'] = self.selected_base_dataset
-            rls_metadata['base_table'] = self.selected_base_table
-            
-            view.description = (
-                f"RLS view for users - filters by {new_field}\n"
-                f"Base table: {self.selected_base_dataset}.{self.selected_base_table}\n\n"
-                f"RLS_METADATA:{json.dumps(rls_metadata)}"
-            )
-            client.update_table(view, ['description'])
-            print(f"View metadata updated")
-            
-            # Update policy table if exists
+            # Assignments move to the new field first: the compiled entitlements are
+            # built from them and must exist before the view reads them
             query = f"""
             UPDATE `{config.POLICY_TABLE}`
             SET field_id = '{new_field}'
@@ -656,6 +714,32 @@ class RLSAssignUserstoPolicy:
             client.query(query).result()
             print(f"Filter table updated")
             
+            sync_entitlements(self.project_id, self.selected_base_dataset, self.selected_base_table,
+                              new_field, 'users', field_type=field_type, revoke=True)
+            old_field = self.selected_policy_field
+            if old_field and old_field != new_field:
+                # Sem linhas no campo antigo, o MERGE remove as entitlements que sobraram
+                sync_entitlements(self.project_id, self.selected_base_dataset, self.selected_base_table,
+                                  old_field, 'users', revoke=True)
+            
+            print(f"Executing SQL to update view...")
+            metadata_cache.run_ddl(new_sql, view_ref)
+            print(f"View SQL updated successfully")
+            
+            # Update metadata
+            rls_metadata['filter_field'] = new_field
+            rls_metadata['filter_field_type'] = field_type
+            rls_metadata['base_dataset'] = self.selected_base_dataset
+            rls_metadata['base_table'] = self.selected_base_table
+            
+            view.description = (
+                f"RLS view for users - filters by {new_field}\n"
+                f"Base table: {self.selected_base_dataset}.{self.selected_base_table}\n\n"
+                f"RLS_METADATA:{json.dumps(rls_metadata)}"
+            )
+            metadata_cache.update_table(view, ['description'])
+            print(f"View metadata updated")
+            
             self.audit_service.log_action(
                 action='CHANGE_VIEW_FIELD',
                 resource_type='RLS_VIEW',
@@ -835,6 +919,7 @@ class RLSAssignUserstoPolicy:
             with ui.tabs().classes('w-full') as tabs:
                 tab_assignments = ui.tab("👥 Assignments", icon='people')
                 tab_add = ui.tab("➕ Add New", icon='add_circle')
+                tab_import = ui.tab("📥 Bulk Import", icon='upload_file')
             
             with ui.tab_panels(tabs, value=tab_assignments).classes('w-full'):
                 # ========================================
@@ -945,6 +1030,60 @@ class RLSAssignUserstoPolicy:
                         ui.label("• Service Accounts: System identities (e.g., app@project.iam.gserviceaccount.com)").classes('text-xs')
                         ui.label("• Filter: Restrict data access (or 'No filter' for all data)").classes('text-xs')
 
+                # ========================================
+                # TAB 3: BULK IMPORT (CSV / PARQUET)
+                # ========================================
+                with ui.tab_panel(tab_import):
+                    ui.label("Bulk Import").classes('text-h6 font-bold mb-2')
+                    ui.label("Upload a CSV or Parquet file with columns: identity, filter_value, type (optional)").classes('text-caption text-grey-7 mb-4')
+                    
+                    with ui.card().classes('w-full bg-green-50 p-6'):
+                        import_progress = ui.linear_progress(value=0, show_value=False).classes('w-full')
+                        import_status = ui.label("Waiting for file...").classes('text-sm')
+                        import_errors = ui.column().classes('w-full')
+                        
+                        progress_state = {'value': 0.0, 'message': "Waiting for file..."}
+                        
+                        def update_progress():
+                            import_progress.value = progress_state['value']
+                            import_status.text = progress_state['message']
+                        
+                        ui.timer(0.5, update_progress)
+                        
+                        async def handle_upload(e):
+                            import_errors.clear()
+                            progress_state['value'] = 0.0
+                            progress_state['message'] = f"Importing {e.name}..."
+                            
+                            result = await run.io_bound(
+                                self.import_assignments_file, e.content, e.name, progress_state
+                            )
+                            upload.reset()
+                            
+                            if result is None:
+                                return
+                            
+                            if result['errors']:
+                                with import_errors:
+                                    ui.label(f"⚠️ {result['invalid']} invalid row(s):").classes('text-sm font-bold text-orange-700')
+                                    for error in result['errors']:
+                                        ui.label(error).classes('text-xs text-grey-8')
+                            
+                            self.refresh_assignments_grid()
+                        
+                        upload = ui.upload(
+                            label="CSV / Parquet",
+                            on_upload=handle_upload,
+                            auto_upload=True
+                        ).props('accept=".csv,.parquet"').classes('w-full mt-4')
+                    
+                    with ui.card().classes('w-full bg-blue-50 p-4 mt-4'):
+                        ui.label("💡 File format:").classes('font-bold mb-2')
+                        ui.label("• identity (or email): user, group or service account email").classes('text-xs')
+                        ui.label("• filter_value: value of the filter field (empty = all data)").classes('text-xs')
+                        ui.label("• type: user | group | service_account (default: user)").classes('text-xs')
+                        ui.label("• Duplicates and existing assignments are skipped").classes('text-xs')
+
             # Navigation
             with ui.stepper_navigation():
                 ui.button("BACK", icon="arrow_back_ios", on_click=self.stepper.previous)
@@ -28,10 +28,12 @@ from nicegui import ui
 from google.cloud import bigquery
 from google.api_core.exceptions import GoogleAPIError
 from services.audit_service import AuditService
+from services.client_registry import lazy_bigquery_client
+from services.entitlements_service import sync_entitlements
 
 config = Config()
 
-client = bigquery.Client(project=config.PROJECT_ID)
+client = lazy_bigquery_client(config.PROJECT_ID)
 
 
 class RLSAssignValuestoGroup:
@@ -87,34 +89,91 @@ class RLSAssignValuestoGroup:
 
     def delete_policy_from_db(self, group_email, filter_value):
         """Deleta política de grupo do BigQuery"""
+        self.delete_policies_from_db([(group_email, filter_value)])
+
+    def delete_policies_from_db(self, assignments):
+        """
+        Deleta várias políticas de grupo em um único DELETE
+        
+        Args:
+            assignments: lista de (group_email, filter_value)
+        """
+        assignments = sorted(set(assignments))
+        if not assignments:
+            return
+        
         query = f"""
         DELETE FROM `{config.FILTER_TABLE}`
         WHERE rls_type = 'group'
-          AND project_id = '{self.project_id}'
-          AND dataset_id = '{self.selected_policy_dataset}'
-          AND table_id = '{self.selected_policy_table}'
-          AND rls_group = '{group_email}'
-          AND filter_value = '{filter_value}'
+          AND project_id = @project_id
+          AND dataset_id = @dataset_id
+          AND table_id = @table_id
+          AND (rls_group, filter_value) IN UNNEST(@assignments)
         """
         
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("project_id", "STRING", self.project_id),
+                bigquery.ScalarQueryParameter("dataset_id", "STRING", self.selected_policy_dataset),
+                bigquery.ScalarQueryParameter("table_id", "STRING", self.selected_policy_table),
+                bigquery.ArrayQueryParameter(
+                    "assignments",
+                    "STRUCT",
+                    [
+                        bigquery.StructQueryParameter(
+                            None,
+                            bigquery.ScalarQueryParameter("rls_group", "STRING", group_email),
+                            bigquery.ScalarQueryParameter("filter_value", "STRING", filter_value)
+                        )
+                        for group_email, filter_value in assignments
+                    ]
+                )
+            ]
+        )
+        
         try:
-            query_job = client.query(query)
+            query_job = client.query(query, job_config=job_config)
             query_job.result()
             
-            self.audit_service.log_action(
-                action='DELETE_GROUP_POLICY',
-                resource_type='GROUP_ASSIGNMENT',
-                resource_name=f"{group_email} → {filter_value}",
-                status='SUCCESS',
-                details={
-                    'group_email': group_email,
-                    'filter_value': filter_value,
-                    'dataset': self.selected_policy_dataset,
-                    'table': self.selected_policy_table
-                }
-            )
+            try:
+                sync_entitlements(self.project_id, self.selected_policy_dataset, self.selected_policy_table,
+                                  self.selected_policy_field, 'group', [g for g, _ in assignments], revoke=True)
+            except Exception as e:
+                # As linhas já saíram de policies_filters, mas a view compilada ainda concede o acesso
+                for group_email, filter_value in assignments:
+                    self.audit_service.log_action(
+                        action='DELETE_GROUP_POLICY',
+                        resource_type='GROUP_ASSIGNMENT',
+                        resource_name=f"{group_email} → {filter_value}",
+                        status='FAILED',
+                        error_message=str(e),
+                        details={
+                            'group_email': group_email,
+                            'filter_value': filter_value,
+                            'dataset': self.selected_policy_dataset,
+                            'table': self.selected_policy_table
+                        }
+                    )
+                ui.notify(f"❌ Policies deleted but access was NOT revoked: {e}", type="negative")
+                self.refresh_existing_policies_grid()
+                return
+            
+            for group_email, filter_value in assignments:
+                self.audit_service.log_action(
+                    action='DELETE_GROUP_POLICY',
+                    resource_type='GROUP_ASSIGNMENT',
+                    resource_name=f"{group_email} → {filter_value}",
+                    status='SUCCESS',
+                    details={
+                        'group_email': group_email,
+                        'filter_value': filter_value,
+                        'dataset': self.selected_policy_dataset,
+                        'table': self.selected_policy_table
+                    }
+                )
+                
+                ui.notify(get_text('msg_group_policy_deleted', group=group_email, filter_value=filter_value), type="positive")  # <- TRADUZIDO
             
-            ui.notify(get_text('msg_group_policy_deleted', group=group_email, filter_value=filter_value), type="positive")  # <- TRADUZIDO
             self.refresh_existing_policies_grid()
             
         except Exception as e:
@@ -207,18 +266,45 @@ class RLSAssignValuestoGroup:
             return
 
         try:
-            insert_statements = []
-            for filter_value in self.selected_filters:
-                insert_statements.append(f"""
-                    INSERT INTO `{config.FILTER_TABLE}` 
-                    (rls_type, policy_name, project_id, dataset_id, table_id, field_id, filter_value, rls_group)
-                    VALUES
-                    ('group', '{self.selected_policy_name}', '{self.project_id}', '{self.selected_policy_dataset}', '{self.selected_policy_table}', '{self.selected_policy_field}', '{filter_value}', '{self.selected_policy_group_email}')
-                """)
-
-            for insert_statement in insert_statements:
-                query_job = client.query(insert_statement)
-                query_job.result()
+            # Um único INSERT para todos os valores, ignorando os que já existem
+            insert_query = f"""
+                INSERT INTO `{config.FILTER_TABLE}`
+                (rls_type, policy_name, project_id, dataset_id, table_id, field_id, filter_value, rls_group)
+                SELECT
+                    'group', @policy_name, @project_id, @dataset_id, @table_id, @field_id, value, @rls_group
+                FROM (SELECT DISTINCT value FROM UNNEST(@values) AS value) v
+                WHERE NOT EXISTS (
+                    SELECT 1
+                    FROM `{config.FILTER_TABLE}` f
+                    WHERE f.rls_type = 'group'
+                      AND f.project_id = @project_id
+                      AND f.dataset_id = @dataset_id
+                      AND f.table_id = @table_id
+                      AND f.rls_group = @rls_group
+                      AND f.filter_value = v.value
+                )
+            """
+
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=[
+                    bigquery.ScalarQueryParameter("policy_name", "STRING", self.selected_policy_name),
+                    bigquery.ScalarQueryParameter("project_id", "STRING", self.project_id),
+                    bigquery.ScalarQueryParameter("dataset_id", "STRING", self.selected_policy_dataset),
+                    bigquery.ScalarQueryParameter("table_id", "STRING", self.selected_policy_table),
+                    bigquery.ScalarQueryParameter("field_id", "STRING", self.selected_policy_field),
+                    bigquery.ScalarQueryParameter("rls_group", "STRING", self.selected_policy_group_email),
+                    bigquery.ArrayQueryParameter("values", "STRING", sorted(self.selected_filters))
+                ]
+            )
+
+            query_job = client.query(insert_query, job_config=job_config)
+            query_job.result()
+            inserted_count = query_job.num_dml_affected_rows or 0
+            skipped_count = len(self.selected_filters) - inserted_count
+            
+            if inserted_count:
+                sync_entitlements(self.project_id, self.selected_policy_dataset, self.selected_policy_table,
+                                  self.selected_policy_field, 'group', [self.selected_policy_group_email])
 
             self.audit_service.log_action(
                 action='ASSIGN_VALUE_TO_GROUP',
@@ -232,11 +318,15 @@ class RLSAssignValuestoGroup:
                     'table': self.selected_policy_table,
                     'field': self.selected_policy_field,
                     'filter_values': list(self.selected_filters),
-                    'filter_count': len(self.selected_filters)
+                    'filter_count': len(self.selected_filters),
+                    'inserted_count': inserted_count,
+                    'skipped_duplicates': skipped_count
                 }
             )
 
-            ui.notify(get_text('msg_inserted_filters_for_group', count=len(self.selected_filters), group=self.selected_policy_group_email), type="positive")  # <- TRADUZIDO
+            ui.notify(get_text('msg_inserted_filters_for_group', count=inserted_count, group=self.selected_policy_group_email), type="positive")  # <- TRADUZIDO
+            if skipped_count:
+                print(f"[DEBUG] {skipped_count} filter value(s) already assigned - skipped")
             
             self.selected_filters.clear()
             
@@ -342,8 +432,8 @@ class RLSAssignValuestoGroup:
             ui.notify(get_text('msg_no_rows_selected_delete'), type="warning")  # <- TRADUZIDO
             return
         
-        for row in rows:
-            self.delete_policy_from_db(row['group_email'], row['filter_value'])
+        # Um único DELETE para todas as linhas selecionadas
+        self.delete_policies_from_db([(row['group_email'], row['filter_value']) for row in rows])
 
     def step2_with_tabs(self):
         """Step 2 com duas abas: Existing Policies e Add New"""
@@ -3,10 +3,14 @@ from config import Config
 from nicegui import ui, run
 from google.cloud import bigquery
 from services.audit_service import AuditService
+from services.client_registry import lazy_bigquery_client
+from services.metadata_cache_service import get_metadata_cache
+from services.authorized_view_registrar import get_view_registrar
 import traceback
 
 config = Config()
-client = bigquery.Client(project=config.PROJECT_ID)
+client = lazy_bigquery_client(config.PROJECT_ID)
+metadata_cache = get_metadata_cache(config.PROJECT_ID)
 
 
 class DynamicColumnSecurity:
@@ -82,7 +86,7 @@ class DynamicColumnSecurity:
     
     def get_datasets(self):
         try:
-            datasets = list(client.list_datasets())
+            datasets = metadata_cache.list_datasets()
             return [dataset.dataset_id for dataset in datasets]
         except Exception as e:
             ui.notify(f"Error: {e}", type="negative")
@@ -90,7 +94,7 @@ class DynamicColumnSecurity:
     
     def get_tables(self, dataset_id):
         try:
-            tables = client.list_tables(dataset_id)
+            tables = metadata_cache.list_tables(dataset_id)
             # Excluir views protegidas
             return [
                 table.table_id for table in tables 
@@ -110,7 +114,7 @@ class DynamicColumnSecurity:
         
         try:
             table_ref = client.dataset(self.selected_dataset).table(self.selected_table)
-            table = await run.io_bound(client.get_table, table_ref)
+            table = await run.io_bound(metadata_cache.get_table, table_ref)
             
             self.table_columns = []
             for field in table.schema:
@@ -194,7 +198,7 @@ FROM `{self.project_id}.{self.selected_dataset}.{self.selected_table}`;"""
                 dataset = bigquery.Dataset(dataset_ref)
                 dataset.location = "us-central1"
                 dataset.description = f"Protected views from {self.selected_dataset} - Users have access here"
-                await run.io_bound(client.create_dataset, dataset)
+                await run.io_bound(metadata_cache.create_dataset, dataset)
                 ui.notify(f"✅ Created dataset: {self.views_dataset}", type="positive")
                 return True
             except Exception as e:
@@ -204,71 +208,16 @@ FROM `{self.project_id}.{self.selected_dataset}.{self.selected_table}`;"""
     async def configure_authorized_view(self):
         """✅ Configura Authorized View cross-dataset"""
         try:
-            from google.cloud.bigquery import AccessEntry
+            registrar = get_view_registrar(self.project_id)
             
             # 1. Adicionar view como AUTHORIZED no dataset ORIGEM
-            source_dataset_ref = client.dataset(self.selected_dataset)
-            source_dataset = await run.io_bound(client.get_dataset, source_dataset_ref)
-            
-            access_entries = list(source_dataset.access_entries)
-            
-            # Authorized view entry
-            authorized_view_entry = AccessEntry(
-                role=None,
-                entity_type='view',
-                entity_id={
-                    'projectId': self.project_id,
-                    'datasetId': self.views_dataset,
-                    'tableId': self.view_name
-                }
+            await run.io_bound(
+                registrar.authorize_view, self.selected_dataset, self.views_dataset, self.view_name
             )
             
-            # Verificar se já existe
-            view_exists = False
-            for entry in access_entries:
-                if entry.entity_type == 'view' and isinstance(entry.entity_id, dict):
-                    if (entry.entity_id.get('projectId') == self.project_id and
-                        entry.entity_id.get('datasetId') == self.views_dataset and
-                        entry.entity_id.get('tableId') == self.view_name):
-                        view_exists = True
-                        break
-            
-            if not view_exists:
-                access_entries.append(authorized_view_entry)
-            
-            # Atualizar dataset origem
-            source_dataset.access_entries = access_entries
-            await run.io_bound(client.update_dataset, source_dataset, ['access_entries'])
-            
             # 2. Adicionar usuários no dataset de VIEWS
             if self.authorized_users:
-                views_dataset_ref = client.dataset(self.views_dataset)
-                views_dataset_obj = await run.io_bound(client.get_dataset, views_dataset_ref)
-                
-                views_access_entries = list(views_dataset_obj.access_entries)
-                
-                for email in self.authorized_users:
-                    user_entry = AccessEntry(
-                        role='READER',
-                        entity_type='userByEmail',
-                        entity_id=email
-                    )
-                    
-                    # Verificar se já existe
-                    user_exists = False
-                    for entry in views_access_entries:
-                        if (entry.entity_type == 'userByEmail' and 
-                            entry.entity_id == email and 
-                            entry.role == 'READER'):
-                            user_exists = True
-                            break
-                    
-                    if not user_exists:
-                        views_access_entries.append(user_entry)
-                
-                # Atualizar dataset de views
-                views_dataset_obj.access_entries = views_access_entries
-                await run.io_bound(client.update_dataset, views_dataset_obj, ['access_entries'])
+                await run.io_bound(registrar.grant_readers, self.views_dataset, self.authorized_users)
             
             return True
             
@@ -302,8 +251,8 @@ FROM `{self.project_id}.{self.selected_dataset}.{self.selected_table}`;"""
             
             # 2. Criar VIEW
             sql = self.generate_view_sql()
-            query_job = await run.io_bound(client.query, sql)
-            await run.io_bound(query_job.result)
+            table_ref = client.dataset(self.views_dataset).table(self.view_name)
+            await run.io_bound(metadata_cache.run_ddl, sql, table_ref)
             
             # 3. Atualizar descrição
             description_lines = [
@@ -322,10 +271,9 @@ FROM `{self.project_id}.{self.selected_dataset}.{self.selected_table}`;"""
             
             description = '\n'.join(description_lines)
             
-            table_ref = client.dataset(self.views_dataset).table(self.view_name)
             table = await run.io_bound(client.get_table, table_ref)
             table.description = description
-            await run.io_bound(client.update_table, table, ['description'])
+            await run.io_bound(metadata_cache.update_table, table, ['description'])
             
             # 4. ✅ Configurar Authorized View
             await self.configure_authorized_view()
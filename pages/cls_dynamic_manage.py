@@ -1,14 +1,20 @@
 import theme
 from config import Config
 from nicegui import ui, run
-from google.cloud import bigquery
 from services.audit_service import AuditService
+from services.rls_views_service import RLSViewsService
+from services.client_registry import lazy_bigquery_client
+from services.metadata_cache_service import get_metadata_cache
+from services.authorized_view_registrar import get_view_registrar
+from services.cls_materialization_service import CLSMaterializationService, format_staleness, logical_where
+import json
 import re
 import traceback
 import asyncio
 
 config = Config()
-client = bigquery.Client(project=config.PROJECT_ID)
+client = lazy_bigquery_client(config.PROJECT_ID)
+metadata_cache = get_metadata_cache(config.PROJECT_ID)
 
 
 class DynamicColumnManage:
@@ -53,6 +59,8 @@ class DynamicColumnManage:
         
         self.project_id = config.PROJECT_ID
         self.audit_service = AuditService(config.PROJECT_ID)
+        self.rls_views_service = RLSViewsService(config.PROJECT_ID)
+        self.materialization_service = CLSMaterializationService(config.PROJECT_ID)
         self.page_title = "Manage Protected Views (RLS + CLS)"
         
         self.selected_dataset = None
@@ -90,7 +98,7 @@ class DynamicColumnManage:
     
     def get_datasets_sync(self):
         try:
-            datasets = list(client.list_datasets())
+            datasets = metadata_cache.list_datasets()
             return [dataset.dataset_id for dataset in datasets if not dataset.dataset_id.endswith('_views')]
         except Exception as e:
             print(f"[ERROR] get_datasets_sync: {e}")
@@ -136,6 +144,27 @@ class DynamicColumnManage:
                 self.cls_users_label = ui.label('').classes('text-sm')
             self.cls_users_section.set_visibility(False)
             
+            # Protection mode: logical view vs materialized masked snapshot
+            with ui.card().classes('w-full bg-amber-50 p-3 mt-4'):
+                ui.label('⚡ Protection Mode').classes('font-bold text-sm mb-2')
+                with ui.row().classes('w-full items-center gap-4'):
+                    self.mode_toggle = ui.toggle(
+                        {'logical': 'Logical view', 'materialized': 'Materialized snapshot'},
+                        value='logical'
+                    )
+                    self.refresh_minutes_input = ui.number(
+                        'Refresh every (min, 0 = on source change only)',
+                        value=config.CLS_SNAPSHOT_DEFAULT_REFRESH_MINUTES,
+                        min=0
+                    ).classes('w-72').props('dense')
+                    self.partition_checkbox = ui.checkbox('Partition like source', value=True)
+                with ui.row().classes('w-full items-center gap-4'):
+                    self.staleness_label = ui.label('').classes('text-xs text-grey-7')
+                    self.refresh_snapshot_button = ui.button(
+                        'REFRESH SNAPSHOT', icon='sync', on_click=self.refresh_snapshot_now
+                    ).props('flat dense')
+                ui.label('• Materialized: masks are computed once into a snapshot table (refreshed on schedule or when the source changes); RLS still applies on every read').classes('text-xs')
+            
             with ui.row().classes('w-full justify-end gap-2 mt-4'):
                 ui.button('PREVIEW SQL', icon='code', on_click=self.preview_sql).props('flat color=blue')
                 ui.button('CANCEL', on_click=self.close_edit_dialog).props('flat')
@@ -151,32 +180,140 @@ class DynamicColumnManage:
         return self.get_datasets_sync()
     
     def get_protected_views(self, dataset_id):
+        """
+        ✅ List protected views with a bounded number of BigQuery jobs
+        
+        One INFORMATION_SCHEMA metadata query per dataset + one grouped
+        policies_filters query for all RLS/HYBRID views, joined in memory.
+        Falls back to the per-table scan if the bulk path fails.
+        """
         try:
-            print(f"[DEBUG] ===== get_protected_views START =====")
+            print(f"[DEBUG] ===== get_protected_views START (bulk) =====")
             print(f"[DEBUG] Dataset ID: {dataset_id}")
+            
+            candidates = []
+            for ds in self.get_datasets_to_search(dataset_id):
+                view_rows = self.rls_views_service.list_view_metadata(ds)
+                print(f"[DEBUG] Found {len(view_rows)} views in {ds}")
+                
+                for view_meta in view_rows:
+                    view_type = self.detect_view_type(view_meta)
+                    if view_type == 'NONE':
+                        continue
+                    candidates.append((ds, view_meta, view_type))
+            
+            rls_view_names = [
+                view_meta.table_id for _, view_meta, view_type in candidates
+                if view_type in ['RLS', 'HYBRID']
+            ]
+            rls_users_by_view = self.rls_views_service.get_rls_users_for_views(rls_view_names)
+            
             views = []
-            datasets_to_search = [dataset_id]
+            for ds, view_meta, view_type in candidates:
+                rls_users_count = len(rls_users_by_view.get(view_meta.table_id, []))
+                views.append(self.build_view_entry(
+                    view_meta, ds, dataset_id, view_type, view_meta.column_count, rls_users_count
+                ))
             
-            views_dataset = f"{dataset_id}_views"
-            try:
-                client.get_dataset(views_dataset)
-                datasets_to_search.append(views_dataset)
-                print(f"[DEBUG] Found views dataset: {views_dataset}")
-            except Exception as e:
-                print(f"[DEBUG] No views dataset found: {e}")
-                pass
+            print(f"[DEBUG] ===== TOTAL VIEWS FOUND: {len(views)} =====")
+            return self.annotate_materialization(views)
             
-            for ds in datasets_to_search:
+        except Exception as e:
+            print(f"[WARNING] Bulk listing failed, falling back to per-table scan: {e}")
+            return self.annotate_materialization(self.get_protected_views_per_table(dataset_id))
+    
+    def annotate_materialization(self, views):
+        """Fill the staleness column of materialized views (one registry query)"""
+        view_ids = [
+            f"{self.project_id}.{v['view_dataset']}.{v['view_name']}"
+            for v in views if v.get('mode') == 'materialized'
+        ]
+        if not view_ids:
+            return views
+        
+        try:
+            status = self.materialization_service.get_status(view_ids)
+            for v in views:
+                if v.get('mode') == 'materialized':
+                    v['staleness'] = format_staleness(status.get(f"{self.project_id}.{v['view_dataset']}.{v['view_name']}"))
+        except Exception as e:
+            print(f"[ERROR] annotate_materialization: {e}")
+        return views
+    
+    def parse_materialization_from_description(self, description):
+        """MATERIALIZED_SNAPSHOT: {...} metadata written when a view is materialized"""
+        if not description or 'MATERIALIZED_SNAPSHOT:' not in description:
+            return None
+        try:
+            return json.loads(description.split('MATERIALIZED_SNAPSHOT:')[1].split('\n')[0].strip())
+        except ValueError:
+            return None
+    
+    def get_datasets_to_search(self, dataset_id):
+        datasets_to_search = [dataset_id]
+        
+        views_dataset = f"{dataset_id}_views"
+        try:
+            client.get_dataset(views_dataset)
+            datasets_to_search.append(views_dataset)
+            print(f"[DEBUG] Found views dataset: {views_dataset}")
+        except Exception as e:
+            print(f"[DEBUG] No views dataset found: {e}")
+        
+        return datasets_to_search
+    
+    def build_view_entry(self, table_obj, view_dataset, dataset_id, view_type, visible_columns, rls_users_count):
+        view_definition = table_obj.view_query
+        source_table = self.extract_source_table(view_definition)
+        source_dataset = self.extract_source_dataset(view_definition) or dataset_id
+        
+        protection_summary = self.analyze_protection(
+            table_obj.description, 
+            table_obj.view_query, 
+            visible_columns
+        )
+        
+        # CLS users (from description)
+        cls_users = self.parse_cls_users_from_description(table_obj.description)
+        
+        # Materialized views read a snapshot: the real source is in the description
+        materialization = self.parse_materialization_from_description(table_obj.description)
+        if materialization:
+            source_dataset = materialization['source_dataset']
+            source_table = materialization['source_table']
+        
+        return {
+            'view_name': table_obj.table_id,
+            'view_dataset': view_dataset,
+            'source_dataset': source_dataset,
+            'source_table': source_table,
+            'view_type': view_type,
+            'visible_columns': visible_columns,
+            'hidden_count': protection_summary['hidden'],
+            'masked_count': protection_summary['masked'],
+            'authorized_users': len(cls_users),
+            'rls_users': rls_users_count,
+            'mode': 'materialized' if materialization else 'logical',
+            'staleness': 'logical',
+            'created': table_obj.created.strftime('%Y-%m-%d %H:%M') if table_obj.created else 'Unknown',
+            'modified': table_obj.modified.strftime('%Y-%m-%d %H:%M') if table_obj.modified else 'Unknown',
+            'description': table_obj.description or ''
+        }
+    
+    def get_protected_views_per_table(self, dataset_id):
+        try:
+            print(f"[DEBUG] ===== get_protected_views_per_table START =====")
+            views = []
+            
+            for ds in self.get_datasets_to_search(dataset_id):
                 print(f"[DEBUG] Searching in dataset: {ds}")
                 tables = list(client.list_tables(ds))
                 print(f"[DEBUG] Found {len(tables)} tables in {ds}")
                 
                 for table in tables:
-                    print(f"[DEBUG] Processing table: {table.table_id}")
                     table_ref = client.dataset(ds).table(table.table_id)
                     table_obj = client.get_table(table_ref)
                     
-                    print(f"[DEBUG] Table type: {table_obj.table_type}")
                     if table_obj.table_type != 'VIEW':
                         continue
                     
@@ -190,39 +327,14 @@ class DynamicColumnManage:
                     icon = self.get_view_type_icon(view_type)
                     print(f"[DEBUG] {icon} View {table.table_id} is {view_type}")
                     
-                    view_definition = table_obj.view_query
-                    source_table = self.extract_source_table(view_definition)
-                    source_dataset = self.extract_source_dataset(view_definition) or dataset_id
-                    
-                    protection_summary = self.analyze_protection(
-                        table_obj.description, 
-                        table_obj.view_query, 
-                        len(table_obj.schema)
-                    )
-                    
-                    # CLS users (from description)
-                    cls_users = self.parse_cls_users_from_description(table_obj.description)
-                    
                     # RLS users (from policies_filters table in BigQuery)
                     rls_users_count = 0
                     if view_type in ['RLS', 'HYBRID']:
                         rls_users_count = self.count_rls_users_for_view(table.table_id)
                     
-                    views.append({
-                        'view_name': table.table_id,
-                        'view_dataset': ds,
-                        'source_dataset': source_dataset,
-                        'source_table': source_table,
-                        'view_type': view_type,
-                        'visible_columns': len(table_obj.schema),
-                        'hidden_count': protection_summary['hidden'],
-                        'masked_count': protection_summary['masked'],
-                        'authorized_users': len(cls_users),
-                        'rls_users': rls_users_count,
-                        'created': table_obj.created.strftime('%Y-%m-%d %H:%M') if table_obj.created else 'Unknown',
-                        'modified': table_obj.modified.strftime('%Y-%m-%d %H:%M') if table_obj.modified else 'Unknown',
-                        'description': table_obj.description or ''
-                    })
+                    views.append(self.build_view_entry(
+                        table_obj, ds, dataset_id, view_type, len(table_obj.schema), rls_users_count
+                    ))
                     print(f"[DEBUG] Added view: {table.table_id}")
             
             print(f"[DEBUG] ===== TOTAL VIEWS FOUND: {len(views)} =====")
@@ -403,7 +515,7 @@ class DynamicColumnManage:
             
             # Load source table schema
             table_ref = client.dataset(self.source_dataset).table(source_table)
-            table_obj = await run.io_bound(client.get_table, table_ref)
+            table_obj = await run.io_bound(metadata_cache.get_table, table_ref)
             
             self.source_table_columns = []
             for field in table_obj.schema:
@@ -415,7 +527,7 @@ class DynamicColumnManage:
             
             # Load view metadata
             view_ref = client.dataset(self.current_view_dataset).table(view_info['view_name'])
-            view_obj = await run.io_bound(client.get_table, view_ref)
+            view_obj = await run.io_bound(metadata_cache.get_table, view_ref)
             
             # ✅ CRITICAL: Store original view query to preserve RLS WHERE clause
             self.original_view_query = view_obj.view_query
@@ -430,6 +542,14 @@ class DynamicColumnManage:
             # Parse CLS users from description
             self.authorized_users = self.parse_cls_users_from_description(view_obj.description)
             
+            # Materialization state
+            self.snapshot_status = None
+            materialization = self.parse_materialization_from_description(view_obj.description)
+            if materialization:
+                view_id = f"{self.project_id}.{self.current_view_dataset}.{view_info['view_name']}"
+                statuses = await run.io_bound(self.materialization_service.get_status, [view_id])
+                self.snapshot_status = statuses.get(view_id)
+            
             # Parse RLS users from policies_filters
             view_type = view_info.get('view_type', 'CLS')
             if view_type in ['RLS', 'HYBRID']:
@@ -474,7 +594,7 @@ class DynamicColumnManage:
         # If no metadata, infer from SQL
         if not protection:
             view_ref = client.dataset(self.current_view_dataset).table(self.current_view['view_name'])
-            view_obj = client.get_table(view_ref)
+            view_obj = metadata_cache.get_table(view_ref)
             view_cols = {field.name for field in view_obj.schema}
             
             for col in all_columns:
@@ -520,6 +640,14 @@ class DynamicColumnManage:
         else:
             self.cls_users_section.set_visibility(False)
         
+        # Protection mode
+        status = getattr(self, 'snapshot_status', None)
+        self.mode_toggle.value = self.current_view.get('mode', 'logical')
+        if status:
+            self.refresh_minutes_input.value = (status.get('refresh_seconds') or 0) // 60
+        self.staleness_label.set_text(f"Snapshot: {format_staleness(status)}")
+        self.refresh_snapshot_button.set_visibility(status is not None)
+        
         # Populate columns
         self.columns_container.clear()
         
@@ -651,7 +779,7 @@ class DynamicColumnManage:
         
         # Check for RLS
         if (table_obj.table_id.startswith('vw_') and 
-            'policies_filters' in view_query.lower() and 
+            ('policies_filters' in view_query.lower() or 'rls_entitlements' in view_query.lower()) and 
             'session_user()' in view_query.lower()):
             has_rls = True
         
@@ -734,7 +862,15 @@ class DynamicColumnManage:
         if not self.current_view:
             return
         
-        sql = self.generate_view_sql()
+        if self.mode_toggle.value == 'materialized':
+            try:
+                snapshot_sql, view_sql = self.generate_materialized_sql()
+                sql = f"-- Masked snapshot\n{snapshot_sql};\n\n-- View (RLS applied on read)\n{view_sql}" if snapshot_sql else None
+            except ValueError as e:
+                ui.notify(str(e), type="negative")
+                return
+        else:
+            sql = self.generate_view_sql()
         if not sql:
             ui.notify("Error generating SQL", type="negative")
             return
@@ -772,6 +908,40 @@ class DynamicColumnManage:
         
         sql_dialog.open()
     
+    def build_select_columns(self):
+        select_columns = []
+        for col in self.source_table_columns:
+            sql_expr = self.generate_column_sql(col['name'], col['type'], self.column_protection.get(col['name'], 'VISIBLE'))
+            if sql_expr:
+                select_columns.append(sql_expr)
+        return select_columns
+    
+    def get_rls_where_clause(self):
+        """✅ CRITICAL: Preserve RLS WHERE clause if view has RLS (source field names)"""
+        where_clause = None
+        if self.rls_users and self.original_view_query:
+            where_clause = logical_where(self.extract_where_clause(self.original_view_query))
+            print(f"[DEBUG] ✅ Preserving RLS WHERE clause: {where_clause[:100] if where_clause else 'None'}...")
+        return where_clause
+    
+    def generate_materialized_sql(self):
+        """(snapshot DDL, view DDL) for materialized mode"""
+        if not self.current_view:
+            return None, None
+        
+        select_columns = self.build_select_columns()
+        if not select_columns:
+            return None, None
+        
+        return self.materialization_service.build_sql(
+            f"{self.project_id}.{self.current_view_dataset}.{self.current_view['view_name']}",
+            f"{self.project_id}.{self.source_dataset}.{self.current_view['source_table']}",
+            select_columns,
+            self.column_protection,
+            self.get_rls_where_clause(),
+            partition_like_source=self.partition_checkbox.value
+        )
+    
     def generate_view_sql(self):
         if not self.current_view:
             return None
@@ -779,20 +949,12 @@ class DynamicColumnManage:
         view_name = self.current_view['view_name']
         source_table = self.current_view['source_table']
         
-        select_columns = []
-        for col in self.source_table_columns:
-            sql_expr = self.generate_column_sql(col['name'], col['type'], self.column_protection.get(col['name'], 'VISIBLE'))
-            if sql_expr:
-                select_columns.append(sql_expr)
+        select_columns = self.build_select_columns()
         
         if not select_columns:
             return None
         
-        # ✅ CRITICAL: Preserve RLS WHERE clause if view has RLS
-        where_clause = None
-        if self.rls_users and self.original_view_query:
-            where_clause = self.extract_where_clause(self.original_view_query)
-            print(f"[DEBUG] ✅ Preserving RLS WHERE clause: {where_clause[:100] if where_clause else 'None'}...")
+        where_clause = self.get_rls_where_clause()
         
         # Build SQL
         sql = f"""CREATE OR REPLACE VIEW `{self.project_id}.{self.current_view_dataset}.{view_name}` AS
@@ -813,63 +975,10 @@ FROM `{self.project_id}.{self.source_dataset}.{source_table}`"""
             return
         
         try:
-            from google.cloud.bigquery import AccessEntry
-            
-            source_dataset_ref = client.dataset(self.source_dataset)
-            source_dataset = await run.io_bound(client.get_dataset, source_dataset_ref)
-            
-            access_entries = list(source_dataset.access_entries)
-            
-            authorized_view_entry = AccessEntry(
-                role=None,
-                entity_type='view',
-                entity_id={
-                    'projectId': self.project_id,
-                    'datasetId': self.current_view_dataset,
-                    'tableId': view_name
-                }
-            )
-            
-            view_exists = False
-            for entry in access_entries:
-                if entry.entity_type == 'view' and isinstance(entry.entity_id, dict):
-                    if (entry.entity_id.get('projectId') == self.project_id and
-                        entry.entity_id.get('datasetId') == self.current_view_dataset and
-                        entry.entity_id.get('tableId') == view_name):
-                        view_exists = True
-                        break
-            
-            if not view_exists:
-                access_entries.append(authorized_view_entry)
-            
-            source_dataset.access_entries = access_entries
-            await run.io_bound(client.update_dataset, source_dataset, ['access_entries'])
-            
-            views_dataset_ref = client.dataset(self.current_view_dataset)
-            views_dataset_obj = await run.io_bound(client.get_dataset, views_dataset_ref)
+            registrar = get_view_registrar(self.project_id)
             
-            views_access_entries = list(views_dataset_obj.access_entries)
-            
-            for email in self.authorized_users:
-                user_entry = AccessEntry(
-                    role='READER',
-                    entity_type='userByEmail',
-                    entity_id=email
-                )
-                
-                user_exists = False
-                for entry in views_access_entries:
-                    if (entry.entity_type == 'userByEmail' and 
-                        entry.entity_id == email and 
-                        entry.role == 'READER'):
-                        user_exists = True
-                        break
-                
-                if not user_exists:
-                    views_access_entries.append(user_entry)
-            
-            views_dataset_obj.access_entries = views_access_entries
-            await run.io_bound(client.update_dataset, views_dataset_obj, ['access_entries'])
+            await run.io_bound(registrar.authorize_view, self.source_dataset, self.current_view_dataset, view_name)
+            await run.io_bound(registrar.grant_readers, self.current_view_dataset, self.authorized_users)
             
             ui.notify(
                 f"✅ Authorized view configured!\n"
@@ -883,6 +992,32 @@ FROM `{self.project_id}.{self.source_dataset}.{source_table}`"""
             traceback.print_exc()
             ui.notify(f"⚠️ IAM update error: {str(e)[:300]}", type="warning", timeout=10000)
     
+    async def refresh_snapshot_now(self):
+        """Rebuild the masked snapshot of the view being edited"""
+        if not self.current_view or self.current_view.get('mode') != 'materialized':
+            return
+
+        view_id = f"{self.project_id}.{self.current_view_dataset}.{self.current_view['view_name']}"
+        n = ui.notification('Refreshing snapshot...', spinner=True, timeout=None)
+        try:
+            await run.io_bound(self.materialization_service.refresh, view_id)
+            statuses = await run.io_bound(self.materialization_service.get_status, [view_id])
+            self.snapshot_status = statuses.get(view_id)
+            self.staleness_label.set_text(f"Snapshot: {format_staleness(self.snapshot_status)}")
+
+            self.audit_service.log_action(
+                action='REFRESH_CLS_SNAPSHOT',
+                resource_type='PROTECTED_VIEW',
+                resource_name=f"{self.current_view_dataset}.{self.current_view['view_name']}",
+                status='SUCCESS'
+            )
+            n.dismiss()
+            ui.notify("✅ Snapshot refreshed", type="positive")
+        except Exception as e:
+            n.dismiss()
+            traceback.print_exc()
+            ui.notify(f"❌ Error refreshing snapshot: {e}", type="negative")
+
     async def save_view_changes(self):
         """Save CLS changes (column protection)"""
         if not self.current_view:
@@ -899,9 +1034,26 @@ FROM `{self.project_id}.{self.source_dataset}.{source_table}`"""
             view_name = self.current_view['view_name']
             source_table = self.current_view['source_table']
             
-            sql = self.generate_view_sql()
-            query_job = await run.io_bound(client.query, sql)
-            await run.io_bound(query_job.result)
+            table_ref = client.dataset(self.current_view_dataset).table(view_name)
+            view_id = f"{self.project_id}.{self.current_view_dataset}.{view_name}"
+            materialized = self.mode_toggle.value == 'materialized'
+            
+            if materialized:
+                snapshot_sql, view_sql = await run.io_bound(self.generate_materialized_sql)
+                await run.io_bound(
+                    self.materialization_service.materialize,
+                    view_id,
+                    f"{self.project_id}.{self.source_dataset}.{source_table}",
+                    snapshot_sql,
+                    view_sql,
+                    int(self.refresh_minutes_input.value or 0) * 60,
+                    self.audit_service.user_email
+                )
+            else:
+                sql = self.generate_view_sql()
+                await run.io_bound(metadata_cache.run_ddl, sql, table_ref)
+                if self.current_view.get('mode') == 'materialized':
+                    await run.io_bound(self.materialization_service.dematerialize, view_id)
             
             description_lines = [
                 f"Restricted view from {self.source_dataset}.{source_table}",
@@ -917,12 +1069,18 @@ FROM `{self.project_id}.{self.source_dataset}.{source_table}`"""
                 description_lines.append("")
                 description_lines.append(f"AUTHORIZED_USERS: {', '.join(self.authorized_users)}")
             
+            if materialized:
+                description_lines.append("")
+                description_lines.append("MATERIALIZED_SNAPSHOT: " + json.dumps({
+                    'source_dataset': self.source_dataset,
+                    'source_table': source_table
+                }))
+            
             description = '\n'.join(description_lines)
             
-            table_ref = client.dataset(self.current_view_dataset).table(view_name)
             table = await run.io_bound(client.get_table, table_ref)
             table.description = description
-            await run.io_bound(client.update_table, table, ['description'])
+            await run.io_bound(metadata_cache.update_table, table, ['description'])
             
             if self.authorized_users:
                 await self.grant_view_access(view_name)
@@ -938,6 +1096,7 @@ FROM `{self.project_id}.{self.source_dataset}.{source_table}`"""
                     'views_dataset': self.current_view_dataset,
                     'column_protection': self.column_protection,
                     'authorized_users': self.authorized_users,
+                    'mode': self.mode_toggle.value,
                     'total_columns': len(self.source_table_columns),
                     'visible': len([p for p in self.column_protection.values() if p not in ['HIDDEN']]),
                     'hidden': len([p for p in self.column_protection.values() if p == 'HIDDEN']),
@@ -971,7 +1130,7 @@ FROM `{self.project_id}.{self.source_dataset}.{source_table}`"""
             ui.label('Select source table manually:').classes('mb-4')
             
             try:
-                tables = client.list_tables(self.source_dataset)
+                tables = metadata_cache.list_tables(self.source_dataset)
                 table_names = [t.table_id for t in tables if not any(t.table_id.endswith(s) for s in ['_restricted', '_masked', '_protected'])]
                 
                 if not table_names:
@@ -1031,7 +1190,13 @@ FROM `{self.project_id}.{self.source_dataset}.{source_table}`"""
         for view in views:
             try:
                 table_ref = client.dataset(view['view_dataset']).table(view['view_name'])
-                await run.io_bound(client.delete_table, table_ref)
+                await run.io_bound(metadata_cache.delete_table, table_ref)
+                
+                if view.get('mode') == 'materialized':
+                    await run.io_bound(
+                        self.materialization_service.dematerialize,
+                        f"{self.project_id}.{view['view_dataset']}.{view['view_name']}"
+                    )
                 
                 self.audit_service.log_action(
                     action='DELETE_PROTECTED_VIEW',
@@ -1137,6 +1302,8 @@ FROM `{self.project_id}.{self.source_dataset}.{source_table}`"""
                         {'field': 'masked_count', 'headerName': 'Masked', 'filter': True, 'minWidth': 90},
                         {'field': 'authorized_users', 'headerName': 'CLS Users', 'filter': True, 'minWidth': 90},
                         {'field': 'rls_users', 'headerName': 'RLS Users', 'filter': True, 'minWidth': 90},
+                        {'field': 'mode', 'headerName': 'Mode', 'filter': True, 'minWidth': 110},
+                        {'field': 'staleness', 'headerName': 'Snapshot', 'filter': True, 'minWidth': 200},
                         {'field': 'created', 'headerName': 'Created', 'filter': True, 'minWidth': 140},
                         {'field': 'modified', 'headerName': 'Modified', 'filter': True, 'minWidth': 140},
                     ],
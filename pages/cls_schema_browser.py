@@ -1,92 +1,280 @@
 """
 CLS Schema Browser Page
 Browse BigQuery schemas and view applied policy tags
+
+Only the dataset list is loaded when the page opens; tables are fetched
+when a dataset is expanded and the schema when a table is expanded.
+
+The coverage panel answers project-wide lookups from the in-memory policy
+tag index (services/policy_tag_coverage_service.py), refreshed when the
+panel opens if it is older than COVERAGE_INDEX_MAX_AGE_SECONDS.
 """
 
-from nicegui import ui
+from nicegui import ui, run
 import theme
 from config import Config
 from services.bigquery_cls_service import BigQueryCLSService
+from services.policy_tag_coverage_service import get_coverage_index
 
 
 class CLSSchemaBrowser:
     def __init__(self):
         self.bigquery_service = BigQueryCLSService(Config.PROJECT_ID)
+        
+        # Cache da página (o metadata cache do processo fica por baixo)
+        self.tables_cache = {}   # dataset_id -> list_tables
+        self.details_cache = {}  # (dataset_id, table_id) -> get_table_details
+        self.rendered = set()    # expansões já preenchidas
+        
+        self.datasets_container = None
+        self.coverage_index = get_coverage_index(Config.PROJECT_ID)
     
     def run(self):
         with theme.frame('CLS - Schema Browser'):
             ui.label('🔍 Schema Browser').classes('text-3xl font-bold mb-4')
             ui.label('Browse your BigQuery datasets, tables, and columns with applied policy tags').classes('text-gray-600 mb-6')
             
-            # Get datasets
-            datasets = self.bigquery_service.list_datasets()
+            self.render_coverage()
             
+            self.datasets_container = ui.column().classes('w-full')
+            with self.datasets_container:
+                with ui.row().classes('items-center gap-2'):
+                    ui.spinner(size='sm')
+                    ui.label('Loading datasets...').classes('text-gray-500')
+            
+            ui.timer(0.1, self.load_datasets, once=True)
+    
+    # ==================== COVERAGE ====================
+    
+    def render_coverage(self):
+        with ui.expansion(
+            '🏷️ Policy Tag Coverage',
+            icon='sell',
+            on_value_change=lambda e: self.open_coverage() if e.value else None
+        ).classes('w-full mb-4'):
+            with ui.column().classes('w-full gap-2 p-2'):
+                with ui.row().classes('w-full items-center gap-2'):
+                    self.coverage_search = ui.input(
+                        placeholder='Column name or policy tag resource name...',
+                        on_change=self.search_coverage
+                    ).classes('flex-1').props('outlined dense clearable')
+                    ui.button('REFRESH INDEX', icon='refresh', on_click=lambda: self.refresh_coverage(full=False)).props('flat')
+                    ui.button('REBUILD', icon='build', on_click=lambda: self.refresh_coverage(full=True)).props('flat color=grey')
+                
+                self.coverage_status = ui.label('Index not built yet').classes('text-xs text-gray-500')
+                
+                self.coverage_grid = ui.aggrid({
+                    'columnDefs': [
+                        {'field': 'dataset_id', 'headerName': 'Dataset', 'filter': True, 'minWidth': 200},
+                        {'field': 'tables', 'headerName': 'Tables', 'minWidth': 90},
+                        {'field': 'total_columns', 'headerName': 'Columns', 'minWidth': 100},
+                        {'field': 'tagged_columns', 'headerName': 'Tagged', 'minWidth': 100},
+                        {'field': 'percentage_tagged', 'headerName': '% Tagged', 'minWidth': 100},
+                    ],
+                    'rowData': [],
+                    'defaultColDef': {'sortable': True, 'resizable': True},
+                }).classes('w-full h-64 ag-theme-quartz')
+                
+                self.coverage_results = ui.column().classes('w-full gap-1')
+        
+        if self.coverage_index.refreshed_at is not None:
+            self.update_coverage_view()
+    
+    async def open_coverage(self):
+        """Build the index, or refresh it if older than COVERAGE_INDEX_MAX_AGE_SECONDS"""
+        self.coverage_status.set_text('Refreshing index...')
+        try:
+            await run.io_bound(self.coverage_index.ensure_fresh)
+        except Exception as e:
+            self.coverage_status.set_text(f"❌ Error building index: {e}")
+            return
+        self.update_coverage_view()
+    
+    async def refresh_coverage(self, full=False):
+        n = ui.notification('Building policy tag coverage index...', spinner=True, timeout=None)
+        try:
+            summary = await run.io_bound(self.coverage_index.refresh, full)
+            n.dismiss()
+            self.update_coverage_view()
+            if summary['errors']:
+                ui.notify(f"⚠️ Index refreshed with {len(summary['errors'])} error(s)", type="warning")
+            else:
+                ui.notify(f"✅ {summary['tables_changed']} table(s) re-read in {summary['elapsed_seconds']}s", type="positive")
+        except Exception as e:
+            n.dismiss()
+            ui.notify(f"❌ Error building index: {e}", type="negative")
+    
+    def update_coverage_view(self):
+        coverage = self.coverage_index.dataset_coverage()
+        self.coverage_grid.options['rowData'] = coverage
+        self.coverage_grid.update()
+        self.coverage_status.set_text(
+            f"{len(self.coverage_index.columns)} columns indexed in {len(coverage)} datasets, "
+            f"{len(self.coverage_index.tag_counts())} policy tags in use"
+        )
+        self.search_coverage()
+    
+    def search_coverage(self):
+        self.coverage_results.clear()
+        term = (self.coverage_search.value or '').strip()
+        if not term or self.coverage_index.refreshed_at is None:
+            return
+        
+        if term.startswith('projects/'):
+            columns = self.coverage_index.columns_with_tag(term)
+        else:
+            columns = self.coverage_index.columns_named(term)
+        
+        with self.coverage_results:
+            ui.label(f"{len(columns)} column(s)").classes('text-sm font-bold')
+            rows = [{
+                'column': f"{c['dataset_id']}.{c['table_id']}.{c['field_path']}",
+                'type': c['data_type'],
+                'tags': ', '.join(c['policy_tags']) or '⚪ No tag'
+            } for c in columns[:500]]
+            ui.table(
+                columns=[
+                    {'name': 'column', 'label': 'Column', 'field': 'column', 'align': 'left'},
+                    {'name': 'type', 'label': 'Type', 'field': 'type', 'align': 'left'},
+                    {'name': 'tags', 'label': 'Policy Tags', 'field': 'tags', 'align': 'left'},
+                ],
+                rows=rows,
+                row_key='column'
+            ).classes('w-full')
+    
+    # ==================== DATASETS ====================
+    
+    async def load_datasets(self):
+        datasets = await run.io_bound(self.bigquery_service.list_datasets)
+        
+        self.datasets_container.clear()
+        with self.datasets_container:
             if not datasets:
                 ui.label('⚠️ No datasets found in this project.').classes('text-gray-500')
                 return
             
-            # Browse datasets
             for dataset in datasets:
-                with ui.expansion(f"📁 {dataset['dataset_id']}", icon='folder').classes('w-full'):
-                    with ui.column().classes('gap-2 p-2'):
-                        # Dataset info
-                        ui.label(f"Location: {dataset['location']}").classes('text-sm text-gray-600')
-                        if dataset['description']:
-                            ui.label(f"Description: {dataset['description']}").classes('text-sm text-gray-600')
-                        ui.label(f"Tables: {dataset['table_count']}").classes('text-sm text-gray-600')
-                        
-                        ui.separator()
-                        
-                        # Tables
-                        tables = self.bigquery_service.list_tables(dataset['dataset_id'])
-                        
-                        if tables:
-                            for table in tables:
-                                with ui.expansion(f"  📊 {table['table_id']}", icon='table_chart').classes('w-full'):
-                                    with ui.column().classes('gap-2 p-2'):
-                                        # Table info
-                                        ui.label(f"Type: {table['table_type']}").classes('text-sm text-gray-600')
-                                        ui.label(f"Rows: {table['num_rows']:,}").classes('text-sm text-gray-600')
-                                        if table['description']:
-                                            ui.label(f"Description: {table['description']}").classes('text-sm text-gray-600')
-                                        
-                                        ui.separator()
-                                        
-                                        # Schema
-                                        schema = self.bigquery_service.get_table_schema(
-                                            dataset['dataset_id'],
-                                            table['table_id']
-                                        )
-                                        
-                                        if schema:
-                                            # Statistics
-                                            stats = self.bigquery_service.get_tagged_columns_count(
-                                                dataset['dataset_id'],
-                                                table['table_id']
-                                            )
-                                            
-                                            with ui.card().classes('w-full bg-blue-50 mb-2'):
-                                                ui.label('Column Statistics').classes('font-bold')
-                                                ui.label(f"Total: {stats['total_columns']} | Tagged: {stats['tagged_columns']} ({stats['percentage_tagged']}%)").classes('text-sm')
-                                            
-                                            # Columns table
-                                            columns = [
-                                                {'name': 'name', 'label': 'Column', 'field': 'name', 'align': 'left'},
-                                                {'name': 'type', 'label': 'Type', 'field': 'type', 'align': 'left'},
-                                                {'name': 'mode', 'label': 'Mode', 'field': 'mode', 'align': 'left'},
-                                                {'name': 'tags', 'label': 'Policy Tags', 'field': 'tags', 'align': 'left'},
-                                            ]
-                                            
-                                            rows = []
-                                            for col in schema:
-                                                tag_display = '🏷️ ' + col['policy_tags'][0] if col['policy_tags'] else '⚪ No tag'
-                                                rows.append({
-                                                    'name': col['name'],
-                                                    'type': col['type'],
-                                                    'mode': col['mode'],
-                                                    'tags': tag_display
-                                                })
-                                            
-                                            ui.table(columns=columns, rows=rows, row_key='name').classes('w-full')
-                        else:
-                            ui.label('No tables in this dataset').classes('text-sm text-gray-500')
+                self.render_dataset(dataset)
+    
+    def render_dataset(self, dataset):
+        with ui.expansion(
+            f"📁 {dataset['dataset_id']}",
+            icon='folder',
+            on_value_change=lambda e: self.open_dataset(e.value, dataset['dataset_id'], tables_container)
+        ).classes('w-full'):
+            with ui.column().classes('gap-2 p-2 w-full'):
+                # Dataset info
+                ui.label(f"Location: {dataset['location']}").classes('text-sm text-gray-600')
+                if dataset['description']:
+                    ui.label(f"Description: {dataset['description']}").classes('text-sm text-gray-600')
+                if dataset.get('error'):
+                    ui.label(f"⚠️ Could not load dataset details: {dataset['error']}").classes('text-sm text-orange-600')
+                else:
+                    ui.label(f"Tables: {dataset['table_count']}").classes('text-sm text-gray-600')
+                
+                ui.separator()
+                
+                tables_container = ui.column().classes('w-full gap-1')
+    
+    async def get_tables(self, dataset_id):
+        if dataset_id not in self.tables_cache:
+            self.tables_cache[dataset_id] = await run.io_bound(
+                self.bigquery_service.list_tables, dataset_id, False
+            )
+        return self.tables_cache[dataset_id]
+    
+    async def open_dataset(self, opened, dataset_id, container):
+        if not opened or dataset_id in self.rendered:
+            return
+        self.rendered.add(dataset_id)
+        
+        with container:
+            ui.spinner(size='sm')
+        
+        tables = await self.get_tables(dataset_id)
+        
+        container.clear()
+        with container:
+            if not tables:
+                ui.label('No tables in this dataset').classes('text-sm text-gray-500')
+                return
+            
+            for table in tables:
+                self.render_table(dataset_id, table)
+    
+    # ==================== TABLES ====================
+    
+    def render_table(self, dataset_id, table):
+        with ui.expansion(
+            f"  📊 {table['table_id']}",
+            icon='table_chart',
+            on_value_change=lambda e: self.open_table(e.value, dataset_id, table['table_id'], schema_container)
+        ).classes('w-full'):
+            schema_container = ui.column().classes('gap-2 p-2 w-full')
+    
+    async def get_table_details(self, dataset_id, table_id):
+        key = (dataset_id, table_id)
+        if key not in self.details_cache:
+            self.details_cache[key] = await run.io_bound(
+                self.bigquery_service.get_table_details, dataset_id, table_id
+            )
+        return self.details_cache[key]
+    
+    async def open_table(self, opened, dataset_id, table_id, container):
+        key = (dataset_id, table_id)
+        if not opened or key in self.rendered:
+            return
+        self.rendered.add(key)
+        
+        with container:
+            ui.spinner(size='sm')
+        
+        details = await self.get_table_details(dataset_id, table_id)
+        
+        container.clear()
+        with container:
+            if not details:
+                # Permite tentar de novo ao reabrir
+                self.rendered.discard(key)
+                self.details_cache.pop(key, None)
+                ui.label('⚠️ Could not load table details').classes('text-sm text-orange-600')
+                return
+            
+            # Table info
+            ui.label(f"Type: {details['table_type']}").classes('text-sm text-gray-600')
+            if details['num_rows'] is not None:
+                ui.label(f"Rows: {details['num_rows']:,}").classes('text-sm text-gray-600')
+            if details['description']:
+                ui.label(f"Description: {details['description']}").classes('text-sm text-gray-600')
+            
+            ui.separator()
+            
+            schema = details['schema']
+            if not schema:
+                return
+            
+            # Statistics (do schema já carregado)
+            stats = details['stats']
+            with ui.card().classes('w-full bg-blue-50 mb-2'):
+                ui.label('Column Statistics').classes('font-bold')
+                ui.label(f"Total: {stats['total_columns']} | Tagged: {stats['tagged_columns']} ({stats['percentage_tagged']}%)").classes('text-sm')
+            
+            # Columns table
+            columns = [
+                {'name': 'name', 'label': 'Column', 'field': 'name', 'align': 'left'},
+                {'name': 'type', 'label': 'Type', 'field': 'type', 'align': 'left'},
+                {'name': 'mode', 'label': 'Mode', 'field': 'mode', 'align': 'left'},
+                {'name': 'tags', 'label': 'Policy Tags', 'field': 'tags', 'align': 'left'},
+            ]
+            
+            rows = []
+            for col in schema:
+                tag_display = '🏷️ ' + col['policy_tags'][0] if col['policy_tags'] else '⚪ No tag'
+                rows.append({
+                    'name': col['name'],
+                    'type': col['type'],
+                    'mode': col['mode'],
+                    'tags': tag_display
+                })
+            
+            ui.table(columns=columns, rows=rows, row_key='name').classes('w-full')
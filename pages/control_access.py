@@ -5,7 +5,10 @@ from nicegui import ui, app
 from google.cloud import bigquery
 from datetime import datetime
 import os
-import json
+
+from services.audit_service import log_audit_event
+from services.authorized_users_service import get_authorized_users_service
+from services.client_registry import get_bigquery_client
 
 PROJECT_ID = os.getenv('PROJECT_ID', 'sys-googl-cortex-security')
 
@@ -32,7 +35,7 @@ class ControlAccess:
             
             # Initialize BigQuery client
             try:
-                self.client = bigquery.Client(project=PROJECT_ID)
+                self.client = get_bigquery_client(PROJECT_ID)
             except Exception as e:
                 ui.notification(f'Error connecting to BigQuery: {str(e)}', color='red')
             
@@ -272,6 +275,7 @@ class ControlAccess:
                             )
                             
                             self.client.query(insert_query, job_config=job_config).result()
+                            get_authorized_users_service(PROJECT_ID).invalidate()
                             
                             # Log the action
                             self.log_audit('USER_ADDED', current_user_info.get('email', ''), 
@@ -402,6 +406,7 @@ class ControlAccess:
                 )
                 
                 self.client.query(update_query, job_config=job_config).result()
+                get_authorized_users_service(PROJECT_ID).invalidate()
                 ui.notify(f'User {email} updated successfully', color='green')
         except Exception as e:
             ui.notify(f'Error updating user: {str(e)}', color='red')
@@ -438,37 +443,21 @@ class ControlAccess:
                 )
                 
                 self.client.query(delete_query, job_config=job_config).result()
+                get_authorized_users_service(PROJECT_ID).invalidate()
                 ui.notify(f'User {email} deleted successfully', color='green')
         except Exception as e:
             ui.notify(f'Error deleting user: {str(e)}', color='red')
     
     def log_audit(self, action, user_email, details, status):
-        """Log action to audit logs"""
-        try:
-            if self.client:
-                audit_query = """
-                    INSERT INTO `sys-googl-cortex-security.rls_manager.audit_logs`
-                    (timestamp, user_email, action, resource_type, resource_name, 
-                     taxonomy, details, status, error_message)
-                    VALUES
-                    (CURRENT_TIMESTAMP(), @email, @action, 'USER_MANAGEMENT', 'CONTROL_ACCESS',
-                     NULL, PARSE_JSON(@details), @status, NULL)
-                """
-                
-                details_json = json.dumps({
-                    'description': details,
-                    'timestamp': datetime.now().isoformat()
-                })
-                
-                job_config = bigquery.QueryJobConfig(
-                    query_parameters=[
-                        bigquery.ScalarQueryParameter("email", "STRING", user_email),
-                        bigquery.ScalarQueryParameter("action", "STRING", action),
-                        bigquery.ScalarQueryParameter("details", "STRING", details_json),
-                        bigquery.ScalarQueryParameter("status", "STRING", status)
-                    ]
-                )
-                
-                self.client.query(audit_query, job_config=job_config).result()
-        except Exception as e:
-            print(f"Error logging audit: {str(e)}")
+        """Log action to audit logs (queued, streamed in batches by AuditWriter)"""
+        log_audit_event(
+            action=action,
+            resource_type='USER_MANAGEMENT',
+            resource_name='CONTROL_ACCESS',
+            user_email=user_email,
+            status=status,
+            details={
+                'description': details,
+                'timestamp': datetime.now().isoformat()
+            }
+        )
@@ -30,13 +30,18 @@ from google.cloud import bigquery
 from google.cloud.exceptions import NotFound
 from google.api_core.exceptions import GoogleAPIError
 from services.audit_service import AuditService
+from services.client_registry import lazy_bigquery_client
+from services.metadata_cache_service import get_metadata_cache
+from services.authorized_view_registrar import get_view_registrar
+from services.entitlements_service import build_rls_filter, is_compiled_mode, sync_entitlements
 import json
 
 
 config = Config()
 r = RandomWord()
 
-client = bigquery.Client(project=config.PROJECT_ID)
+client = lazy_bigquery_client(config.PROJECT_ID)
+metadata_cache = get_metadata_cache(config.PROJECT_ID)
 
 
 class RLSCreateforGroups:
@@ -97,7 +102,7 @@ class RLSCreateforGroups:
 
     def get_datasets(self):
         try:
-            datasets = list(client.list_datasets())
+            datasets = metadata_cache.list_datasets()
             # Filter out _views datasets
             return [dataset.dataset_id for dataset in datasets if not dataset.dataset_id.endswith('_views')]
         except GoogleAPIError as e:
@@ -113,7 +118,7 @@ class RLSCreateforGroups:
             return
 
         try:
-            tables = client.list_tables(self.selected_dataset)
+            tables = metadata_cache.list_tables(self.selected_dataset)
             table_ids = [table.table_id for table in tables]
             self.table_list.options = table_ids
             self.table_list.value = None  
@@ -134,7 +139,7 @@ class RLSCreateforGroups:
 
         try:
             table_ref = client.dataset(self.selected_dataset).table(self.selected_table)
-            table = client.get_table(table_ref)
+            table = metadata_cache.get_table(table_ref)
             fields = [[schema_field.name, schema_field.field_type, schema_field.description] for schema_field in table.schema]
             self.field_list.options = fields
             self.field_list.value = None 
@@ -159,7 +164,7 @@ class RLSCreateforGroups:
             dataset = bigquery.Dataset(f"{self.project_id}.{self.views_dataset}")
             dataset.location = "US"  # Adjust if needed
             dataset.description = f"RLS/CLS views for {self.selected_dataset}"
-            client.create_dataset(dataset, timeout=30)
+            metadata_cache.create_dataset(dataset, timeout=30)
             ui.notify(f"✅ Created views dataset: {self.views_dataset}", type="positive", timeout=3000)
 
     def get_resume(self):
@@ -206,17 +211,7 @@ class RLSCreateforGroups:
             f"CREATE OR REPLACE VIEW `{self.project_id}.{self.views_dataset}.{self.view_name}` AS\n"
             f"SELECT *\n"
             f"FROM `{self.project_id}.{self.selected_dataset}.{self.selected_table}`\n"
-            f"WHERE {self.selected_field[0]} IN (\n"
-            f"  SELECT CAST(filter_value AS {self.selected_field[1]})\n"
-            f"  FROM `{config.FILTER_TABLE}`\n"
-            f"  WHERE rls_type = 'group'\n"
-            f"    AND policy_name = '{self.policy_name}'\n"
-            f"    AND project_id = '{self.project_id}'\n"
-            f"    AND dataset_id = '{self.selected_dataset}'\n"
-            f"    AND table_id = '{self.selected_table}'\n"
-            f"    AND field_id = '{self.selected_field[0]}'\n"
-            f"    AND rls_group = '{self.group_assignment}'\n"
-            f");\n\n"
+            f"WHERE {build_rls_filter(self.selected_field[0], self.selected_field[1], 'group', self.project_id, self.selected_dataset, self.selected_table, policy_name=self.policy_name, group=self.group_assignment)};\n\n"
             f"-- Note: View uses dynamic filtering for group members\n"
             f"-- Assign filter values via 'Assign Values to Group'\n"
             f"-- Access control: Only members of {self.group_assignment} can query this view"
@@ -234,14 +229,19 @@ class RLSCreateforGroups:
             # ✅ Notificação de progresso
             ui.notify("Executing SQL...", type="ongoing", timeout=2000)
             
+            # Compiled entitlements: the view reads rls_entitlements, so compile
+            # existing values of this group before creating it
+            sync_entitlements(self.project_id, self.selected_dataset, self.selected_table,
+                              self.selected_field[0], 'group', [self.group_assignment],
+                              field_type=self.selected_field[1])
+            
             # ✅ CORRECTED: Create ONLY the view (no ROW ACCESS POLICY)
-            query_job = client.query(self.code.content)
-            query_job.result()
+            view_ref = client.dataset(self.views_dataset).table(self.view_name)
+            metadata_cache.run_ddl(self.code.content, view_ref)
             
             ui.notify("Configuring view metadata...", type="ongoing", timeout=2000)
             
             # Update view description with metadata
-            view_ref = client.dataset(self.views_dataset).table(self.view_name)
             view = client.get_table(view_ref)
             
             rls_metadata = {
@@ -252,6 +252,7 @@ class RLSCreateforGroups:
                 "filter_field": self.selected_field[0],
                 "filter_field_type": self.selected_field[1],
                 "filter_table": config.FILTER_TABLE,
+                "compiled_entitlements": is_compiled_mode(),
                 "group_email": self.group_assignment,
                 "created_by": "CREATE_RLS_GROUPS",
                 "policy_name": self.policy_name
@@ -263,42 +264,13 @@ class RLSCreateforGroups:
                 f"Base table: {self.selected_dataset}.{self.selected_table}\n\n"
                 f"RLS_METADATA:{json.dumps(rls_metadata)}"
             )
-            client.update_table(view, ['description'])
-            
-            # Configure as Authorized View
-            from google.cloud.bigquery import AccessEntry
-            
-            source_dataset_ref = client.dataset(self.selected_dataset)
-            source_dataset = client.get_dataset(source_dataset_ref)
+            metadata_cache.update_table(view, ['description'])
             
-            access_entries = list(source_dataset.access_entries)
-            
-            authorized_view_entry = AccessEntry(
-                role=None,
-                entity_type='view',
-                entity_id={
-                    'projectId': self.project_id,
-                    'datasetId': self.views_dataset,
-                    'tableId': self.view_name
-                }
+            # Configure as Authorized View (coalesced per source dataset)
+            get_view_registrar(self.project_id).authorize_view(
+                self.selected_dataset, self.views_dataset, self.view_name
             )
             
-            # Check if already exists
-            view_exists = False
-            for entry in access_entries:
-                if entry.entity_type == 'view' and isinstance(entry.entity_id, dict):
-                    if (entry.entity_id.get('projectId') == self.project_id and
-                        entry.entity_id.get('datasetId') == self.views_dataset and
-                        entry.entity_id.get('tableId') == self.view_name):
-                        view_exists = True
-                        break
-            
-            if not view_exists:
-                access_entries.append(authorized_view_entry)
-            
-            source_dataset.access_entries = access_entries
-            client.update_dataset(source_dataset, ['access_entries'])
-            
             # Insert into policy table (for backward compatibility)
             # ✅ FIXED: Use ORIGINAL dataset/table (not view dataset/name)
             query_insert_into_policy_table = f"""
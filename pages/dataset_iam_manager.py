@@ -1,14 +1,17 @@
 import theme
 from config import Config
 from nicegui import ui, run
-from google.cloud import bigquery
 from google.cloud.bigquery import AccessEntry
 from services.audit_service import AuditService
+from services.client_registry import lazy_bigquery_client
+from services.dataset_inventory_service import DatasetInventoryService
+from services.metadata_cache_service import get_metadata_cache
 import traceback
 from datetime import datetime
 
 config = Config()
-client = bigquery.Client(project=config.PROJECT_ID)
+client = lazy_bigquery_client(config.PROJECT_ID)
+metadata_cache = get_metadata_cache(config.PROJECT_ID)
 
 
 class DatasetIAMManager:
@@ -122,78 +125,104 @@ class DatasetIAMManager:
                 ui.button('CLOSE', on_click=self.edit_dialog.close).props('flat')
                 ui.button('REFRESH', icon='refresh', on_click=self.refresh_edit_permissions).props('color=primary')
     
-    def get_datasets(self):
-        """Lista todos os datasets"""
-        try:
-            datasets_list = client.list_datasets()
-            datasets = []
-            
-            for ds in datasets_list:
-                dataset_id = ds.dataset_id
-                
-                # Verificar se é dataset de views
-                is_views_dataset = dataset_id.endswith('_views')
-                
-                # Obter detalhes do dataset
-                dataset_ref = client.dataset(dataset_id)
-                dataset_obj = client.get_dataset(dataset_ref)
-                
-                # Contar usuários
-                user_count = 0
-                owner_count = 0
-                authorized_views_count = 0
-                
-                for entry in dataset_obj.access_entries:
-                    if entry.entity_type == 'userByEmail':
-                        user_count += 1
-                        if entry.role == 'OWNER':
-                            owner_count += 1
-                    elif entry.entity_type == 'view':
-                        authorized_views_count += 1
-                
-                # Status de segurança
-                if is_views_dataset:
-                    security_status = '✅ Views Dataset'
-                elif user_count == 0:
-                    security_status = '✅ No Direct Access'
-                elif authorized_views_count > 0:
-                    security_status = '🔐 Has Authorized Views'
-                else:
-                    security_status = '⚠️ Has Direct Access'
-                
-                datasets.append({
-                    'dataset_id': dataset_id,
-                    'type': 'Views' if is_views_dataset else 'Source',
-                    'users': user_count,
-                    'owners': owner_count,
-                    'authorized_views': authorized_views_count,
-                    'security_status': security_status,
-                    'created': dataset_obj.created.strftime('%Y-%m-%d %H:%M') if dataset_obj.created else 'Unknown'
-                })
-            
-            return datasets
-            
-        except Exception as e:
-            print(f"[ERROR] get_datasets: {e}")
-            traceback.print_exc()
-            ui.notify(f"Error: {e}", type="negative")
-            return []
+    def build_dataset_row(self, dataset):
+        """Linha do grid a partir de um registro do inventário"""
+        dataset_id = dataset['dataset_id']
+        
+        # Verificar se é dataset de views
+        is_views_dataset = dataset_id.endswith('_views')
+        
+        if dataset['error']:
+            return {
+                'dataset_id': dataset_id,
+                'type': 'Views' if is_views_dataset else 'Source',
+                'users': None,
+                'owners': None,
+                'authorized_views': None,
+                'security_status': f"❌ Error: {dataset['error'][:100]}",
+                'created': 'Unknown'
+            }
+        
+        # Contar usuários
+        user_count = 0
+        owner_count = 0
+        authorized_views_count = 0
+        
+        for entry in dataset['access_entries']:
+            if entry.entity_type == 'userByEmail':
+                user_count += 1
+                if entry.role == 'OWNER':
+                    owner_count += 1
+            elif entry.entity_type == 'view':
+                authorized_views_count += 1
+        
+        # Status de segurança
+        if is_views_dataset:
+            security_status = '✅ Views Dataset'
+        elif user_count == 0:
+            security_status = '✅ No Direct Access'
+        elif authorized_views_count > 0:
+            security_status = '🔐 Has Authorized Views'
+        else:
+            security_status = '⚠️ Has Direct Access'
+        
+        return {
+            'dataset_id': dataset_id,
+            'type': 'Views' if is_views_dataset else 'Source',
+            'users': user_count,
+            'owners': owner_count,
+            'authorized_views': authorized_views_count,
+            'security_status': security_status,
+            'created': dataset['created'].strftime('%Y-%m-%d %H:%M') if dataset['created'] else 'Unknown'
+        }
     
-    def load_datasets(self):
-        """Carrega datasets no grid"""
+    def get_datasets(self, on_row=None):
+        """
+        Lista todos os datasets (get_dataset em paralelo)
+        
+        on_row é chamado com cada linha assim que o dataset chega.
+        Retorna (linhas ordenadas por dataset_id, número de datasets com erro).
+        """
+        def add_row(dataset):
+            if on_row:
+                on_row(self.build_dataset_row(dataset))
+        
+        inventory = DatasetInventoryService(self.project_id).inventory(on_result=add_row)
+        return [self.build_dataset_row(d) for d in inventory['datasets']], len(inventory['errors'])
+    
+    async def load_datasets(self):
+        """Carrega datasets no grid (linhas aparecem conforme chegam)"""
         n = ui.notification('Loading datasets...', spinner=True, timeout=None)
         
+        partial_rows = []
+        
+        def push_partial_rows():
+            if self.datasets_grid and len(partial_rows) != len(self.datasets_grid.options['rowData']):
+                self.datasets_grid.options['rowData'] = list(partial_rows)
+                self.datasets_grid.update()
+                n.message = f'Loading datasets... ({len(partial_rows)})'
+        
+        timer = ui.timer(0.5, push_partial_rows)
+        
         try:
-            self.datasets = self.get_datasets()
+            self.datasets, error_count = await run.io_bound(self.get_datasets, partial_rows.append)
+            timer.cancel()
             
             if self.datasets_grid:
                 self.datasets_grid.options['rowData'] = self.datasets
                 self.datasets_grid.update()
             
             n.dismiss()
-            ui.notify(f"✅ Loaded {len(self.datasets)} datasets", type="positive")
+            if error_count:
+                ui.notify(
+                    f"⚠️ Loaded {len(self.datasets)} datasets ({error_count} could not be read)",
+                    type="warning"
+                )
+            else:
+                ui.notify(f"✅ Loaded {len(self.datasets)} datasets", type="positive")
             
         except Exception as e:
+            timer.cancel()
             n.dismiss()
             ui.notify(f"Error: {e}", type="negative")
             traceback.print_exc()
@@ -449,7 +478,7 @@ class DatasetIAMManager:
             
             access_entries.append(new_entry)
             dataset_obj.access_entries = access_entries
-            await run.io_bound(client.update_dataset, dataset_obj, ['access_entries'])
+            await run.io_bound(metadata_cache.update_dataset, dataset_obj, ['access_entries'])
             
             # Audit log
             self.audit_service.log_action(
@@ -471,7 +500,7 @@ class DatasetIAMManager:
             
             # Refresh
             await self.load_edit_users()
-            self.load_datasets()
+            await self.load_datasets()
             
         except Exception as e:
             n.dismiss()
@@ -517,7 +546,7 @@ class DatasetIAMManager:
             ]
             
             dataset_obj.access_entries = new_entries
-            await run.io_bound(client.update_dataset, dataset_obj, ['access_entries'])
+            await run.io_bound(metadata_cache.update_dataset, dataset_obj, ['access_entries'])
             
             # Audit log
             self.audit_service.log_action(
@@ -536,7 +565,7 @@ class DatasetIAMManager:
             
             # Refresh
             await self.load_edit_users()
-            self.load_datasets()
+            await self.load_datasets()
             
         except Exception as e:
             n.dismiss()
@@ -593,8 +622,8 @@ class DatasetIAMManager:
                         on_click=lambda: self.edit_permissions()
                     ).props('color=secondary')
                 
-                # Carregar datasets ao iniciar
-                self.load_datasets()
+                # Carregar datasets ao iniciar (fora do build da página)
+                ui.timer(0.1, self.load_datasets, once=True)
     
     def run(self):
         pass
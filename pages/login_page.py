@@ -4,9 +4,7 @@ Página de Login - Apenas Callback (Login HTML é servido pelo main.py)
 from nicegui import ui, app
 import os
 import requests
-from google.cloud import bigquery
 from datetime import datetime
-import json
 
 # --- CONFIGURAÇÕES ---
 GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
@@ -26,6 +24,9 @@ def create_login_page():
     # --- PÁGINA DE CALLBACK ---
     @ui.page('/callback')
     def callback_page(code: str = None, error: str = None):
+        # Imports adiados: carregam o SDK do BigQuery só no primeiro login
+        from services.audit_service import log_audit_event
+        from services.authorized_users_service import get_authorized_users_service
         
         # CSS do fundo hexagonal
         ui.add_head_html('''
@@ -157,19 +158,10 @@ def create_login_page():
                                 ui.button('Back', on_click=lambda: ui.run_javascript('window.location.href = "/login"'))
                         return
                     
-                    client = bigquery.Client(project=PROJECT_ID)
-                    query = """
-                        SELECT user_id, name, role, department, company, is_active
-                        FROM `sys-googl-cortex-security.rls_manager.authorized_users`
-                        WHERE email = @email
-                        LIMIT 1
-                    """
-                    job_config = bigquery.QueryJobConfig(
-                        query_parameters=[bigquery.ScalarQueryParameter("email", "STRING", email)]
-                    )
-                    results = list(client.query(query, job_config=job_config).result())
+                    # Lookup servido pelo cache de authorized_users (client compartilhado)
+                    user_data = get_authorized_users_service(PROJECT_ID).get_user(email)
                     
-                    if not results:
+                    if not user_data:
                         loading_container.clear()
                         with loading_container:
                             with ui.card().classes('glass-card').style('padding: 2rem; max-width: 500px; border-color: rgba(249, 115, 22, 0.5);'):
@@ -179,8 +171,7 @@ def create_login_page():
                                 ui.button('Back', on_click=lambda: ui.run_javascript('window.location.href = "/login"'))
                         return
                     
-                    user_data = results[0]
-                    if not user_data.is_active:
+                    if not user_data.get('is_active'):
                         loading_container.clear()
                         with loading_container:
                             with ui.card().classes('glass-card').style('padding: 2rem; max-width: 500px; border-color: rgba(239, 68, 68, 0.5);'):
@@ -189,42 +180,31 @@ def create_login_page():
                                 ui.button('Back', on_click=lambda: ui.run_javascript('window.location.href = "/login"'))
                         return
                     
-                    # Atualiza last_login
-                    update_query = """
-                        UPDATE `sys-googl-cortex-security.rls_manager.authorized_users`
-                        SET last_login = CURRENT_TIMESTAMP()
-                        WHERE email = @email
-                    """
-                    client.query(update_query, job_config=job_config).result()
-                    
-                    # Registra no audit log
-                    audit_details = json.dumps({
-                        "user_name": user_data.name or user_info.get('name', ''),
-                        "user_role": user_data.role,
-                        "login_method": "Google OAuth"
-                    })
+                    # Atualiza last_login em background (MERGE em lote)
+                    get_authorized_users_service(PROJECT_ID).record_login(email)
                     
-                    audit_query = """
-                        INSERT INTO `sys-googl-cortex-security.rls_manager.audit_logs`
-                        (timestamp, user_email, action, resource_type, resource_name, details, status)
-                        VALUES
-                        (CURRENT_TIMESTAMP(), @email, 'USER_LOGIN', 'AUTH', 'LOGIN_SYSTEM', PARSE_JSON(@details), 'SUCCESS')
-                    """
-                    audit_job_config = bigquery.QueryJobConfig(
-                        query_parameters=[
-                            bigquery.ScalarQueryParameter("email", "STRING", email),
-                            bigquery.ScalarQueryParameter("details", "STRING", audit_details)
-                        ]
+                    # Registra no audit log (enfileirado, o login não espera a gravação)
+                    log_audit_event(
+                        action='USER_LOGIN',
+                        resource_type='AUTH',
+                        resource_name='LOGIN_SYSTEM',
+                        user_email=email,
+                        status='SUCCESS',
+                        details={
+                            "user_name": user_data.get('name') or user_info.get('name', ''),
+                            "user_role": user_data.get('role'),
+                            "login_method": "Google OAuth"
+                        },
+                        project_id=PROJECT_ID
                     )
-                    client.query(audit_query, job_config=audit_job_config).result()
                     
                     # Salva na sessão
                     app.storage.user['authenticated'] = True
                     app.storage.user['user_info'] = {
-                        'user_id': user_data.user_id,
+                        'user_id': user_data.get('user_id'),
                         'email': email,
-                        'name': user_data.name or user_info.get('name', email),
-                        'role': user_data.role,
+                        'name': user_data.get('name') or user_info.get('name', email),
+                        'role': user_data.get('role'),
                         'picture': user_info.get('picture', '')
                     }
                     
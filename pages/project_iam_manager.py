@@ -1,10 +1,10 @@
 import theme
 from config import Config
 from nicegui import ui, run
-from google.cloud import resourcemanager_v3
 from google.iam.v1 import iam_policy_pb2 as iam_policy
 from google.iam.v1 import policy_pb2
 from services.audit_service import AuditService
+from services.client_registry import get_projects_client
 import traceback
 import asyncio
 
@@ -192,7 +192,7 @@ class ProjectIAMManager:
         print(f"{'='*80}")
         
         try:
-            client = resourcemanager_v3.ProjectsClient()
+            client = get_projects_client()
             resource_name = f"projects/{self.project_id}"
             
             print(f"[DEBUG] 📋 Resource: {resource_name}")
@@ -456,7 +456,7 @@ class ProjectIAMManager:
         n = ui.notification(f'Adding {role}...', spinner=True, timeout=None)
         
         try:
-            client = resourcemanager_v3.ProjectsClient()
+            client = get_projects_client()
             resource = f"projects/{self.project_id}"
             
             request = iam_policy.GetIamPolicyRequest(resource=resource)
@@ -533,7 +533,7 @@ class ProjectIAMManager:
         n = ui.notification('Removing...', spinner=True, timeout=None)
         
         try:
-            client = resourcemanager_v3.ProjectsClient()
+            client = get_projects_client()
             resource = f"projects/{self.project_id}"
             
             request = iam_policy.GetIamPolicyRequest(resource=resource)
@@ -600,7 +600,7 @@ class ProjectIAMManager:
             
             print(f"[DEBUG] 📝 Member: {member}")
             
-            client = resourcemanager_v3.ProjectsClient()
+            client = get_projects_client()
             resource = f"projects/{self.project_id}"
             
             request = iam_policy.GetIamPolicyRequest(resource=resource)
@@ -10,11 +10,24 @@
   
   Description:
   Service layer package initialization. Exports DataCatalog and BigQuery CLS
-  services for centralized data security operations.
+  services for centralized data security operations (loaded on first access).
 ================================================================================
 """
 
-from .datacatalog_service import DataCatalogService
-from .bigquery_cls_service import BigQueryCLSService
+import importlib
+
+# Exports resolvidos sob demanda: importar qualquer services.* não deve
+# carregar datacatalog_v1 / bigquery no startup
+_LAZY_EXPORTS = {
+    'DataCatalogService': '.datacatalog_service',
+    'BigQueryCLSService': '.bigquery_cls_service',
+}
 
 __all__ = ['DataCatalogService', 'BigQueryCLSService']
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module = importlib.import_module(_LAZY_EXPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,253 @@
+"""
+Assignment Import Service
+Bulk import of (identity, filter_value) assignments into policies_filters
+
+The uploaded CSV/Parquet file is read in chunks, validated and deduplicated
+locally, written to a newline-delimited JSON staging file and loaded into a
+temporary table with a (free) load job. A single MERGE then inserts the rows
+that don't exist yet in policies_filters, so 100k assignments cost one load
+job + one DML job instead of 100k DML jobs.
+
+File columns:
+    identity (or email)  - required
+    filter_value         - optional, empty = all data
+    type                 - optional: user | group | service_account (default user)
+"""
+
+from google.cloud import bigquery
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List
+import csv
+import io
+import json
+import os
+import tempfile
+import uuid
+
+from config import Config
+from services.client_registry import get_bigquery_client
+
+# identity type -> (rls_type, column in policies_filters)
+IDENTITY_TYPES = {
+    'user': ('users', 'username'),
+    'group': ('group', 'rls_group'),
+    'service_account': ('users', 'username'),  # SAs are treated as users
+}
+
+STAGING_SCHEMA = [
+    bigquery.SchemaField('rls_type', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('identity_column', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('identity', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('filter_value', 'STRING', mode='REQUIRED'),
+]
+
+MAX_REPORTED_ERRORS = 50
+
+
+class AssignmentImportService:
+    def __init__(self, project_id: str, chunk_size: int = 10000):
+        self.project_id = project_id
+        self.client = get_bigquery_client(project_id)
+        self.chunk_size = chunk_size
+        self.staging_dataset = f"{project_id}.{Config.RLS_MANAGER_DATASET}"
+
+    # ==================== READING ====================
+
+    def _iter_csv_chunks(self, fileobj) -> Iterator[List[Dict]]:
+        text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+        reader = csv.DictReader(text)
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _iter_parquet_chunks(self, fileobj) -> Iterator[List[Dict]]:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet import requires pyarrow (pip install pyarrow)")
+
+        parquet_file = pq.ParquetFile(fileobj)
+        for batch in parquet_file.iter_batches(batch_size=self.chunk_size):
+            yield batch.to_pylist()
+
+    def iter_chunks(self, fileobj, file_name: str) -> Iterator[List[Dict]]:
+        """Yield the file as lists of row dicts, chunk_size rows at a time"""
+        if file_name.lower().endswith('.parquet'):
+            return self._iter_parquet_chunks(fileobj)
+        if file_name.lower().endswith('.csv'):
+            return self._iter_csv_chunks(fileobj)
+        raise ValueError(f"Unsupported file type: {file_name} (use .csv or .parquet)")
+
+    # ==================== VALIDATION ====================
+
+    @staticmethod
+    def normalize_row(row: Dict):
+        """
+        Validate one input row
+
+        Returns:
+            (rls_type, identity_column, identity, filter_value) or raises ValueError
+        """
+        row = {str(k).strip().lower(): v for k, v in row.items() if k is not None}
+
+        identity = str(row.get('identity') or row.get('email') or '').strip()
+        if not identity or '@' not in identity:
+            raise ValueError(f"invalid identity '{identity}'")
+
+        identity_type = str(row.get('type') or 'user').strip().lower().replace(' ', '_')
+        if identity_type not in IDENTITY_TYPES:
+            raise ValueError(f"invalid type '{identity_type}'")
+
+        filter_value = row.get('filter_value')
+        filter_value = '' if filter_value is None else str(filter_value).strip()
+
+        rls_type, identity_column = IDENTITY_TYPES[identity_type]
+        return rls_type, identity_column, identity, filter_value
+
+    # ==================== IMPORT ====================
+
+    def import_assignments(
+        self,
+        fileobj,
+        file_name: str,
+        policy_name: str,
+        dataset_id: str,
+        table_id: str,
+        field_id: str,
+        progress: Callable[[float, str], None] = None
+    ) -> Dict:
+        """
+        Import an uploaded CSV/Parquet file into policies_filters
+
+        Args:
+            fileobj: binary file object positioned at the start
+            progress: optional callback(fraction 0..1, message)
+
+        Returns:
+            Dict with read / invalid / duplicates / staged / inserted counts
+            and the first MAX_REPORTED_ERRORS validation errors
+        """
+        def report(fraction, message):
+            print(f"[DEBUG] import {file_name}: {message}")
+            if progress:
+                progress(fraction, message)
+
+        result = {
+            'read': 0, 'invalid': 0, 'duplicates': 0, 'staged': 0, 'inserted': 0, 'errors': []
+        }
+
+        seen = set()
+        staging_file = tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False, encoding='utf-8')
+
+        try:
+            # 1. Read, validate and dedupe in chunks -> NDJSON staging file
+            report(0.0, "Reading file...")
+            with staging_file:
+                for chunk in self.iter_chunks(fileobj, file_name):
+                    for row in chunk:
+                        result['read'] += 1
+                        try:
+                            key = self.normalize_row(row)
+                        except ValueError as e:
+                            result['invalid'] += 1
+                            if len(result['errors']) < MAX_REPORTED_ERRORS:
+                                result['errors'].append(f"row {result['read']}: {e}")
+                            continue
+
+                        if key in seen:
+                            result['duplicates'] += 1
+                            continue
+                        seen.add(key)
+
+                        rls_type, identity_column, identity, filter_value = key
+                        staging_file.write(json.dumps({
+                            'rls_type': rls_type,
+                            'identity_column': identity_column,
+                            'identity': identity,
+                            'filter_value': filter_value
+                        }) + '\n')
+
+                    report(0.4, f"Validated {result['read']:,} rows ({len(seen):,} unique)")
+
+            result['staged'] = len(seen)
+            if not seen:
+                report(1.0, "Nothing to import")
+                return result
+
+            # 2. Load job into a temporary staging table (load jobs are free)
+            staging_table = f"{self.staging_dataset}._assignment_import_{uuid.uuid4().hex[:12]}"
+            report(0.5, f"Loading {result['staged']:,} rows into staging table...")
+
+            # Created with an expiration first, so a crash before the cleanup
+            # below doesn't leave the table behind
+            table = bigquery.Table(staging_table, schema=STAGING_SCHEMA)
+            table.expires = datetime.now(timezone.utc) + timedelta(hours=1)
+            self.client.create_table(table)
+
+            try:
+                job_config = bigquery.LoadJobConfig(
+                    source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+                    schema=STAGING_SCHEMA,
+                    write_disposition=bigquery.WriteDisposition.WRITE_APPEND
+                )
+                with open(staging_file.name, 'rb') as f:
+                    self.client.load_table_from_file(f, staging_table, job_config=job_config).result()
+
+                # 3. One MERGE: insert only assignments that don't exist yet
+                report(0.75, "Merging into policies_filters...")
+                inserted = self._merge_staging_table(staging_table, policy_name, dataset_id, table_id, field_id)
+                result['inserted'] = inserted
+            finally:
+                self.client.delete_table(staging_table, not_found_ok=True)
+
+            report(1.0, f"Imported {result['inserted']:,} new assignment(s)")
+            return result
+
+        finally:
+            try:
+                os.remove(staging_file.name)
+            except OSError:
+                pass
+
+    def _merge_staging_table(self, staging_table: str, policy_name: str,
+                             dataset_id: str, table_id: str, field_id: str) -> int:
+        merge_query = f"""
+        MERGE `{Config.FILTER_TABLE}` T
+        USING `{staging_table}` S
+        ON T.project_id = @project_id
+           AND T.dataset_id = @dataset_id
+           AND T.table_id = @table_id
+           AND T.rls_type = S.rls_type
+           AND (
+             (S.identity_column = 'username' AND T.username = S.identity)
+             OR (S.identity_column = 'rls_group' AND T.rls_group = S.identity)
+           )
+           AND COALESCE(T.filter_value, '') = S.filter_value
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT (rls_type, policy_name, project_id, dataset_id, table_id,
+                    field_id, filter_value, username, rls_group, created_at)
+            VALUES (S.rls_type, @policy_name, @project_id, @dataset_id, @table_id,
+                    @field_id, S.filter_value,
+                    IF(S.identity_column = 'username', S.identity, NULL),
+                    IF(S.identity_column = 'rls_group', S.identity, NULL),
+                    CURRENT_TIMESTAMP())
+        """
+
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("project_id", "STRING", self.project_id),
+                bigquery.ScalarQueryParameter("policy_name", "STRING", policy_name),
+                bigquery.ScalarQueryParameter("dataset_id", "STRING", dataset_id),
+                bigquery.ScalarQueryParameter("table_id", "STRING", table_id),
+                bigquery.ScalarQueryParameter("field_id", "STRING", field_id),
+            ]
+        )
+
+        job = self.client.query(merge_query, job_config=job_config)
+        job.result()
+        return job.num_dml_affected_rows or 0
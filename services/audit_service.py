@@ -3,17 +3,294 @@ Audit Service
 Handles audit logging for all security operations
 """
 
-from google.cloud import bigquery
 from datetime import datetime
+from typing import Dict, List
 import json
 import os
+import queue
+import threading
+import time
+
+from config import Config
+from services.client_registry import get_bigquery_client
+
+
+class AuditWriter:
+    """
+    Background writer for audit rows
+    
+    Rows are queued in memory and streamed with insert_rows_json in batches,
+    when the batch is full or the flush interval expires. Failed rows are
+    retried with exponential backoff; whatever still can't be delivered is
+    appended to a local JSONL spill file and re-sent on the next start.
+    """
+    
+    def __init__(self, project_id: str, table_id: str = None):
+        self.project_id = project_id
+        self.table_id = table_id or f"{project_id}.rls_manager.audit_logs"
+        self.client = None  # created by the writer thread on first flush
+        
+        self.batch_size = Config.AUDIT_BATCH_SIZE
+        self.flush_interval = Config.AUDIT_FLUSH_INTERVAL_SECONDS
+        self.max_retries = Config.AUDIT_MAX_RETRIES
+        self.spill_file = Config.AUDIT_SPILL_FILE
+        
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        
+        # Counters
+        self.enqueued = 0
+        self.flushed = 0
+        self.failed = 0
+        self.spilled = 0
+        self.flush_count = 0
+        self.last_flush_latency_ms = 0.0
+        self.max_flush_latency_ms = 0.0
+        self.total_flush_latency_ms = 0.0
+    
+    # ==================== LIFECYCLE ====================
+    
+    def start(self):
+        """Start the writer thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+        print(f"[DEBUG] Audit writer started (batch={self.batch_size}, interval={self.flush_interval}s)")
+    
+    def stop(self, timeout: float = 10.0):
+        """Stop the writer thread and flush everything still queued"""
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        # Anything left behind (thread never started / join timed out)
+        self.flush()
+        print(f"[DEBUG] Audit writer stopped: {self.stats()}")
+    
+    def enqueue(self, row: Dict):
+        """Queue a row and return immediately"""
+        self._queue.put(row)
+        with self._lock:
+            self.enqueued += 1
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+    
+    # ==================== WORKER ====================
+    
+    def _run(self):
+        self._replay_spill()
+        
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._send(batch)
+        
+        self.flush()
+    
+    def _collect_batch(self) -> List[Dict]:
+        """Block until batch_size rows are queued or the interval expires"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop_event.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.5)))
+            except queue.Empty:
+                continue
+        
+        return batch
+    
+    def _drain(self) -> List[Dict]:
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return rows
+    
+    def flush(self):
+        """Send every queued row now (used on shutdown)"""
+        rows = self._drain()
+        for i in range(0, len(rows), self.batch_size):
+            self._send(rows[i:i + self.batch_size])
+    
+    def _send(self, rows: List[Dict]):
+        """insert_rows_json with retry/backoff; spill rows that never make it"""
+        with self._flush_lock:
+            started = time.monotonic()
+            pending = rows
+            delay = 0.5
+            
+            for attempt in range(1, self.max_retries + 1):
+                try:
+                    if self.client is None:
+                        self.client = get_bigquery_client(self.project_id)
+                    errors = self.client.insert_rows_json(self.table_id, pending)
+                    
+                    if not errors:
+                        pending = []
+                        break
+                    
+                    # Retry only the rows BigQuery rejected
+                    failed_indexes = {e.get('index') for e in errors}
+                    print(f"⚠️ Audit flush attempt {attempt}: {len(failed_indexes)} row(s) rejected: {errors[:3]}")
+                    pending = [row for i, row in enumerate(pending) if i in failed_indexes]
+                    
+                except Exception as e:
+                    print(f"⚠️ Audit flush attempt {attempt} failed: {e}")
+                
+                if attempt < self.max_retries:
+                    time.sleep(delay)
+                    delay *= 2
+            
+            latency_ms = (time.monotonic() - started) * 1000
+            
+            with self._lock:
+                self.flushed += len(rows) - len(pending)
+                self.failed += len(pending)
+                self.flush_count += 1
+                self.last_flush_latency_ms = latency_ms
+                self.max_flush_latency_ms = max(self.max_flush_latency_ms, latency_ms)
+                self.total_flush_latency_ms += latency_ms
+            
+            if pending:
+                self._spill(pending)
+    
+    # ==================== SPILL FILE ====================
+    
+    def _spill(self, rows: List[Dict]):
+        try:
+            with open(self.spill_file, 'a', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(row) + '\n')
+            with self._lock:
+                self.spilled += len(rows)
+            print(f"❌ {len(rows)} audit row(s) spilled to {self.spill_file}")
+        except Exception as e:
+            print(f"❌ Failed to spill audit rows: {e} - rows: {rows}")
+    
+    def _replay_spill(self):
+        """Re-queue rows left in the spill file by a previous run"""
+        if not os.path.exists(self.spill_file):
+            return
+        
+        try:
+            replay_file = f"{self.spill_file}.replay"
+            os.replace(self.spill_file, replay_file)
+            
+            count = 0
+            with open(replay_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self._queue.put(json.loads(line))
+                        count += 1
+            os.remove(replay_file)
+            
+            print(f"[DEBUG] Re-queued {count} spilled audit row(s)")
+        except Exception as e:
+            print(f"❌ Failed to replay audit spill file: {e}")
+    
+    # ==================== METRICS ====================
+    
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'enqueued': self.enqueued,
+                'flushed': self.flushed,
+                'failed': self.failed,
+                'spilled': self.spilled,
+                'flush_count': self.flush_count,
+                'last_flush_latency_ms': round(self.last_flush_latency_ms, 1),
+                'max_flush_latency_ms': round(self.max_flush_latency_ms, 1),
+                'avg_flush_latency_ms': round(self.total_flush_latency_ms / self.flush_count, 1) if self.flush_count else 0.0
+            }
+
+
+_writers: Dict[str, AuditWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_audit_writer(project_id: str = None) -> AuditWriter:
+    """Process-wide AuditWriter for a project (created on first use)"""
+    project_id = project_id or Config.PROJECT_ID
+    
+    with _writers_lock:
+        writer = _writers.get(project_id)
+        if writer is None:
+            writer = AuditWriter(project_id)
+            _writers[project_id] = writer
+        return writer
+
+
+def shutdown_audit_writers():
+    """Flush every writer - registered with app.on_shutdown in main.py"""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.stop()
+
+
+def log_audit_event(
+    action: str,
+    resource_type: str,
+    resource_name: str,
+    user_email: str,
+    status: str = 'SUCCESS',
+    taxonomy: str = None,
+    details: dict = None,
+    error_message: str = None,
+    project_id: str = None
+) -> bool:
+    """
+    Queue an audit row on the process-wide AuditWriter
+    
+    Single ingestion path for audit_logs: AuditService.log_action, the login
+    callback, control access and auth_service all end up here. Returns
+    immediately, without creating a BigQuery client.
+    """
+    try:
+        row = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "user_email": user_email,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_name": resource_name,
+            "taxonomy": taxonomy,
+            "details": json.dumps(details) if details else None,
+            "status": status,
+            "error_message": error_message
+        }
+        
+        # Queue row (flushed in batches by the writer thread)
+        get_audit_writer(project_id).enqueue(row)
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Failed to queue audit: {e}")
+        return False
 
 
 class AuditService:
     def __init__(self, project_id: str):
         self.project_id = project_id
-        self.client = bigquery.Client(project=project_id)
+        self.client = get_bigquery_client(project_id)
         self.table_id = f"{project_id}.rls_manager.audit_logs"
+        self.writer = get_audit_writer(project_id)
         
         # Get user email from environment or default
         self.user_email = os.getenv('USER_EMAIL', 'system@genai4datasec.com')
@@ -31,6 +308,9 @@ class AuditService:
         """
         Log an audit event
         
+        The row is queued on the background AuditWriter and the call returns
+        immediately; delivery happens on the next batch flush.
+        
         Args:
             action: Type of action (CREATE_TAXONOMY, DELETE_TAG, etc.)
             resource_type: Type of resource (TAXONOMY, POLICY_TAG, COLUMN, etc.)
@@ -40,32 +320,17 @@ class AuditService:
             details: Additional details as dict
             error_message: Error message if status is FAILED
         """
-        try:
-            # Prepare row
-            row = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "user_email": self.user_email,
-                "action": action,
-                "resource_type": resource_type,
-                "resource_name": resource_name,
-                "taxonomy": taxonomy,
-                "details": json.dumps(details) if details else None,
-                "status": status,
-                "error_message": error_message
-            }
-            
-            # Insert row
-            errors = self.client.insert_rows_json(self.table_id, [row])
-            
-            if errors:
-                print(f"⚠️ Error logging audit: {errors}")
-                return False
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ Failed to log audit: {e}")
-            return False
+        return log_audit_event(
+            action=action,
+            resource_type=resource_type,
+            resource_name=resource_name,
+            user_email=self.user_email,
+            status=status,
+            taxonomy=taxonomy,
+            details=details,
+            error_message=error_message,
+            project_id=self.project_id
+        )
     
     def get_recent_logs(self, limit: int = 50, filters: dict = None):
         """
@@ -241,3 +506,7 @@ class AuditService:
         except Exception as e:
             print(f"❌ Error getting active users: {e}")
             return []
+    
+    def get_writer_stats(self) -> Dict:
+        """Queue depth and flush latency counters of the background writer"""
+        return self.writer.stats()
@@ -6,16 +6,19 @@ from functools import wraps
 import os
 import json
 import requests
-from google.cloud import bigquery
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token
+import threading
+import time
+
+from services.audit_service import log_audit_event
+from services.client_registry import lazy_bigquery_client
+from services.token_verification_service import get_token_verifier
 
 PROJECT_ID = os.getenv('PROJECT_ID', 'sys-googl-cortex-security')
 GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
 GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
 REDIRECT_URI = os.getenv('REDIRECT_URI')
 
-bq_client = bigquery.Client(project=PROJECT_ID)
+bq_client = lazy_bigquery_client(PROJECT_ID)
 
 def require_auth(func):
     """Decorator para proteger páginas - requer autenticação"""
@@ -28,16 +31,13 @@ def require_auth(func):
     return wrapper
 
 def verify_google_token(token):
-    """Verifica token do Google"""
-    try:
-        idinfo = id_token.verify_oauth2_token(
-            token, 
-            google_requests.Request(), 
-            GOOGLE_CLIENT_ID
-        )
-        return idinfo
-    except ValueError:
-        return None
+    """
+    Verifica token do Google
+    
+    Certificados em cache (Cache-Control max-age, sessão HTTP compartilhada)
+    e resultado memoizado até o exp do token - ver token_verification_service.
+    """
+    return get_token_verifier(GOOGLE_CLIENT_ID).verify(token)
 
 def check_user_in_db(email):
     """Verifica se usuário existe no BigQuery e retorna dados"""
@@ -48,6 +48,8 @@ def check_user_in_db(email):
     LIMIT 1
     """
     
+    from google.cloud import bigquery
+    
     job_config = bigquery.QueryJobConfig(
         query_parameters=[
             bigquery.ScalarQueryParameter("email", "STRING", email)
@@ -63,41 +65,79 @@ def check_user_in_db(email):
     
     return None
 
-def check_permission(role, resource, permission):
+# ==================== ROLE PERMISSIONS MATRIX ====================
+# Matriz role x resource x permission carregada uma vez da tabela
+# role_permissions e recarregada em background a cada TTL.
+
+PERMISSIONS_TTL_SECONDS = int(os.getenv('PERMISSIONS_TTL_SECONDS', '300'))
+
+PERMISSION_RESOURCES = ['RLS_POLICIES', 'CLS_POLICIES', 'AUDIT_LOGS', 'USERS']
+PERMISSION_TYPES = ['can_view', 'can_create', 'can_edit', 'can_delete']
+
+_permissions_matrix = None  # {role: {resource: {permission: bool}}}
+_permissions_loaded_at = None
+_permissions_lock = threading.Lock()
+_permissions_refresher = None
+
+
+def load_role_permissions():
     """
-    Verifica se um role tem permissão específica para um recurso
-    
-    Args:
-        role: Role do usuário (OWNER, ADMIN, EDITOR, VIEWER)
-        resource: Recurso a ser acessado (RLS_POLICIES, CLS_POLICIES, AUDIT_LOGS, USERS)
-        permission: Tipo de permissão (can_view, can_create, can_edit, can_delete)
+    Carrega a tabela role_permissions inteira para memória
     
     Returns:
-        bool: True se tem permissão, False caso contrário
+        bool: True se carregou; em caso de erro mantém a matriz anterior
     """
-    # Buscar permissão no BigQuery
+    global _permissions_matrix, _permissions_loaded_at
+    
     try:
         query = f"""
-        SELECT {permission}
+        SELECT *
         FROM `{PROJECT_ID}.rls_manager.role_permissions`
-        WHERE role = @role AND resource = @resource
-        LIMIT 1
         """
         
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("role", "STRING", role),
-                bigquery.ScalarQueryParameter("resource", "STRING", resource)
-            ]
-        )
+        matrix = {}
+        for row in bq_client.query(query).result():
+            row = dict(row)
+            role = row.pop('role', None)
+            resource = row.pop('resource', None)
+            if not role or not resource:
+                continue
+            matrix.setdefault(role, {})[resource] = {
+                key: bool(value) for key, value in row.items() if key.startswith('can_')
+            }
         
-        result = list(bq_client.query(query, job_config=job_config).result())
-        if result:
-            return result[0][0]  # Retorna o valor booleano da permissão
+        with _permissions_lock:
+            _permissions_matrix = matrix
+            _permissions_loaded_at = time.time()
+        
+        print(f"[DEBUG] Role permissions loaded: {len(matrix)} role(s)")
+        return True
     except Exception as e:
-        print(f"Erro ao verificar permissão: {e}")
+        print(f"Erro ao carregar role_permissions: {e}")
+        return False
+
+
+def _permissions_refresh_loop():
+    while True:
+        load_role_permissions()
+        time.sleep(PERMISSIONS_TTL_SECONDS)
+
+
+def start_permissions_refresher():
+    """Inicia (uma vez) a thread que recarrega a matriz a cada TTL"""
+    global _permissions_refresher
     
-    # Fallback - verificação básica por role
+    with _permissions_lock:
+        if _permissions_refresher is not None and _permissions_refresher.is_alive():
+            return
+        _permissions_refresher = threading.Thread(
+            target=_permissions_refresh_loop, name='role-permissions-refresh', daemon=True
+        )
+        _permissions_refresher.start()
+
+
+def _fallback_permission(role, resource, permission):
+    """Verificação básica por role - usada só enquanto a matriz nunca carregou"""
     if role == 'OWNER':
         return True
     elif role == 'ADMIN':
@@ -109,6 +149,55 @@ def check_permission(role, resource, permission):
     
     return False
 
+
+def get_role_permissions(role):
+    """
+    Retorna todas as permissões de um role em um único lookup
+    
+    Args:
+        role: Role do usuário (OWNER, ADMIN, EDITOR, VIEWER)
+    
+    Returns:
+        dict: {resource: {permission: bool}}
+    """
+    start_permissions_refresher()
+    
+    matrix = _permissions_matrix
+    if matrix is not None:
+        return matrix.get(role, {})
+    
+    return {
+        resource: {
+            permission: _fallback_permission(role, resource, permission)
+            for permission in PERMISSION_TYPES
+        }
+        for resource in PERMISSION_RESOURCES
+    }
+
+
+def check_permission(role, resource, permission):
+    """
+    Verifica se um role tem permissão específica para um recurso
+    
+    Lookup O(1) na matriz em memória (ver load_role_permissions). O fallback
+    por role só é usado se a matriz ainda não foi carregada nenhuma vez.
+    
+    Args:
+        role: Role do usuário (OWNER, ADMIN, EDITOR, VIEWER)
+        resource: Recurso a ser acessado (RLS_POLICIES, CLS_POLICIES, AUDIT_LOGS, USERS)
+        permission: Tipo de permissão (can_view, can_create, can_edit, can_delete)
+    
+    Returns:
+        bool: True se tem permissão, False caso contrário
+    """
+    start_permissions_refresher()
+    
+    matrix = _permissions_matrix
+    if matrix is None:
+        return _fallback_permission(role, resource, permission)
+    
+    return matrix.get(role, {}).get(resource, {}).get(permission, False)
+
 def get_current_user():
     """Retorna dados do usuário atual da sessão"""
     return app.storage.user.get('user_info', {})
@@ -128,23 +217,13 @@ def register_audit_log(action, user_email, details="", status="SUCCESS"):
         details: Detalhes da ação
         status: Status da ação (SUCCESS, FAILED, DENIED)
     """
-    try:
-        query = f"""
-        INSERT INTO `{PROJECT_ID}.rls_manager.audit_logs`
-        (log_id, action, user_email, details, status, timestamp)
-        VALUES
-        (GENERATE_UUID(), @action, @user_email, @details, @status, CURRENT_TIMESTAMP())
-        """
-        
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("action", "STRING", action),
-                bigquery.ScalarQueryParameter("user_email", "STRING", user_email),
-                bigquery.ScalarQueryParameter("details", "STRING", details),
-                bigquery.ScalarQueryParameter("status", "STRING", status)
-            ]
-        )
-        
-        bq_client.query(query, job_config=job_config).result()
-    except Exception as e:
-        print(f"Erro ao registrar audit log: {e}")
+    # Streaming em lote via AuditWriter (não bloqueia o chamador)
+    log_audit_event(
+        action=action,
+        resource_type='AUTH',
+        resource_name=user_email,
+        user_email=user_email,
+        status=status,
+        details={'description': details} if details else None,
+        project_id=PROJECT_ID
+    )
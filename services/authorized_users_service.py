@@ -0,0 +1,218 @@
+"""
+Authorized Users Service
+Login fast path: cached authorized_users lookup + coalesced last_login writes
+
+Only the authorization check sits on the /callback critical path. The whole
+authorized_users table is small, so it is kept in memory for a short TTL and
+served from a shared client. last_login updates are queued and written by a
+background thread in one MERGE every LAST_LOGIN_FLUSH_INTERVAL_SECONDS.
+
+main.py imports this module at startup (shutdown hook), so the BigQuery SDK
+is only imported inside the methods that build queries.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import threading
+import time
+
+from config import Config
+from services.client_registry import get_bigquery_client
+
+
+class AuthorizedUsersService:
+    def __init__(self, project_id: str, client=None,
+                 ttl_seconds: int = None, flush_interval: float = None):
+        self.project_id = project_id
+        self.client = client or get_bigquery_client(project_id)
+        self.table_id = f"{project_id}.{Config.RLS_MANAGER_DATASET}.authorized_users"
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.AUTHORIZED_USERS_CACHE_TTL_SECONDS
+        self.flush_interval = flush_interval if flush_interval is not None else Config.LAST_LOGIN_FLUSH_INTERVAL_SECONDS
+
+        # Users cache: email -> row dict
+        self._users = None
+        self._users_expires_at = 0.0
+        self._users_lock = threading.Lock()
+
+        # Pending last_login updates: email -> UTC datetime
+        self._pending_logins: Dict[str, datetime] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_thread = None
+        self._stop_event = threading.Event()
+
+    # ==================== AUTHORIZATION (CRITICAL PATH) ====================
+
+    def _load_users(self) -> Dict[str, Dict]:
+        query = f"""
+        SELECT user_id, email, name, role, department, company, is_active
+        FROM `{self.table_id}`
+        """
+        users = {}
+        for row in self.client.query(query).result():
+            row = dict(row)
+            if row.get('email'):
+                users[row['email']] = row
+        print(f"[DEBUG] Authorized users cache loaded: {len(users)} user(s)")
+        return users
+
+    def _lookup_user(self, email: str) -> Optional[Dict]:
+        """Point lookup, used when the cached snapshot doesn't know the email"""
+        query = f"""
+        SELECT user_id, email, name, role, department, company, is_active
+        FROM `{self.table_id}`
+        WHERE email = @email
+        LIMIT 1
+        """
+        from google.cloud import bigquery
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("email", "STRING", email)]
+        )
+        results = list(self.client.query(query, job_config=job_config).result())
+        return dict(results[0]) if results else None
+
+    def get_user(self, email: str) -> Optional[Dict]:
+        """
+        Return the authorized_users row for an email (or None)
+
+        Served from the in-memory snapshot; the snapshot is reloaded once the
+        TTL expires. An email missing from a snapshot is confirmed with a
+        point lookup so users added since the last load can sign in.
+        """
+        with self._users_lock:
+            if self._users is None or time.monotonic() >= self._users_expires_at:
+                try:
+                    self._users = self._load_users()
+                    self._users_expires_at = time.monotonic() + self.ttl_seconds
+                except Exception as e:
+                    print(f"[ERROR] Failed to load authorized users: {e}")
+                    if self._users is None:
+                        return self._lookup_user(email)
+            users = self._users
+
+        user = users.get(email)
+        if user is not None:
+            return user
+
+        user = self._lookup_user(email)
+        if user is not None:
+            with self._users_lock:
+                if self._users is not None:
+                    self._users[email] = user
+        return user
+
+    def invalidate(self):
+        """Drop the snapshot (call after INSERT/UPDATE/DELETE on authorized_users)"""
+        with self._users_lock:
+            self._users = None
+            self._users_expires_at = 0.0
+
+    # ==================== LAST LOGIN (BACKGROUND) ====================
+
+    def record_login(self, email: str):
+        """Queue a last_login update; returns immediately"""
+        with self._pending_lock:
+            self._pending_logins[email] = datetime.now(timezone.utc)
+
+        if self._flush_thread is None or not self._flush_thread.is_alive():
+            self.start()
+
+    def start(self):
+        with self._pending_lock:
+            if self._flush_thread is not None and self._flush_thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop, name='last-login-flush', daemon=True
+            )
+            self._flush_thread.start()
+
+    def stop(self):
+        """Stop the flush thread and write pending updates"""
+        self._stop_event.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join(self.flush_interval + 5)
+        self.flush_last_logins()
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush_last_logins()
+
+    def flush_last_logins(self) -> int:
+        """
+        Write every pending last_login in a single MERGE
+
+        Returns:
+            Number of users updated (0 if nothing pending or on error)
+        """
+        with self._pending_lock:
+            pending = self._pending_logins
+            self._pending_logins = {}
+
+        if not pending:
+            return 0
+
+        query = f"""
+        MERGE `{self.table_id}` T
+        USING (
+            SELECT login.email, login.last_login
+            FROM UNNEST(@logins) AS login
+        ) S
+        ON T.email = S.email
+        WHEN MATCHED THEN
+            UPDATE SET last_login = S.last_login
+        """
+
+        from google.cloud import bigquery
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter(
+                    "logins",
+                    "STRUCT",
+                    [
+                        bigquery.StructQueryParameter(
+                            None,
+                            bigquery.ScalarQueryParameter("email", "STRING", email),
+                            bigquery.ScalarQueryParameter("last_login", "TIMESTAMP", login_at)
+                        )
+                        for email, login_at in pending.items()
+                    ]
+                )
+            ]
+        )
+
+        try:
+            self.client.query(query, job_config=job_config).result()
+            print(f"[DEBUG] last_login updated for {len(pending)} user(s)")
+            return len(pending)
+        except Exception as e:
+            print(f"[ERROR] Failed to update last_login: {e}")
+            # Put them back (newer logins win) for the next flush
+            with self._pending_lock:
+                for email, login_at in pending.items():
+                    if email not in self._pending_logins:
+                        self._pending_logins[email] = login_at
+            return 0
+
+
+_services: Dict[str, AuthorizedUsersService] = {}
+_services_lock = threading.Lock()
+
+
+def get_authorized_users_service(project_id: str = None) -> AuthorizedUsersService:
+    """Process-wide AuthorizedUsersService for a project (created on first use)"""
+    project_id = project_id or Config.PROJECT_ID
+
+    with _services_lock:
+        service = _services.get(project_id)
+        if service is None:
+            service = AuthorizedUsersService(project_id)
+            _services[project_id] = service
+        return service
+
+
+def shutdown_authorized_users_services():
+    """Flush pending last_login updates - registered with app.on_shutdown in main.py"""
+    with _services_lock:
+        services = list(_services.values())
+    for service in services:
+        service.stop()
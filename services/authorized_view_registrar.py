@@ -0,0 +1,183 @@
+"""
+Authorized View Registrar
+Coalesced access-entry updates per dataset
+
+Every page used to do its own get_dataset -> append AccessEntry ->
+update_dataset per view. Two views created at the same time on the same
+source dataset raced (lost update or etag failure), and bulk creation made
+one dataset update per view.
+
+Here callers enqueue the entries they need (authorized views on the source
+dataset, READER users on the views dataset). The first caller for a dataset
+waits a short window (AUTHORIZED_VIEW_COALESCE_SECONDS), then commits
+everything pending for that dataset with one etag-guarded update_dataset;
+the other callers just wait for that commit. Entries already present are
+skipped, so a batch with nothing new doesn't update the dataset at all.
+Etag conflicts (412) are retried from a fresh read.
+"""
+
+from google.cloud import bigquery
+from google.api_core.exceptions import PreconditionFailed
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Tuple
+import json
+import threading
+import time
+
+from config import Config
+from services.client_registry import get_bigquery_client
+from services.metadata_cache_service import get_metadata_cache
+
+
+def _entry_key(entry: bigquery.AccessEntry) -> Tuple:
+    entity_id = entry.entity_id
+    if isinstance(entity_id, dict):
+        entity_id = json.dumps(entity_id, sort_keys=True)
+    return (entry.role, entry.entity_type, entity_id)
+
+
+class AuthorizedViewRegistrar:
+    def __init__(self, project_id: str, coalesce_seconds: float = None):
+        self.project_id = project_id
+        self.client = get_bigquery_client(project_id)
+        self.metadata_cache = get_metadata_cache(project_id)
+        self.coalesce_seconds = (
+            Config.AUTHORIZED_VIEW_COALESCE_SECONDS if coalesce_seconds is None else coalesce_seconds
+        )
+
+        self._lock = threading.Lock()
+        # dataset -> {'entries': {key: AccessEntry}, 'futures': [Future]}
+        self._pending: Dict[str, Dict] = {}
+        self._committing = set()
+
+        self.commits = 0
+
+    # ==================== PUBLIC API ====================
+
+    def _dataset_id(self, dataset: str) -> str:
+        ref = bigquery.DatasetReference.from_string(dataset, default_project=self.project_id)
+        return f"{ref.project}.{ref.dataset_id}"
+
+    def authorize_view(self, source_dataset: str, views_dataset: str, view_name: str,
+                       view_project: str = None) -> Dict:
+        """Authorize views_dataset.view_name on source_dataset"""
+        return self.add_entries(source_dataset, [bigquery.AccessEntry(
+            role=None,
+            entity_type='view',
+            entity_id={
+                'projectId': view_project or self.project_id,
+                'datasetId': views_dataset,
+                'tableId': view_name
+            }
+        )])
+
+    def authorize_views(self, source_dataset: str, views: Iterable[Tuple[str, str]]) -> Dict:
+        """Authorize many (views_dataset, view_name) on source_dataset in one commit"""
+        return self.add_entries(source_dataset, [
+            bigquery.AccessEntry(
+                role=None,
+                entity_type='view',
+                entity_id={'projectId': self.project_id, 'datasetId': views_dataset, 'tableId': view_name}
+            )
+            for views_dataset, view_name in views
+        ])
+
+    def grant_readers(self, dataset: str, emails: Iterable[str]) -> Dict:
+        """READER for each user on a dataset (views dataset of protected views)"""
+        return self.add_entries(dataset, [
+            bigquery.AccessEntry(role='READER', entity_type='userByEmail', entity_id=email)
+            for email in emails
+        ])
+
+    def add_entries(self, dataset: str, entries: List[bigquery.AccessEntry], timeout: float = None) -> Dict:
+        """
+        Queue access entries for a dataset and wait for the commit that includes them
+
+        Returns:
+            {'status': 'updated'|'unchanged', 'added': entries added by that commit,
+             'attempts': update attempts}
+        """
+        dataset_id = self._dataset_id(dataset)
+        if not entries:
+            return {'status': 'unchanged', 'added': 0, 'attempts': 0}
+
+        future = Future()
+        with self._lock:
+            pending = self._pending.setdefault(dataset_id, {'entries': {}, 'futures': []})
+            for entry in entries:
+                pending['entries'][_entry_key(entry)] = entry
+            pending['futures'].append(future)
+
+            leader = dataset_id not in self._committing
+            if leader:
+                self._committing.add(dataset_id)
+
+        if leader:
+            self._run_commits(dataset_id)
+
+        return future.result(timeout=timeout)
+
+    # ==================== COMMIT ====================
+
+    def _run_commits(self, dataset_id: str):
+        """Commit batches for a dataset until nothing is pending"""
+        time.sleep(self.coalesce_seconds)
+
+        while True:
+            with self._lock:
+                batch = self._pending.pop(dataset_id, None)
+                if batch is None:
+                    self._committing.discard(dataset_id)
+                    return
+
+            try:
+                result = self._commit(dataset_id, batch['entries'])
+            except Exception as e:
+                print(f"[ERROR] Access entries on {dataset_id}: {e}")
+                for future in batch['futures']:
+                    future.set_exception(e)
+                continue
+
+            for future in batch['futures']:
+                future.set_result(result)
+
+    def _commit(self, dataset_id: str, entries: Dict[Tuple, bigquery.AccessEntry]) -> Dict:
+        for attempt in range(1, Config.AUTHORIZED_VIEW_MAX_RETRIES + 1):
+            # Fresh dataset (and etag) on every attempt
+            dataset = self.client.get_dataset(dataset_id)
+
+            current = list(dataset.access_entries)
+            existing = {_entry_key(entry) for entry in current}
+            missing = [entry for key, entry in entries.items() if key not in existing]
+
+            if not missing:
+                return {'status': 'unchanged', 'added': 0, 'attempts': attempt}
+
+            dataset.access_entries = current + missing
+            try:
+                # update_dataset sends If-Match with the etag of the fetched dataset
+                self.metadata_cache.update_dataset(dataset, ['access_entries'])
+                self.commits += 1
+                print(f"[DEBUG] ✓ {len(missing)} access entr{'y' if len(missing) == 1 else 'ies'} "
+                      f"added to {dataset_id}")
+                return {'status': 'updated', 'added': len(missing), 'attempts': attempt}
+            except PreconditionFailed:
+                print(f"[DEBUG] Etag conflict on {dataset_id} (attempt {attempt}), retrying")
+
+        raise RuntimeError(f"Etag conflict persisted after {Config.AUTHORIZED_VIEW_MAX_RETRIES} attempts")
+
+
+_registrars: Dict[str, AuthorizedViewRegistrar] = {}
+_registrars_lock = threading.Lock()
+
+
+def get_view_registrar(project_id: str = None) -> AuthorizedViewRegistrar:
+    """Process-wide AuthorizedViewRegistrar for a project (created on first use)"""
+    project_id = project_id or Config.PROJECT_ID
+
+    with _registrars_lock:
+        registrar = _registrars.get(project_id)
+        if registrar is None:
+            registrar = AuthorizedViewRegistrar(project_id)
+            _registrars[project_id] = registrar
+        return registrar
@@ -4,9 +4,16 @@ Manages BigQuery operations and policy tag application
 """
 
 from google.cloud import bigquery
+from google.api_core.exceptions import PreconditionFailed
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Optional
 import logging
 
+from config import Config
+from services.client_registry import get_bigquery_client
+from services.dataset_inventory_service import DatasetInventoryService
+from services.metadata_cache_service import get_metadata_cache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,30 +24,37 @@ class BigQueryCLSService:
     
     def __init__(self, project_id: str):
         self.project_id = project_id
-        self.client = bigquery.Client(project=project_id)
+        self.client = get_bigquery_client(project_id)
+        self.metadata_cache = get_metadata_cache(project_id)
         logger.info(f"BigQueryCLSService initialized for project: {project_id}")
     
     # ==================== DATASETS ====================
     
     def list_datasets(self) -> List[Dict]:
-        """List all datasets in the project"""
+        """
+        List all datasets in the project
+
+        Datasets whose details or table count could not be fetched are kept
+        in the list with 'error' set (table_count None).
+        """
         try:
-            datasets = list(self.client.list_datasets())
+            inventory = DatasetInventoryService(self.project_id).inventory(with_table_counts=True)
             
             result = []
-            for dataset in datasets:
-                dataset_ref = self.client.get_dataset(dataset.reference)
-                tables = list(self.client.list_tables(dataset.reference))
-                
+            for dataset in inventory['datasets']:
                 result.append({
-                    "dataset_id": dataset.dataset_id,
-                    "project": dataset.project,
-                    "full_id": f"{dataset.project}.{dataset.dataset_id}",
-                    "location": dataset_ref.location,
-                    "description": dataset_ref.description or "",
-                    "table_count": len(tables)
+                    "dataset_id": dataset['dataset_id'],
+                    "project": dataset['project'],
+                    "full_id": dataset['full_id'],
+                    "location": dataset['location'],
+                    "description": dataset['description'],
+                    "table_count": dataset['table_count'],
+                    "error": dataset['error']
                 })
             
+            for error in inventory['errors']:
+                logger.warning(f"Dataset {error['dataset_id']}: {error['error']}")
+            
             return result
         except Exception as e:
             logger.error(f"Error listing datasets: {e}")
@@ -48,23 +62,28 @@ class BigQueryCLSService:
     
     # ==================== TABLES ====================
     
-    def list_tables(self, dataset_id: str) -> List[Dict]:
-        """List all tables in a dataset"""
+    def list_tables(self, dataset_id: str, with_details: bool = True) -> List[Dict]:
+        """
+        List all tables in a dataset
+        
+        with_details=False skips the get_table per table (num_rows and
+        description come back as None / ""); use get_table_details on demand.
+        """
         try:
             dataset_ref = self.client.dataset(dataset_id)
-            tables = list(self.client.list_tables(dataset_ref))
+            tables = self.metadata_cache.list_tables(dataset_ref)
             
             result = []
             for table in tables:
-                table_ref = self.client.get_table(table.reference)
+                table_ref = self.metadata_cache.get_table(table.reference) if with_details else None
                 
                 result.append({
                     "table_id": table.table_id,
                     "dataset_id": dataset_id,
                     "full_id": f"{self.project_id}.{dataset_id}.{table.table_id}",
                     "table_type": table.table_type,
-                    "num_rows": table_ref.num_rows,
-                    "description": table_ref.description or ""
+                    "num_rows": table_ref.num_rows if table_ref else None,
+                    "description": (table_ref.description or "") if table_ref else ""
                 })
             
             return result
@@ -74,31 +93,54 @@ class BigQueryCLSService:
     
     # ==================== SCHEMA & COLUMNS ====================
     
+    @staticmethod
+    def _schema_to_dicts(schema) -> List[Dict]:
+        result = []
+        for field in schema:
+            policy_tags = []
+            if hasattr(field, 'policy_tags') and field.policy_tags:
+                policy_tags = field.policy_tags.names if hasattr(field.policy_tags, 'names') else []
+            
+            result.append({
+                "name": field.name,
+                "type": field.field_type,
+                "mode": field.mode,
+                "description": field.description or "",
+                "policy_tags": policy_tags
+            })
+        return result
+    
     def get_table_schema(self, dataset_id: str, table_id: str) -> List[Dict]:
         """Get complete schema of a table"""
         try:
             table_ref = self.client.dataset(dataset_id).table(table_id)
-            table = self.client.get_table(table_ref)
+            table = self.metadata_cache.get_table(table_ref)
             
-            result = []
-            for field in table.schema:
-                policy_tags = []
-                if hasattr(field, 'policy_tags') and field.policy_tags:
-                    policy_tags = field.policy_tags.names if hasattr(field.policy_tags, 'names') else []
-                
-                result.append({
-                    "name": field.name,
-                    "type": field.field_type,
-                    "mode": field.mode,
-                    "description": field.description or "",
-                    "policy_tags": policy_tags
-                })
-            
-            return result
+            return self._schema_to_dicts(table.schema)
         except Exception as e:
             logger.error(f"Error getting schema: {e}")
             return []
     
+    def get_table_details(self, dataset_id: str, table_id: str) -> Optional[Dict]:
+        """Table info, schema and tag statistics from a single (cached) get_table"""
+        try:
+            table_ref = self.client.dataset(dataset_id).table(table_id)
+            table = self.metadata_cache.get_table(table_ref)
+            
+            schema = self._schema_to_dicts(table.schema)
+            return {
+                "table_id": table_id,
+                "dataset_id": dataset_id,
+                "table_type": table.table_type,
+                "num_rows": table.num_rows,
+                "description": table.description or "",
+                "schema": schema,
+                "stats": self.tagged_columns_stats(schema)
+            }
+        except Exception as e:
+            logger.error(f"Error getting table details: {e}")
+            return None
+    
     def get_columns_with_tags(self, dataset_id: str, table_id: str) -> Dict[str, List[str]]:
         """Return dictionary of columns and their policy tags"""
         try:
@@ -116,146 +158,139 @@ class BigQueryCLSService:
     
     # ==================== APPLY TAGS ====================
     
-    def apply_tag_to_column(self, dataset_id: str, table_id: str, 
-                           column_name: str, tag_name: str) -> bool:
-        """Apply a policy tag to a column"""
-        try:
-            logger.info("="*60)
-            logger.info("APPLYING TAG")
-            logger.info(f"Dataset: {dataset_id}")
-            logger.info(f"Table: {table_id}")
-            logger.info(f"Column: {column_name}")
-            logger.info(f"Tag: {tag_name}")
-            logger.info("="*60)
+    @staticmethod
+    def _retag_fields(fields: List[Dict], changes: Dict[str, Optional[str]], applied: Dict, prefix: str = "") -> bool:
+        """
+        Set policyTags on API-repr schema fields in place (nested by field path)
+        
+        Returns True if any field actually changed.
+        """
+        changed = False
+        for field in fields:
+            path = f"{prefix}{field['name']}"
             
-            table_ref = self.client.dataset(dataset_id).table(table_id)
-            table = self.client.get_table(table_ref)
+            if path in changes:
+                tag = changes[path]
+                wanted = [tag] if tag else []
+                current = (field.get('policyTags') or {}).get('names', [])
+                applied[path] = tag
+                if current != wanted:
+                    # Empty list = remove tags
+                    field['policyTags'] = {'names': wanted}
+                    changed = True
             
-            # Build new schema
-            new_schema = []
-            for field in table.schema:
-                if field.name == column_name:
-                    # Apply tag to target column
-                    new_field = bigquery.SchemaField(
-                        name=field.name,
-                        field_type=field.field_type,
-                        mode=field.mode,
-                        description=field.description,
-                        policy_tags=bigquery.PolicyTagList(names=[tag_name])
-                    )
-                    new_schema.append(new_field)
-                    logger.info(f"✅ Applied tag to column: {column_name}")
-                else:
-                    # Keep other fields as-is
-                    new_schema.append(field)
+            if field.get('fields'):
+                if BigQueryCLSService._retag_fields(field['fields'], changes, applied, f"{path}."):
+                    changed = True
+        
+        return changed
+    
+    def _apply_table_tags(self, dataset_id: str, table_id: str, changes: Dict[str, Optional[str]]) -> Dict:
+        """One etag-guarded update_table for all the column changes of a table"""
+        table_ref = self.client.dataset(dataset_id).table(table_id)
+        
+        for attempt in range(1, Config.POLICY_TAG_APPLY_MAX_RETRIES + 1):
+            # Fresh table (and etag) on every attempt
+            table = self.client.get_table(table_ref)
             
-            # Update table
-            table.schema = new_schema
-            self.client.update_table(table, ["schema"])
+            fields = [field.to_api_repr() for field in table.schema]
+            applied = {}
+            changed = self._retag_fields(fields, changes, applied)
+            missing = sorted(set(changes) - set(applied))
             
-            logger.info(f"✅ SUCCESS: Tag applied to {dataset_id}.{table_id}.{column_name}")
-            return True
+            if not changed:
+                return {'status': 'unchanged', 'columns': len(applied), 'missing': missing, 'attempts': attempt, 'error': None}
             
-        except Exception as e:
-            logger.error(f"❌ ERROR applying tag: {str(e)}", exc_info=True)
-            return False
+            table.schema = [bigquery.SchemaField.from_api_repr(field) for field in fields]
+            try:
+                # update_table sends If-Match with the etag of the fetched table
+                self.metadata_cache.update_table(table, ["schema"])
+                return {'status': 'updated', 'columns': len(applied), 'missing': missing, 'attempts': attempt, 'error': None}
+            except PreconditionFailed:
+                logger.warning(f"Etag conflict on {dataset_id}.{table_id} (attempt {attempt}), retrying")
+        
+        raise RuntimeError(f"Etag conflict persisted after {Config.POLICY_TAG_APPLY_MAX_RETRIES} attempts")
+    
+    def apply_tags(self, changes: Dict[str, Optional[str]], max_workers: int = None) -> Dict[str, Dict]:
+        """
+        Apply/remove policy tags on many columns, possibly across many tables
+        
+        Args:
+            changes: {"dataset.table.column": tag name, or None to remove the tags}
+                     (nested fields by path: "dataset.table.record.field")
+            max_workers: tables updated concurrently
+        
+        Returns:
+            {"dataset.table": {'status': 'updated'|'unchanged'|'failed',
+                               'columns', 'missing', 'attempts', 'error'}}
+        
+        Each table costs one get_table and one update_table (more only on
+        etag conflicts, which are retried).
+        """
+        by_table: Dict[tuple, Dict[str, Optional[str]]] = {}
+        for column_path, tag in changes.items():
+            dataset_id, table_id, column = column_path.split('.', 2)
+            by_table.setdefault((dataset_id, table_id), {})[column] = tag
+        
+        if not by_table:
+            return {}
+        
+        logger.info(f"Applying {len(changes)} policy tag change(s) on {len(by_table)} table(s)")
+        
+        results = {}
+        workers = min(max_workers or Config.POLICY_TAG_APPLY_MAX_WORKERS, len(by_table))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='policy-tag-apply') as executor:
+            futures = {
+                executor.submit(self._apply_table_tags, dataset_id, table_id, table_changes): (dataset_id, table_id)
+                for (dataset_id, table_id), table_changes in by_table.items()
+            }
+            for future in as_completed(futures):
+                dataset_id, table_id = futures[future]
+                key = f"{dataset_id}.{table_id}"
+                try:
+                    results[key] = future.result()
+                    if results[key]['missing']:
+                        logger.error(f"  ❌ Columns not found in {key}: {results[key]['missing']}")
+                    logger.info(f"✅ {key}: {results[key]['status']} ({results[key]['columns']} column(s))")
+                except Exception as e:
+                    logger.error(f"❌ ERROR applying tags to {key}: {e}", exc_info=True)
+                    results[key] = {'status': 'failed', 'columns': 0, 'missing': [], 'attempts': None, 'error': str(e)}
+        
+        return results
+    
+    def apply_tag_to_column(self, dataset_id: str, table_id: str, 
+                           column_name: str, tag_name: str) -> bool:
+        """Apply a policy tag to a column"""
+        result = self.apply_tags({f"{dataset_id}.{table_id}.{column_name}": tag_name})
+        result = result[f"{dataset_id}.{table_id}"]
+        return result['status'] != 'failed' and not result['missing']
     
     def remove_tag_from_column(self, dataset_id: str, table_id: str, 
                                column_name: str) -> bool:
         """Remove policy tags from a column"""
-        try:
-            logger.info("="*60)
-            logger.info("REMOVING TAG - START")
-            logger.info(f"Dataset: {dataset_id}")
-            logger.info(f"Table: {table_id}")
-            logger.info(f"Column: {column_name}")
-            logger.info("="*60)
-            
-            # Get current table
-            table_ref = self.client.dataset(dataset_id).table(table_id)
-            table = self.client.get_table(table_ref)
-            
-            # Check current tags
-            logger.info("Current schema fields:")
-            for field in table.schema:
-                if field.name == column_name:
-                    has_tags = hasattr(field, 'policy_tags') and field.policy_tags
-                    if has_tags:
-                        logger.info(f"  - {field.name}: HAS TAGS = {field.policy_tags.names}")
-                    else:
-                        logger.info(f"  - {field.name}: NO TAGS")
-            
-            # Build new schema WITHOUT tags on target column
-            new_schema = []
-            found_target = False
-            
-            for field in table.schema:
-                if field.name == column_name:
-                    found_target = True
-                    # Create new field with EMPTY PolicyTagList to remove tags
-                    new_field = bigquery.SchemaField(
-                        name=field.name,
-                        field_type=field.field_type,
-                        mode=field.mode,
-                        description=field.description,
-                        policy_tags=bigquery.PolicyTagList(names=[])  # EMPTY list = REMOVE tags
-                    )
-                    new_schema.append(new_field)
-                    logger.info(f"  ✅ Rebuilt column {column_name} with EMPTY PolicyTagList")
-                else:
-                    # Keep other fields unchanged
-                    new_schema.append(field)
-            
-            if not found_target:
-                logger.error(f"  ❌ Column {column_name} not found in schema!")
-                return False
-            
-            # Update table with new schema
-            logger.info("Updating table schema...")
-            table.schema = new_schema
-            updated_table = self.client.update_table(table, ["schema"])
-            logger.info("  ✅ Schema updated in BigQuery")
-            
-            # VERIFY the tag was actually removed
-            logger.info("Verifying tag removal...")
-            verification_table = self.client.get_table(table_ref)
-            
-            for field in verification_table.schema:
-                if field.name == column_name:
-                    has_tags = hasattr(field, 'policy_tags') and field.policy_tags
-                    if has_tags:
-                        logger.error(f"  ❌ VERIFICATION FAILED: Tags still present!")
-                        logger.error(f"     Remaining tags: {field.policy_tags.names}")
-                        return False
-                    else:
-                        logger.info(f"  ✅ VERIFICATION PASSED: No tags found")
-                        logger.info(f"✅ SUCCESS: Tag removed from {dataset_id}.{table_id}.{column_name}")
-                        logger.info("="*60)
-                        return True
-            
-            logger.error(f"  ❌ Column not found in verification")
-            return False
-            
-        except Exception as e:
-            logger.error(f"❌ ERROR removing tag: {str(e)}", exc_info=True)
-            return False
+        result = self.apply_tags({f"{dataset_id}.{table_id}.{column_name}": None})
+        result = result[f"{dataset_id}.{table_id}"]
+        return result['status'] != 'failed' and not result['missing']
     
     # ==================== STATISTICS ====================
     
+    @staticmethod
+    def tagged_columns_stats(schema: List[Dict]) -> Dict[str, int]:
+        """Statistics of tagged columns from an already fetched schema (get_table_schema format)"""
+        total_columns = len(schema)
+        tagged_columns = sum(1 for col in schema if col['policy_tags'])
+        
+        return {
+            "total_columns": total_columns,
+            "tagged_columns": tagged_columns,
+            "untagged_columns": total_columns - tagged_columns,
+            "percentage_tagged": round((tagged_columns / total_columns * 100), 2) if total_columns > 0 else 0
+        }
+    
     def get_tagged_columns_count(self, dataset_id: str, table_id: str) -> Dict[str, int]:
         """Return statistics of tagged columns"""
         try:
-            schema = self.get_table_schema(dataset_id, table_id)
-            
-            total_columns = len(schema)
-            tagged_columns = sum(1 for col in schema if col['policy_tags'])
-            
-            return {
-                "total_columns": total_columns,
-                "tagged_columns": tagged_columns,
-                "untagged_columns": total_columns - tagged_columns,
-                "percentage_tagged": round((tagged_columns / total_columns * 100), 2) if total_columns > 0 else 0
-            }
+            return self.tagged_columns_stats(self.get_table_schema(dataset_id, table_id))
             
         except Exception as e:
             logger.error(f"Error getting statistics: {e}")
@@ -0,0 +1,141 @@
+"""
+Client Registry
+Process-wide, lazily constructed Google Cloud clients
+
+Every page and service gets its BigQuery / Data Catalog / Resource Manager
+client from here instead of building its own. Nothing is constructed (and no
+credential discovery or network call happens) until a client is first used.
+
+All BigQuery clients share one credentials object and one AuthorizedSession
+whose connection pool is sized to the run.io_bound thread pool, so parallel
+io_bound calls don't queue on urllib3's default pool of 10 connections.
+The gRPC clients (Data Catalog, Resource Manager) share the credentials and
+keep their own channel.
+"""
+
+from typing import Callable, Dict
+import os
+import threading
+
+from config import Config
+
+_lock = threading.RLock()
+_credentials = None
+_http_session = None
+_bigquery_clients: Dict[str, object] = {}
+_grpc_clients: Dict[str, object] = {}
+
+
+def io_bound_pool_size() -> int:
+    """
+    Size of the thread pool behind nicegui.run.io_bound
+
+    io_bound runs on the event loop's default executor, whose size is
+    min(32, cpu_count + 4); HTTP_POOL_SIZE overrides it.
+    """
+    if Config.HTTP_POOL_SIZE:
+        return Config.HTTP_POOL_SIZE
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def get_credentials():
+    """Application Default Credentials, discovered once"""
+    global _credentials
+
+    with _lock:
+        if _credentials is None:
+            import google.auth
+            _credentials, _ = google.auth.default(
+                scopes=['https://www.googleapis.com/auth/cloud-platform']
+            )
+            print("[DEBUG] Google credentials loaded")
+        return _credentials
+
+
+def get_http_session():
+    """AuthorizedSession shared by every BigQuery client"""
+    global _http_session
+
+    with _lock:
+        if _http_session is None:
+            import requests
+            from google.auth.transport.requests import AuthorizedSession
+
+            pool_size = io_bound_pool_size()
+            _http_session = AuthorizedSession(get_credentials())
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=3
+            )
+            _http_session.mount('https://', adapter)
+            print(f"[DEBUG] Shared HTTP session created (pool size: {pool_size})")
+        return _http_session
+
+
+def get_bigquery_client(project_id: str = None):
+    """Shared bigquery.Client for a project (created on first use)"""
+    project_id = project_id or Config.PROJECT_ID
+
+    with _lock:
+        client = _bigquery_clients.get(project_id)
+        if client is None:
+            from google.cloud import bigquery
+
+            client = bigquery.Client(
+                project=project_id,
+                credentials=get_credentials(),
+                _http=get_http_session()
+            )
+            _bigquery_clients[project_id] = client
+            print(f"[DEBUG] BigQuery client created: {project_id}")
+        return client
+
+
+def _get_grpc_client(name: str, factory: Callable):
+    with _lock:
+        client = _grpc_clients.get(name)
+        if client is None:
+            client = factory(credentials=get_credentials())
+            _grpc_clients[name] = client
+            print(f"[DEBUG] {name} created")
+        return client
+
+
+def get_policy_tag_manager_client():
+    """Shared datacatalog_v1.PolicyTagManagerClient"""
+    from google.cloud import datacatalog_v1
+    return _get_grpc_client('PolicyTagManagerClient', datacatalog_v1.PolicyTagManagerClient)
+
+
+def get_policy_tag_serialization_client():
+    """Shared datacatalog_v1.PolicyTagManagerSerializationClient"""
+    from google.cloud import datacatalog_v1
+    return _get_grpc_client(
+        'PolicyTagManagerSerializationClient', datacatalog_v1.PolicyTagManagerSerializationClient
+    )
+
+
+def get_projects_client():
+    """Shared resourcemanager_v3.ProjectsClient"""
+    from google.cloud import resourcemanager_v3
+    return _get_grpc_client('ProjectsClient', resourcemanager_v3.ProjectsClient)
+
+
+class LazyBigQueryClient:
+    """
+    Stand-in for a module-level `client = bigquery.Client(...)`
+
+    Attribute access is forwarded to the shared client, which is only
+    created the first time it's actually used.
+    """
+
+    def __init__(self, project_id: str = None):
+        self.project = project_id or Config.PROJECT_ID
+
+    def __getattr__(self, name):
+        return getattr(get_bigquery_client(self.project), name)
+
+
+def lazy_bigquery_client(project_id: str = None) -> LazyBigQueryClient:
+    return LazyBigQueryClient(project_id)
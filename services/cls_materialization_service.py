@@ -0,0 +1,449 @@
+"""
+CLS Materialization Service
+Materialized masked-snapshot mode for CLS views
+
+A logical CLS view recomputes every mask (SHA256, CONCAT(SUBSTR(...)), ...)
+on every read. In materialized mode the masked projection is written once to
+a snapshot table and the user-facing view becomes a thin
+    SELECT * FROM <snapshot> WHERE <RLS filter>
+so dashboards read precomputed values. The RLS filter depends on
+SESSION_USER(), so it is never materialized: it still runs on top of the
+snapshot. When the RLS field itself is masked or hidden, its raw value is
+kept in the snapshot as __rls_<field> and excluded from the view output.
+
+Snapshots live in the *source* dataset (_cls_snapshot_<view>), which end
+users can't read, and the view is authorized on it, so the masked data is
+never exposed without the RLS filter.
+
+Snapshots are refreshed by CLSSnapshotRefresher when the source table
+changes (checked every CLS_SNAPSHOT_CHECK_SECONDS) or when the per-view
+refresh interval elapses; refresh() can also be called on demand. State
+(snapshot SQL, interval, last refresh) is kept in the CLS_MATERIALIZED_REGISTRY
+table.
+
+The refresher isn't started with the app: it starts when a view is
+materialized or when the registry is first read with rows (e.g. the Manage
+page), or at startup with CLS_SNAPSHOT_REFRESHER_ON_STARTUP=true. It stops
+by itself once no materialized views are left.
+"""
+
+from google.cloud import bigquery
+from google.api_core.exceptions import NotFound
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import re
+import threading
+
+from config import Config
+from services.client_registry import get_bigquery_client
+from services.metadata_cache_service import get_metadata_cache
+from services.authorized_view_registrar import get_view_registrar
+
+SNAPSHOT_PREFIX = '_cls_snapshot_'
+RLS_COLUMN_PREFIX = '__rls_'
+
+REGISTRY_SCHEMA = [
+    bigquery.SchemaField('view_id', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('snapshot_table', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('source_table', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('snapshot_sql', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('refresh_seconds', 'INT64'),
+    bigquery.SchemaField('refreshed_at', 'TIMESTAMP'),
+    bigquery.SchemaField('source_modified_at', 'TIMESTAMP'),
+    bigquery.SchemaField('updated_by', 'STRING'),
+]
+
+_TRUNC_FUNCTIONS = {'DATE': 'DATE_TRUNC', 'DATETIME': 'DATETIME_TRUNC', 'TIMESTAMP': 'TIMESTAMP_TRUNC'}
+
+_CLUSTERABLE_TYPES = {
+    'STRING', 'INTEGER', 'INT64', 'NUMERIC', 'BIGNUMERIC', 'BOOLEAN', 'BOOL',
+    'DATE', 'DATETIME', 'TIMESTAMP', 'GEOGRAPHY'
+}
+
+_RLS_FIELD_RE = re.compile(r'^(\s*)`?(\w+)`?(\s+IN\b)', re.IGNORECASE)
+
+
+def rls_filter_field(where_clause: Optional[str]) -> Optional[str]:
+    """Field filtered by a generated RLS predicate (`<field> IN (...)`)"""
+    if not where_clause:
+        return None
+    match = _RLS_FIELD_RE.match(where_clause)
+    return match.group(2) if match else None
+
+
+def logical_where(where_clause: Optional[str]) -> Optional[str]:
+    """RLS predicate of a materialized view, rewritten back to the source field name"""
+    field = rls_filter_field(where_clause)
+    if not field or not field.startswith(RLS_COLUMN_PREFIX):
+        return where_clause
+    return _rename_rls_field(where_clause, field[len(RLS_COLUMN_PREFIX):])
+
+
+def _rename_rls_field(where_clause: str, new_name: str) -> str:
+    return _RLS_FIELD_RE.sub(lambda m: f"{m.group(1)}{new_name}{m.group(3)}", where_clause, count=1)
+
+
+class CLSMaterializationService:
+    def __init__(self, project_id: str):
+        self.project_id = project_id
+        self.client = get_bigquery_client(project_id)
+        self.metadata_cache = get_metadata_cache(project_id)
+        self.registry_table = Config.CLS_MATERIALIZED_REGISTRY
+        self._registry_ready = False
+
+    # ==================== REGISTRY ====================
+
+    def ensure_registry(self):
+        if self._registry_ready:
+            return
+        try:
+            self.client.get_table(self.registry_table)
+        except NotFound:
+            self.client.create_table(bigquery.Table(self.registry_table, schema=REGISTRY_SCHEMA), exists_ok=True)
+            print(f"[DEBUG] ✓ Created {self.registry_table}")
+        self._registry_ready = True
+
+    def list_registered(self, view_ids: List[str] = None) -> List[Dict]:
+        """Registry rows (all, or only the given view ids); [] if the registry doesn't exist"""
+        query = f"SELECT * FROM `{self.registry_table}`"
+        params = []
+        if view_ids is not None:
+            query += " WHERE view_id IN UNNEST(@view_ids)"
+            params.append(bigquery.ArrayQueryParameter("view_ids", "STRING", list(view_ids)))
+
+        try:
+            job = self.client.query(query, job_config=bigquery.QueryJobConfig(query_parameters=params))
+            rows = [dict(row) for row in job.result()]
+        except NotFound:
+            return []
+
+        if rows:
+            # Há views materializadas: garante o refresh em background
+            get_snapshot_refresher(self.project_id).start()
+        return rows
+
+    # ==================== SQL ====================
+
+    @staticmethod
+    def snapshot_table_id(project_id: str, source_dataset: str, view_name: str) -> str:
+        return f"{project_id}.{source_dataset}.{SNAPSHOT_PREFIX}{view_name}"
+
+    def _layout_clauses(self, source_table, output_columns: List[str], rls_column: Optional[str],
+                        partition_like_source: bool) -> str:
+        """PARTITION BY / CLUSTER BY mirroring the source, for columns kept unmasked"""
+        clauses = []
+        field_types = {field.name: field.field_type for field in source_table.schema}
+
+        if partition_like_source:
+            time_partitioning = source_table.time_partitioning
+            range_partitioning = source_table.range_partitioning
+
+            if time_partitioning and time_partitioning.field in output_columns:
+                field = time_partitioning.field
+                granularity = time_partitioning.type_ or 'DAY'
+                field_type = field_types.get(field)
+                if field_type == 'DATE' and granularity == 'DAY':
+                    clauses.append(f"PARTITION BY {field}")
+                elif field_type in _TRUNC_FUNCTIONS:
+                    clauses.append(f"PARTITION BY {_TRUNC_FUNCTIONS[field_type]}({field}, {granularity})")
+            elif range_partitioning and range_partitioning.field in output_columns:
+                r = range_partitioning.range_
+                clauses.append(
+                    f"PARTITION BY RANGE_BUCKET({range_partitioning.field}, "
+                    f"GENERATE_ARRAY({r.start}, {r.end}, {r.interval}))"
+                )
+
+        # RLS column first: the view filters on it on every read
+        clustering = [rls_column] if rls_column else []
+        clustering += [c for c in (source_table.clustering_fields or []) if c in output_columns and c not in clustering]
+        clustering = [
+            c for c in clustering
+            if field_types.get(c[len(RLS_COLUMN_PREFIX):] if c.startswith(RLS_COLUMN_PREFIX) else c) in _CLUSTERABLE_TYPES
+        ]
+        if clustering:
+            clauses.append(f"CLUSTER BY {', '.join(clustering[:4])}")
+
+        return '\n'.join(clauses)
+
+    def build_sql(
+        self,
+        view_id: str,
+        source_table_id: str,
+        select_columns: List[str],
+        column_protection: Dict[str, str],
+        where_clause: Optional[str] = None,
+        partition_like_source: bool = True
+    ) -> Tuple[str, str]:
+        """
+        Snapshot DDL + view DDL for a materialized CLS view
+
+        Args:
+            select_columns: masked projection (same expressions as the logical view)
+            column_protection: {column: VISIBLE/HIDDEN/HASH/...}
+            where_clause: RLS predicate of the logical view (source field names)
+
+        Returns:
+            (snapshot_sql, view_sql)
+        """
+        _, view_dataset, view_name = view_id.split('.')
+        source_project, source_dataset, _ = source_table_id.split('.')
+        snapshot_table = self.snapshot_table_id(source_project, source_dataset, view_name)
+        source_table = self.metadata_cache.get_table(source_table_id)
+
+        select_columns = list(select_columns)
+        output_columns = [c for c, p in column_protection.items() if p == 'VISIBLE']
+
+        rls_column = None
+        view_where = where_clause
+        if where_clause:
+            rls_field = rls_filter_field(where_clause)
+            if not rls_field:
+                raise ValueError("Materialized mode needs an RLS filter of the form '<field> IN (...)'")
+
+            if column_protection.get(rls_field, 'VISIBLE') == 'VISIBLE':
+                rls_column = rls_field
+            else:
+                # Masked/hidden in the output: keep the raw value for the filter only
+                rls_column = f"{RLS_COLUMN_PREFIX}{rls_field}"
+                select_columns.append(f"{rls_field} AS {rls_column}")
+                view_where = _rename_rls_field(where_clause, rls_column)
+
+        layout = self._layout_clauses(source_table, output_columns, rls_column, partition_like_source)
+
+        snapshot_sql = (
+            f"CREATE OR REPLACE TABLE `{snapshot_table}`\n"
+            + (f"{layout}\n" if layout else "")
+            + f"OPTIONS(description = 'CLS masked snapshot for {view_id}')\n"
+            f"AS\n"
+            f"SELECT\n"
+            f"  {(','+chr(10)+'  ').join(select_columns)}\n"
+            f"FROM `{source_table_id}`"
+        )
+
+        hidden_rls = rls_column if rls_column and rls_column.startswith(RLS_COLUMN_PREFIX) else None
+        view_sql = (
+            f"CREATE OR REPLACE VIEW `{view_id}` AS\n"
+            f"SELECT *{f' EXCEPT({hidden_rls})' if hidden_rls else ''}\n"
+            f"FROM `{snapshot_table}`"
+            + (f"\nWHERE {view_where}" if view_where else "")
+            + ";"
+        )
+
+        return snapshot_sql, view_sql
+
+    # ==================== LIFECYCLE ====================
+
+    def _authorize_view(self, view_id: str, source_dataset_id: str):
+        """Authorize the view on the dataset holding the snapshot"""
+        project_id, view_dataset, view_name = view_id.split('.')
+        get_view_registrar(self.project_id).authorize_view(
+            source_dataset_id, view_dataset, view_name, view_project=project_id
+        )
+
+    def materialize(
+        self,
+        view_id: str,
+        source_table_id: str,
+        snapshot_sql: str,
+        view_sql: str,
+        refresh_seconds: int,
+        user_email: str = None
+    ) -> Dict:
+        """Build the snapshot, point the view at it and register it for refresh"""
+        self.ensure_registry()
+        snapshot_table = self._snapshot_from_sql(snapshot_sql)
+
+        source_modified = self.client.get_table(source_table_id).modified
+        self.metadata_cache.run_ddl(snapshot_sql, snapshot_table)
+        self._authorize_view(view_id, '.'.join(snapshot_table.split('.')[:2]))
+        self.metadata_cache.run_ddl(view_sql, view_id)
+
+        merge_query = f"""
+        MERGE `{self.registry_table}` T
+        USING (SELECT @view_id AS view_id) S
+        ON T.view_id = S.view_id
+        WHEN MATCHED THEN
+            UPDATE SET snapshot_table = @snapshot_table, source_table = @source_table,
+                       snapshot_sql = @snapshot_sql, refresh_seconds = @refresh_seconds,
+                       refreshed_at = CURRENT_TIMESTAMP(), source_modified_at = @source_modified_at,
+                       updated_by = @updated_by
+        WHEN NOT MATCHED THEN
+            INSERT (view_id, snapshot_table, source_table, snapshot_sql, refresh_seconds,
+                    refreshed_at, source_modified_at, updated_by)
+            VALUES (@view_id, @snapshot_table, @source_table, @snapshot_sql, @refresh_seconds,
+                    CURRENT_TIMESTAMP(), @source_modified_at, @updated_by)
+        """
+        self.client.query(merge_query, job_config=bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("view_id", "STRING", view_id),
+            bigquery.ScalarQueryParameter("snapshot_table", "STRING", snapshot_table),
+            bigquery.ScalarQueryParameter("source_table", "STRING", source_table_id),
+            bigquery.ScalarQueryParameter("snapshot_sql", "STRING", snapshot_sql),
+            bigquery.ScalarQueryParameter("refresh_seconds", "INT64", int(refresh_seconds)),
+            bigquery.ScalarQueryParameter("source_modified_at", "TIMESTAMP", source_modified),
+            bigquery.ScalarQueryParameter("updated_by", "STRING", user_email),
+        ])).result()
+
+        get_snapshot_refresher(self.project_id).start()
+
+        print(f"[DEBUG] ✓ {view_id} materialized into {snapshot_table}")
+        return {'view_id': view_id, 'snapshot_table': snapshot_table}
+
+    @staticmethod
+    def _snapshot_from_sql(snapshot_sql: str) -> str:
+        return re.search(r'CREATE OR REPLACE TABLE `([^`]+)`', snapshot_sql).group(1)
+
+    def refresh(self, view_id: str, entry: Dict = None) -> bool:
+        """Rebuild the snapshot of a materialized view from its stored SQL"""
+        if entry is None:
+            entries = self.list_registered([view_id])
+            if not entries:
+                return False
+            entry = entries[0]
+
+        source_modified = self.client.get_table(entry['source_table']).modified
+        self.metadata_cache.run_ddl(entry['snapshot_sql'], entry['snapshot_table'])
+
+        self.client.query(f"""
+        UPDATE `{self.registry_table}`
+        SET refreshed_at = CURRENT_TIMESTAMP(), source_modified_at = @source_modified_at
+        WHERE view_id = @view_id
+        """, job_config=bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("view_id", "STRING", view_id),
+            bigquery.ScalarQueryParameter("source_modified_at", "TIMESTAMP", source_modified),
+        ])).result()
+
+        print(f"[DEBUG] ✓ Snapshot refreshed for {view_id}")
+        return True
+
+    def dematerialize(self, view_id: str):
+        """Drop the snapshot and registry entry (the caller rewrites the view as logical)"""
+        for entry in self.list_registered([view_id]):
+            self.metadata_cache.delete_table(entry['snapshot_table'], not_found_ok=True)
+            self.client.query(
+                f"DELETE FROM `{self.registry_table}` WHERE view_id = @view_id",
+                job_config=bigquery.QueryJobConfig(query_parameters=[
+                    bigquery.ScalarQueryParameter("view_id", "STRING", view_id)
+                ])
+            ).result()
+            print(f"[DEBUG] ✓ {view_id} back to logical mode")
+
+    # ==================== STALENESS ====================
+
+    def _status(self, entry: Dict, now: datetime) -> Dict:
+        try:
+            source_modified = self.client.get_table(entry['source_table']).modified
+        except NotFound:
+            source_modified = None
+
+        refreshed_at = entry.get('refreshed_at')
+        age_seconds = int((now - refreshed_at).total_seconds()) if refreshed_at else None
+        source_changed = bool(
+            source_modified and (entry.get('source_modified_at') is None or source_modified > entry['source_modified_at'])
+        )
+        refresh_seconds = entry.get('refresh_seconds') or 0
+
+        return {
+            'view_id': entry['view_id'],
+            'snapshot_table': entry['snapshot_table'],
+            'refreshed_at': refreshed_at,
+            'age_seconds': age_seconds,
+            'source_changed': source_changed,
+            'refresh_seconds': refresh_seconds,
+            'due': source_changed or (refresh_seconds > 0 and (age_seconds is None or age_seconds >= refresh_seconds))
+        }
+
+    def get_status(self, view_ids: List[str] = None) -> Dict[str, Dict]:
+        """{view_id: staleness status} for materialized views"""
+        now = datetime.now(timezone.utc)
+        return {entry['view_id']: self._status(entry, now) for entry in self.list_registered(view_ids)}
+
+    def refresh_due(self) -> Optional[List[str]]:
+        """
+        Refresh every snapshot whose source changed or whose interval elapsed
+
+        Returns:
+            Refreshed view ids, or None if no view is materialized
+        """
+        now = datetime.now(timezone.utc)
+        refreshed = []
+        entries = self.list_registered()
+        if not entries:
+            return None
+        for entry in entries:
+            try:
+                if self._status(entry, now)['due'] and self.refresh(entry['view_id'], entry):
+                    refreshed.append(entry['view_id'])
+            except Exception as e:
+                print(f"[ERROR] Snapshot refresh failed for {entry['view_id']}: {e}")
+        return refreshed
+
+
+def format_staleness(status: Optional[Dict]) -> str:
+    """Short label for the UI: 'logical', 'fresh (5m ago)', 'stale (source changed)'..."""
+    if not status:
+        return 'logical'
+    age = status.get('age_seconds')
+    age_text = 'never' if age is None else (
+        f"{age}s ago" if age < 60 else f"{age // 60}m ago" if age < 3600 else f"{age // 3600}h ago"
+    )
+    if status.get('source_changed'):
+        return f"stale (source changed, refreshed {age_text})"
+    if status.get('due'):
+        return f"stale (refreshed {age_text})"
+    return f"fresh (refreshed {age_text})"
+
+
+class CLSSnapshotRefresher:
+    """Background thread calling refresh_due() every CLS_SNAPSHOT_CHECK_SECONDS"""
+
+    def __init__(self, project_id: str, interval: float = None):
+        self.service = CLSMaterializationService(project_id)
+        self.interval = interval or Config.CLS_SNAPSHOT_CHECK_SECONDS
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='cls-snapshot-refresher', daemon=True)
+            self._thread.start()
+        print(f"[DEBUG] CLS snapshot refresher started (every {self.interval}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                refreshed = self.service.refresh_due()
+                if refreshed is None:
+                    # Nada materializado: para até o próximo materialize/list_registered
+                    print("[DEBUG] No materialized CLS views left, snapshot refresher stopped")
+                    return
+                if refreshed:
+                    print(f"[DEBUG] ✓ Refreshed {len(refreshed)} CLS snapshot(s)")
+            except Exception as e:
+                print(f"[ERROR] CLS snapshot refresher: {e}")
+
+
+_refreshers: Dict[str, CLSSnapshotRefresher] = {}
+_refreshers_lock = threading.Lock()
+
+
+def get_snapshot_refresher(project_id: str = None) -> CLSSnapshotRefresher:
+    project_id = project_id or Config.PROJECT_ID
+    with _refreshers_lock:
+        refresher = _refreshers.get(project_id)
+        if refresher is None:
+            refresher = CLSSnapshotRefresher(project_id)
+            _refreshers[project_id] = refresher
+        return refresher
+
+
+def shutdown_snapshot_refreshers():
+    with _refreshers_lock:
+        for refresher in _refreshers.values():
+            refresher.stop()
@@ -1,11 +1,52 @@
 """
 Data Catalog Service for CLS
 Manages taxonomies and policy tags in Google Cloud Data Catalog
+
+Reads go through a taxonomy snapshot: every taxonomy's tags are listed once
+(ListPolicyTags is flat per taxonomy), taxonomies concurrently, and the
+parent/child tree and child counts are built in memory. The snapshot is
+cached per project/location and dropped by every write in this service.
 """
 
 from google.cloud import datacatalog_v1
-from typing import List, Dict, Optional
+from google.api_core.exceptions import Aborted
+from google.iam.v1 import iam_policy_pb2, options_pb2
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Dict, Optional
+import random
 import re
+import threading
+import time
+
+from config import Config
+from services.client_registry import get_policy_tag_manager_client
+
+# parent (projects/x/locations/y) -> (expires_at, snapshot)
+_snapshots: Dict[str, tuple] = {}
+_snapshots_lock = threading.Lock()
+
+# Bumped on every invalidation: a load that started before a write must not
+# store its (pre-write) result after the write invalidated the cache
+_generations: Dict[str, int] = {}
+_global_generation = 0
+
+
+def _snapshot_generation(parent: str) -> tuple:
+    """Current generation of a parent (call with _snapshots_lock held)"""
+    return (_global_generation, _generations.get(parent, 0))
+
+
+def invalidate_taxonomy_snapshot(parent: str = None):
+    """Drop the cached snapshot of a project/location (all of them if None)"""
+    global _global_generation
+    
+    with _snapshots_lock:
+        if parent is None:
+            _snapshots.clear()
+            _global_generation += 1
+        else:
+            _snapshots.pop(parent, None)
+            _generations[parent] = _generations.get(parent, 0) + 1
 
 
 class DataCatalogService:
@@ -14,36 +55,111 @@ class DataCatalogService:
     def __init__(self, project_id: str, location: str = "us-central1"):
         self.project_id = project_id
         self.location = location
-        self.client = datacatalog_v1.PolicyTagManagerClient()
+        self.client = get_policy_tag_manager_client()
         self.parent = f"projects/{project_id}/locations/{location}"
     
+    # ==================== SNAPSHOT ====================
+    
+    def _tag_to_dict(self, tag) -> Dict:
+        return {
+            "name": tag.name,
+            "display_name": tag.display_name,
+            "description": tag.description,
+            "parent_tag": tag.parent_policy_tag if tag.parent_policy_tag else None,
+            "child_count": 0,
+            "children": []
+        }
+    
+    def _build_tag_tree(self, tags) -> List[Dict]:
+        """Tag dicts with child_count / children filled from the flat listing"""
+        result = [self._tag_to_dict(tag) for tag in tags]
+        by_name = {tag["name"]: tag for tag in result}
+        
+        for tag in result:
+            parent = by_name.get(tag["parent_tag"])
+            if parent:
+                parent["children"].append(tag["name"])
+                parent["child_count"] += 1
+        
+        return result
+    
+    def _load_taxonomy(self, taxonomy) -> Dict:
+        """One ListPolicyTags (all pages) for a taxonomy"""
+        entry = {
+            "name": taxonomy.name,
+            "display_name": taxonomy.display_name,
+            "description": taxonomy.description,
+            "activated_policy_types": list(taxonomy.activated_policy_types),
+            "tags": [],
+            "tag_count": 0,
+            "error": None
+        }
+        try:
+            tags = self.client.list_policy_tags(
+                request=datacatalog_v1.ListPolicyTagsRequest(parent=taxonomy.name)
+            )
+            entry["tags"] = self._build_tag_tree(tags)
+            entry["tag_count"] = len(entry["tags"])
+        except Exception as tag_error:
+            # Contar tags de forma segura para não quebrar o snapshot inteiro
+            print(f"Warning: Could not list tags for {taxonomy.display_name}: {tag_error}")
+            entry["error"] = str(tag_error)
+        return entry
+    
+    def get_taxonomy_snapshot(self, force_refresh: bool = False) -> Dict:
+        """
+        All taxonomies of the project/location with their tag trees
+        
+        Returns:
+            {'taxonomies': [{..., 'tags': [...], 'tag_count', 'error'}],
+             'tags': {tag name: tag dict}, 'loaded_at': epoch seconds}
+        """
+        with _snapshots_lock:
+            cached = _snapshots.get(self.parent)
+            generation = _snapshot_generation(self.parent)
+        if not force_refresh and cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        request = datacatalog_v1.ListTaxonomiesRequest(parent=self.parent)
+        taxonomies = list(self.client.list_taxonomies(request=request))
+        
+        if taxonomies:
+            workers = min(len(taxonomies), Config.TAXONOMY_SNAPSHOT_MAX_WORKERS)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='taxonomy-snapshot') as executor:
+                entries = list(executor.map(self._load_taxonomy, taxonomies))
+        else:
+            entries = []
+        
+        snapshot = {
+            "taxonomies": entries,
+            "tags": {tag["name"]: tag for entry in entries for tag in entry["tags"]},
+            "loaded_at": time.time()
+        }
+        
+        with _snapshots_lock:
+            # Invalidated while loading: return the result but don't cache it
+            if _snapshot_generation(self.parent) == generation:
+                _snapshots[self.parent] = (time.monotonic() + Config.TAXONOMY_SNAPSHOT_TTL_SECONDS, snapshot)
+        
+        return snapshot
+    
+    def invalidate_snapshot(self):
+        invalidate_taxonomy_snapshot(self.parent)
+    
     # ==================== TAXONOMIES ====================
     
     def list_taxonomies(self) -> List[Dict]:
         """List all taxonomies in the project"""
         try:
-            request = datacatalog_v1.ListTaxonomiesRequest(parent=self.parent)
-            taxonomies = self.client.list_taxonomies(request=request)
+            snapshot = self.get_taxonomy_snapshot()
             
-            result = []
-            for taxonomy in taxonomies:
-                # Contar tags de forma segura para não quebrar se falhar
-                try:
-                    tags = self.list_policy_tags(taxonomy.name)
-                    tag_count = len(tags)
-                except Exception as tag_error:
-                    print(f"Warning: Could not count tags for {taxonomy.display_name}: {tag_error}")
-                    tag_count = 0
-                
-                result.append({
-                    "name": taxonomy.name,
-                    "display_name": taxonomy.display_name,
-                    "description": taxonomy.description,
-                    "tag_count": tag_count,
-                    "activated_policy_types": list(taxonomy.activated_policy_types)
-                })
-            
-            return result
+            return [{
+                "name": entry["name"],
+                "display_name": entry["display_name"],
+                "description": entry["description"],
+                "tag_count": entry["tag_count"],
+                "activated_policy_types": entry["activated_policy_types"]
+            } for entry in snapshot["taxonomies"]]
         except Exception as e:
             print(f"Error listing taxonomies: {e}")
             import traceback
@@ -67,6 +183,7 @@ class DataCatalogService:
             )
             
             result = self.client.create_taxonomy(request=request)
+            self.invalidate_snapshot()
             return result.name
             
         except Exception as e:
@@ -78,6 +195,7 @@ class DataCatalogService:
         try:
             request = datacatalog_v1.DeleteTaxonomyRequest(name=taxonomy_name)
             self.client.delete_taxonomy(request=request)
+            self.invalidate_snapshot()
             return True
         except Exception as e:
             print(f"Error deleting taxonomy: {e}")
@@ -97,6 +215,7 @@ class DataCatalogService:
             
             update_request = datacatalog_v1.UpdateTaxonomyRequest(taxonomy=taxonomy)
             self.client.update_taxonomy(request=update_request)
+            self.invalidate_snapshot()
             return True
             
         except Exception as e:
@@ -108,29 +227,15 @@ class DataCatalogService:
     def list_policy_tags(self, taxonomy_name: str) -> List[Dict]:
         """List all policy tags in a taxonomy"""
         try:
-            request = datacatalog_v1.ListPolicyTagsRequest(parent=taxonomy_name)
-            tags = self.client.list_policy_tags(request=request)
-            
-            result = []
-            for tag in tags:
-                # Contar child tags de forma segura
-                try:
-                    child_tags = list(self.client.list_policy_tags(
-                        request=datacatalog_v1.ListPolicyTagsRequest(parent=tag.name)
-                    ))
-                    child_count = len(child_tags)
-                except Exception:
-                    child_count = 0
-                
-                result.append({
-                    "name": tag.name,
-                    "display_name": tag.display_name,
-                    "description": tag.description,
-                    "parent_tag": tag.parent_policy_tag if tag.parent_policy_tag else None,
-                    "child_count": child_count
-                })
+            snapshot = self.get_taxonomy_snapshot()
+            for entry in snapshot["taxonomies"]:
+                if entry["name"] == taxonomy_name and entry["error"] is None:
+                    # Cópias: o snapshot é compartilhado
+                    return [dict(tag, children=list(tag["children"])) for tag in entry["tags"]]
             
-            return result
+            # Taxonomia fora do snapshot (outro projeto/location): lista direto
+            request = datacatalog_v1.ListPolicyTagsRequest(parent=taxonomy_name)
+            return self._build_tag_tree(self.client.list_policy_tags(request=request))
         except Exception as e:
             print(f"Error listing policy tags: {e}")
             import traceback
@@ -155,6 +260,7 @@ class DataCatalogService:
             )
             
             result = self.client.create_policy_tag(request=request)
+            self.invalidate_snapshot()
             return result.name
             
         except Exception as e:
@@ -168,6 +274,7 @@ class DataCatalogService:
         try:
             request = datacatalog_v1.DeletePolicyTagRequest(name=tag_name)
             self.client.delete_policy_tag(request=request)
+            self.invalidate_snapshot()
             return True
         except Exception as e:
             print(f"Error deleting policy tag: {e}")
@@ -187,6 +294,7 @@ class DataCatalogService:
             
             update_request = datacatalog_v1.UpdatePolicyTagRequest(policy_tag=tag)
             self.client.update_policy_tag(request=update_request)
+            self.invalidate_snapshot()
             return True
             
         except Exception as e:
@@ -195,11 +303,74 @@ class DataCatalogService:
     
     # ==================== IAM PERMISSIONS ====================
     
+    FINE_GRAINED_READER = "roles/datacatalog.categoryFineGrainedReader"
+    
+    MEMBER_TYPES = ("user", "group", "serviceAccount", "domain")
+    
+    @classmethod
+    def _member(cls, member: str) -> str:
+        """IAM member with its type prefix (user:, group:, serviceAccount:, domain:)"""
+        member_type, _, identity = member.partition(':')
+        if member_type not in cls.MEMBER_TYPES or not identity:
+            # Um e-mail puro pode ser usuário ou grupo; não dá para adivinhar
+            raise ValueError(
+                f"Invalid IAM member '{member}': expected one of "
+                f"{', '.join(t + ':' for t in cls.MEMBER_TYPES)} followed by the identity"
+            )
+        return member
+    
+    def _get_policy(self, tag_name: str):
+        # Versão 3 para não perder bindings condicionais no set
+        return self.client.get_iam_policy(request=iam_policy_pb2.GetIamPolicyRequest(
+            resource=tag_name,
+            options=options_pb2.GetPolicyOptions(requested_policy_version=3)
+        ))
+    
+    @staticmethod
+    def _role_binding(policy, role: str, create: bool = False):
+        """Unconditional binding of a role (conditional bindings are never touched)"""
+        for binding in policy.bindings:
+            if binding.role == role and not binding.HasField('condition'):
+                return binding
+        return policy.bindings.add(role=role) if create else None
+    
+    @staticmethod
+    def _drop_empty_bindings(policy):
+        for i in reversed(range(len(policy.bindings))):
+            if not policy.bindings[i].members:
+                del policy.bindings[i]
+    
+    def _update_tag_policy(self, tag_name: str, mutate: Callable) -> Dict:
+        """
+        Read-modify-write of a tag's IAM policy
+        
+        mutate(policy) edits the policy in place and returns True if it
+        changed anything. The etag read with the policy goes back with the
+        set, so a concurrent change makes the set fail with ABORTED; that
+        (and only that) is retried from a fresh read.
+        """
+        for attempt in range(1, Config.TAG_IAM_MAX_RETRIES + 1):
+            policy = self._get_policy(tag_name)
+            if not mutate(policy):
+                return {"status": "unchanged", "attempts": attempt}
+            
+            self._drop_empty_bindings(policy)
+            try:
+                self.client.set_iam_policy(request=iam_policy_pb2.SetIamPolicyRequest(
+                    resource=tag_name,
+                    policy=policy
+                ))
+                return {"status": "updated", "attempts": attempt}
+            except Aborted:
+                print(f"[DEBUG] Etag conflict on {tag_name} (attempt {attempt}), retrying")
+                time.sleep(random.uniform(0.1, 0.5) * attempt)
+        
+        raise RuntimeError(f"Etag conflict persisted after {Config.TAG_IAM_MAX_RETRIES} attempts")
+    
     def get_tag_iam_policy(self, tag_name: str) -> Dict:
         """Get IAM policy for a policy tag"""
         try:
-            request = datacatalog_v1.GetIamPolicyRequest(resource=tag_name)
-            policy = self.client.get_iam_policy(request=request)
+            policy = self._get_policy(tag_name)
             
             bindings = []
             for binding in policy.bindings:
@@ -218,26 +389,102 @@ class DataCatalogService:
             return {"bindings": [], "etag": ""}
     
     def set_tag_iam_policy(self, tag_name: str, members: List[str], 
-                          role: str = "roles/datacatalog.categoryFineGrainedReader") -> bool:
-        """Set IAM policy for a policy tag"""
+                          role: str = FINE_GRAINED_READER) -> bool:
+        """Set the members of one role on a policy tag (other bindings are kept)"""
+        wanted = [self._member(m) for m in members]
+        
         try:
-            from google.iam.v1 import policy_pb2
+            def set_members(policy):
+                binding = self._role_binding(policy, role, create=bool(wanted))
+                if binding is None or list(binding.members) == wanted:
+                    return False
+                del binding.members[:]
+                binding.members.extend(wanted)
+                return True
             
-            binding = policy_pb2.Binding(
-                role=role,
-                members=members
-            )
-            
-            policy = policy_pb2.Policy(bindings=[binding])
-            
-            request = datacatalog_v1.SetIamPolicyRequest(
-                resource=tag_name,
-                policy=policy
-            )
-            
-            self.client.set_iam_policy(request=request)
+            self._update_tag_policy(tag_name, set_members)
             return True
             
         except Exception as e:
             print(f"Error setting IAM policy: {e}")
             return False
+    
+    def apply_tag_iam_edits(self, edits: List[Dict], max_workers: int = None) -> Dict[str, Dict]:
+        """
+        Grant/revoke roles on many policy tags
+        
+        Args:
+            edits: [{'tag': tag name, 'member': 'user:...' / 'group:...' / 'serviceAccount:...',
+                     'role': default FINE_GRAINED_READER, 'action': 'grant' | 'revoke'}]
+            max_workers: tags updated concurrently
+        
+        Edits are grouped per tag and merged into the existing bindings with
+        one read-modify-write per tag (etag guarded, conflicts retried).
+        
+        Returns:
+            {tag: {'status': 'updated'|'unchanged'|'failed', 'granted', 'revoked', 'attempts', 'error'}}
+        """
+        by_tag: Dict[str, List[tuple]] = {}
+        for edit in edits:
+            action = edit.get('action', 'grant')
+            if action not in ('grant', 'revoke'):
+                raise ValueError(f"Invalid action: {action}")
+            by_tag.setdefault(edit['tag'], []).append(
+                (action, self._member(edit['member']), edit.get('role') or self.FINE_GRAINED_READER)
+            )
+        
+        def apply(tag_name, tag_edits):
+            counts = {"granted": 0, "revoked": 0}
+            
+            def merge(policy):
+                counts["granted"] = counts["revoked"] = 0
+                for action, member, role in tag_edits:
+                    binding = self._role_binding(policy, role, create=(action == 'grant'))
+                    if action == 'grant' and member not in binding.members:
+                        binding.members.append(member)
+                        counts["granted"] += 1
+                    elif action == 'revoke' and binding is not None and member in binding.members:
+                        binding.members.remove(member)
+                        counts["revoked"] += 1
+                return counts["granted"] + counts["revoked"] > 0
+            
+            result = self._update_tag_policy(tag_name, merge)
+            return {**result, **counts, "error": None}
+        
+        results = {}
+        if not by_tag:
+            return results
+        
+        workers = min(max_workers or Config.TAG_IAM_MAX_WORKERS, len(by_tag))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tag-iam') as executor:
+            futures = {executor.submit(apply, tag, tag_edits): tag for tag, tag_edits in by_tag.items()}
+            for future in as_completed(futures):
+                tag_name = futures[future]
+                try:
+                    results[tag_name] = future.result()
+                except Exception as e:
+                    print(f"Error updating IAM policy of {tag_name}: {e}")
+                    results[tag_name] = {"status": "failed", "granted": 0, "revoked": 0,
+                                         "attempts": None, "error": str(e)}
+        
+        updated = sum(1 for r in results.values() if r["status"] == "updated")
+        failed = sum(1 for r in results.values() if r["status"] == "failed")
+        print(f"[DEBUG] ✓ Tag IAM: {len(edits)} edit(s) on {len(by_tag)} tag(s): "
+              f"{updated} updated, {len(by_tag) - updated - failed} unchanged, {failed} failed")
+        return results
+    
+    def grant_tag_access(self, tag_names: List[str], members: List[str],
+                         role: str = FINE_GRAINED_READER) -> Dict[str, Dict]:
+        """Grant a role to every member on every tag"""
+        return self.apply_tag_iam_edits([
+            {'tag': tag, 'member': member, 'role': role, 'action': 'grant'}
+            for tag in tag_names for member in members
+        ])
+    
+    def revoke_tag_access(self, tag_names: List[str], members: List[str],
+                          role: str = FINE_GRAINED_READER) -> Dict[str, Dict]:
+        """Revoke a role from every member on every tag"""
+        return self.apply_tag_iam_edits([
+            {'tag': tag, 'member': member, 'role': role, 'action': 'revoke'}
+            for tag in tag_names for member in members
+        ])
@@ -0,0 +1,183 @@
+"""
+Dataset Inventory Service
+Concurrent listing of the datasets of a project with their details
+
+list_datasets only returns references; location, description, creation time
+and access entries need one get_dataset per dataset, and table counts one
+list_tables per dataset. Done serially that is hundreds of round-trips for a
+project with a few hundred datasets.
+
+This service:
+    - fetches get_dataset on a bounded thread pool, each call with its own
+      timeout, and hands results over as they complete
+    - counts tables with one INFORMATION_SCHEMA.TABLES query per region
+      (falls back to list_tables for the datasets of a region whose query
+      fails, e.g. missing project-level permission)
+    - reports per-dataset failures in the result instead of aborting the list
+"""
+
+from google.cloud import bigquery
+from google.cloud.bigquery.retry import DEFAULT_RETRY
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional
+
+from config import Config
+from services.client_registry import get_bigquery_client
+from services.metadata_cache_service import get_metadata_cache
+
+
+class DatasetInventoryService:
+    def __init__(self, project_id: str, max_workers: int = None, timeout: float = None):
+        self.project_id = project_id
+        self.client = get_bigquery_client(project_id)
+        self.metadata_cache = get_metadata_cache(project_id)
+        self.max_workers = max_workers or Config.INVENTORY_MAX_WORKERS
+        self.timeout = timeout or Config.INVENTORY_CALL_TIMEOUT_SECONDS
+        # Retries of one call must also fit in its timeout
+        self.retry = DEFAULT_RETRY.with_deadline(self.timeout)
+
+    # ==================== DATASETS ====================
+
+    @staticmethod
+    def _record(dataset: bigquery.Dataset) -> Dict:
+        return {
+            'dataset_id': dataset.dataset_id,
+            'project': dataset.project,
+            'full_id': f"{dataset.project}.{dataset.dataset_id}",
+            'location': dataset.location,
+            'description': dataset.description or "",
+            'created': dataset.created,
+            'access_entries': list(dataset.access_entries),
+            'table_count': None,
+            'error': None
+        }
+
+    def _get_dataset(self, item) -> bigquery.Dataset:
+        return self.client.get_dataset(item.reference, retry=self.retry, timeout=self.timeout)
+
+    def iter_datasets(self) -> Iterator[Dict]:
+        """
+        Yield one record per dataset, in completion order
+
+        A dataset whose get_dataset failed is yielded with 'error' set and
+        only dataset_id / project / full_id filled.
+        """
+        items = self.metadata_cache.list_datasets()
+        if not items:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items)),
+                                thread_name_prefix='dataset-inventory') as executor:
+            futures = {executor.submit(self._get_dataset, item): item for item in items}
+
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    yield self._record(future.result())
+                except Exception as e:
+                    print(f"[ERROR] get_dataset {item.dataset_id}: {e}")
+                    yield {
+                        'dataset_id': item.dataset_id,
+                        'project': item.project,
+                        'full_id': f"{item.project}.{item.dataset_id}",
+                        'location': None,
+                        'description': "",
+                        'created': None,
+                        'access_entries': [],
+                        'table_count': None,
+                        'error': str(e)
+                    }
+
+    # ==================== TABLE COUNTS ====================
+
+    def _count_region(self, location: str) -> Dict[str, int]:
+        """{dataset_id: table count} for every dataset of the project in a region"""
+        query = f"""
+        SELECT table_schema, COUNT(*) AS table_count
+        FROM `{self.project_id}`.`region-{location.lower()}`.INFORMATION_SCHEMA.TABLES
+        GROUP BY table_schema
+        """
+        job = self.client.query(query, location=location, retry=self.retry, timeout=self.timeout)
+        return {row.table_schema: row.table_count for row in job.result(timeout=self.timeout)}
+
+    def _count_dataset(self, dataset_id: str) -> int:
+        return len(list(self.client.list_tables(
+            f"{self.project_id}.{dataset_id}", retry=self.retry, timeout=self.timeout
+        )))
+
+    def count_tables(self, records: List[Dict]) -> List[Dict]:
+        """
+        Fill 'table_count' of the records in place
+
+        One INFORMATION_SCHEMA query per region; datasets of a region whose
+        query failed are counted with list_tables. Datasets that still fail
+        get 'error' set.
+        """
+        by_location: Dict[str, List[Dict]] = {}
+        for record in records:
+            if record['error'] is None:
+                by_location.setdefault(record['location'], []).append(record)
+        if not by_location:
+            return records
+
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='dataset-inventory') as executor:
+            region_futures = {executor.submit(self._count_region, location): location
+                              for location in by_location}
+
+            fallback = {}
+            for future in as_completed(region_futures):
+                location = region_futures[future]
+                try:
+                    counts = future.result()
+                    for record in by_location[location]:
+                        # Empty datasets have no row in INFORMATION_SCHEMA
+                        record['table_count'] = counts.get(record['dataset_id'], 0)
+                except Exception as e:
+                    print(f"[WARNING] INFORMATION_SCHEMA count failed in {location}, "
+                          f"using list_tables for {len(by_location[location])} dataset(s): {e}")
+                    for record in by_location[location]:
+                        fallback[executor.submit(self._count_dataset, record['dataset_id'])] = record
+
+            for future in as_completed(fallback):
+                record = fallback[future]
+                try:
+                    record['table_count'] = future.result()
+                except Exception as e:
+                    print(f"[ERROR] list_tables {record['dataset_id']}: {e}")
+                    record['error'] = str(e)
+
+        return records
+
+    # ==================== INVENTORY ====================
+
+    def inventory(
+        self,
+        with_table_counts: bool = False,
+        on_result: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Full inventory of the project datasets
+
+        Args:
+            with_table_counts: also fill 'table_count' (after all datasets arrived,
+                since the regions are only known then)
+            on_result: called with each dataset record as soon as it arrives
+
+        Returns:
+            {'datasets': [...sorted by dataset_id], 'errors': [{'dataset_id', 'error'}]}
+        """
+        records = []
+        for record in self.iter_datasets():
+            records.append(record)
+            if on_result:
+                on_result(record)
+
+        if with_table_counts:
+            self.count_tables(records)
+
+        records.sort(key=lambda r: r['dataset_id'])
+        errors = [{'dataset_id': r['dataset_id'], 'error': r['error']} for r in records if r['error']]
+
+        print(f"[DEBUG] Dataset inventory: {len(records)} dataset(s), {len(errors)} error(s)")
+        return {'datasets': records, 'errors': errors}
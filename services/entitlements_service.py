@@ -0,0 +1,364 @@
+"""
+Entitlements Service
+Compiled per-identity entitlements for RLS views (optional mode)
+
+Legacy RLS views evaluate, on every query,
+    field IN (SELECT CAST(filter_value AS <type>) FROM policies_filters WHERE ...)
+With RLS_COMPILED_ENTITLEMENTS=true the manager keeps a derived table,
+rls_entitlements, with one row per (view scope, identity) holding the
+allowed values already cast to the field's type, and the view generators
+emit
+    field IN UNNEST((SELECT allowed_<type> FROM rls_entitlements WHERE ... identity = SESSION_USER()))
+which reads a single clustered row instead of casting every matching
+policies_filters row.
+
+Keys mirror the legacy view predicates:
+    - users views: (rls_type='users', project, dataset, table, field, username);
+      policy_name is stored as '' because users views don't filter on it
+    - group views: (rls_type='group', policy_name, project, dataset, table,
+      field, rls_group)
+
+Rows are rebuilt incrementally (one MERGE per changed scope/identities)
+whenever assignments change. Values that can't be cast to the field type are
+dropped at compile time (SAFE_CAST) instead of failing the view query.
+"""
+
+from google.cloud import bigquery
+from google.api_core.exceptions import NotFound
+from typing import Dict, List, Optional, Tuple
+import threading
+import time
+
+from config import Config
+from services.client_registry import get_bigquery_client
+from services.metadata_cache_service import get_metadata_cache
+
+# BigQuery schema type -> (SQL type for CAST, entitlements column)
+FIELD_TYPES: Dict[str, Tuple[str, str]] = {
+    'STRING': ('STRING', 'allowed_string'),
+    'INTEGER': ('INT64', 'allowed_int64'),
+    'INT64': ('INT64', 'allowed_int64'),
+    'FLOAT': ('FLOAT64', 'allowed_float64'),
+    'FLOAT64': ('FLOAT64', 'allowed_float64'),
+    'NUMERIC': ('NUMERIC', 'allowed_numeric'),
+    'BIGNUMERIC': ('BIGNUMERIC', 'allowed_bignumeric'),
+    'BOOLEAN': ('BOOL', 'allowed_bool'),
+    'BOOL': ('BOOL', 'allowed_bool'),
+    'DATE': ('DATE', 'allowed_date'),
+    'DATETIME': ('DATETIME', 'allowed_datetime'),
+    'TIMESTAMP': ('TIMESTAMP', 'allowed_timestamp'),
+}
+
+# entitlements column -> SQL type
+VALUE_COLUMNS = {column: sql_type for sql_type, column in FIELD_TYPES.values()}
+
+ENTITLEMENTS_SCHEMA = [
+    bigquery.SchemaField('rls_type', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('policy_name', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('project_id', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('dataset_id', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('table_id', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('field_id', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('identity', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('field_type', 'STRING'),
+] + [
+    bigquery.SchemaField(column, sql_type, mode='REPEATED')
+    for column, sql_type in sorted(VALUE_COLUMNS.items())
+] + [
+    bigquery.SchemaField('updated_at', 'TIMESTAMP'),
+]
+
+CLUSTERING_FIELDS = ['dataset_id', 'table_id', 'identity']
+
+
+def is_compiled_mode() -> bool:
+    return Config.RLS_COMPILED_ENTITLEMENTS
+
+
+def build_rls_filter(
+    field: str,
+    field_type: str,
+    rls_type: str,
+    project_id: str,
+    dataset_id: str,
+    table_id: str,
+    policy_name: str = None,
+    group: str = None,
+    compiled: bool = None
+) -> str:
+    """
+    WHERE predicate of a generated RLS view
+
+    Args:
+        rls_type: 'users' (filters by SESSION_USER()) or 'group'
+                  (filters by policy_name + the group email)
+        compiled: defaults to RLS_COMPILED_ENTITLEMENTS; field types without
+                  a typed entitlements column always use the legacy subquery
+    """
+    if compiled is None:
+        compiled = is_compiled_mode()
+
+    if rls_type == 'group':
+        policy_predicate = f"    AND policy_name = '{policy_name}'\n"
+    else:
+        policy_predicate = ""
+
+    if compiled and field_type.upper() in FIELD_TYPES:
+        column = FIELD_TYPES[field_type.upper()][1]
+        identity = f"'{group}'" if rls_type == 'group' else "SESSION_USER()"
+        return (
+            f"{field} IN UNNEST((\n"
+            f"  SELECT {column}\n"
+            f"  FROM `{Config.ENTITLEMENTS_TABLE}`\n"
+            f"  WHERE rls_type = '{rls_type}'\n"
+            f"    AND policy_name = '{policy_name if rls_type == 'group' else ''}'\n"
+            f"    AND project_id = '{project_id}'\n"
+            f"    AND dataset_id = '{dataset_id}'\n"
+            f"    AND table_id = '{table_id}'\n"
+            f"    AND field_id = '{field}'\n"
+            f"    AND identity = {identity}\n"
+            f"))"
+        )
+
+    identity_predicate = f"rls_group = '{group}'" if rls_type == 'group' else "username = SESSION_USER()"
+    return (
+        f"{field} IN (\n"
+        f"  SELECT CAST(filter_value AS {field_type})\n"
+        f"  FROM `{Config.FILTER_TABLE}`\n"
+        f"  WHERE rls_type = '{rls_type}'\n"
+        f"{policy_predicate}"
+        f"    AND project_id = '{project_id}'\n"
+        f"    AND dataset_id = '{dataset_id}'\n"
+        f"    AND table_id = '{table_id}'\n"
+        f"    AND field_id = '{field}'\n"
+        f"    AND {identity_predicate}\n"
+        f")"
+    )
+
+
+class EntitlementsService:
+    def __init__(self, project_id: str):
+        self.project_id = project_id
+        self.client = get_bigquery_client(project_id)
+        self.metadata_cache = get_metadata_cache(project_id)
+        self.table_id = Config.ENTITLEMENTS_TABLE
+        self._table_ready = False
+        self._lock = threading.Lock()
+
+    # ==================== TABLE ====================
+
+    def ensure_table(self):
+        """Create rls_entitlements (clustered by dataset, table, identity) if missing"""
+        with self._lock:
+            if self._table_ready:
+                return
+            try:
+                self.client.get_table(self.table_id)
+            except NotFound:
+                table = bigquery.Table(self.table_id, schema=ENTITLEMENTS_SCHEMA)
+                table.clustering_fields = CLUSTERING_FIELDS
+                self.client.create_table(table, exists_ok=True)
+                print(f"[DEBUG] ✓ Created {self.table_id}")
+            self._table_ready = True
+
+    def get_field_type(self, dataset_id: str, table_id: str, field_id: str) -> Optional[str]:
+        """Schema type of the filter field on the base table"""
+        for field in self.metadata_cache.get_schema(f"{self.project_id}.{dataset_id}.{table_id}"):
+            if field.name == field_id:
+                return field.field_type
+        return None
+
+    # ==================== COMPILE ====================
+
+    def refresh(
+        self,
+        dataset_id: str,
+        table_id: str,
+        field_id: str,
+        rls_type: str,
+        identities: List[str] = None,
+        field_type: str = None
+    ) -> int:
+        """
+        Recompile the entitlements of one view scope with a single MERGE
+
+        Args:
+            identities: usernames / group emails whose assignments changed;
+                        None rebuilds every identity in the scope
+
+        Returns:
+            Number of entitlement rows inserted, updated or deleted
+        """
+        field_type = (field_type or self.get_field_type(dataset_id, table_id, field_id) or '').upper()
+        if field_type not in FIELD_TYPES:
+            print(f"[DEBUG] No compiled entitlements for {dataset_id}.{table_id}.{field_id} ({field_type or 'unknown type'})")
+            return 0
+
+        self.ensure_table()
+        sql_type, column = FIELD_TYPES[field_type]
+        identities = sorted({i for i in identities if i}) if identities is not None else None
+
+        # Only the column of the current field type is kept (the field may have changed)
+        set_columns = ",\n                ".join(
+            f"{c} = {'S.allowed' if c == column else f'ARRAY<{t}>[]'}"
+            for c, t in sorted(VALUE_COLUMNS.items())
+        )
+
+        merge_query = f"""
+        MERGE `{self.table_id}` T
+        USING (
+            SELECT
+                rls_type,
+                IF(rls_type = 'group', policy_name, '') AS policy_name,
+                project_id, dataset_id, table_id, field_id,
+                IF(rls_type = 'group', rls_group, username) AS identity,
+                IFNULL(ARRAY_AGG(DISTINCT SAFE_CAST(filter_value AS {sql_type}) IGNORE NULLS), []) AS allowed
+            FROM `{Config.FILTER_TABLE}`
+            WHERE rls_type = @rls_type
+              AND project_id = @project_id
+              AND dataset_id = @dataset_id
+              AND table_id = @table_id
+              AND field_id = @field_id
+              AND IF(rls_type = 'group', rls_group, username) IS NOT NULL
+              AND (@all_identities OR IF(rls_type = 'group', rls_group, username) IN UNNEST(@identities))
+            GROUP BY 1, 2, 3, 4, 5, 6, 7
+        ) S
+        ON T.rls_type = S.rls_type
+           AND T.policy_name = S.policy_name
+           AND T.project_id = S.project_id
+           AND T.dataset_id = S.dataset_id
+           AND T.table_id = S.table_id
+           AND T.field_id = S.field_id
+           AND T.identity = S.identity
+        WHEN MATCHED THEN
+            UPDATE SET
+                field_type = @field_type,
+                {set_columns},
+                updated_at = CURRENT_TIMESTAMP()
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT (rls_type, policy_name, project_id, dataset_id, table_id, field_id,
+                    identity, field_type, {column}, updated_at)
+            VALUES (S.rls_type, S.policy_name, S.project_id, S.dataset_id, S.table_id, S.field_id,
+                    S.identity, @field_type, S.allowed, CURRENT_TIMESTAMP())
+        WHEN NOT MATCHED BY SOURCE
+             AND T.rls_type = @rls_type
+             AND T.project_id = @project_id
+             AND T.dataset_id = @dataset_id
+             AND T.table_id = @table_id
+             AND T.field_id = @field_id
+             AND (@all_identities OR T.identity IN UNNEST(@identities)) THEN
+            DELETE
+        """
+
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("rls_type", "STRING", rls_type),
+                bigquery.ScalarQueryParameter("project_id", "STRING", self.project_id),
+                bigquery.ScalarQueryParameter("dataset_id", "STRING", dataset_id),
+                bigquery.ScalarQueryParameter("table_id", "STRING", table_id),
+                bigquery.ScalarQueryParameter("field_id", "STRING", field_id),
+                bigquery.ScalarQueryParameter("field_type", "STRING", field_type),
+                bigquery.ScalarQueryParameter("all_identities", "BOOL", identities is None),
+                bigquery.ArrayQueryParameter("identities", "STRING", identities or []),
+            ]
+        )
+
+        job = self.client.query(merge_query, job_config=job_config)
+        job.result()
+        affected = job.num_dml_affected_rows or 0
+
+        print(f"[DEBUG] ✓ Entitlements {rls_type} {dataset_id}.{table_id}.{field_id}: "
+              f"{affected} row(s) ({'all identities' if identities is None else len(identities)})")
+        return affected
+
+    def rebuild_all(self, clear: bool = False) -> int:
+        """
+        Recompile every scope present in policies_filters (enabling the mode)
+
+        Args:
+            clear: drop the project's entitlements first, so scopes no longer
+                   in policies_filters (e.g. after a snapshot restore) go away
+        """
+        if clear:
+            self.ensure_table()
+            self.client.query(
+                f"DELETE FROM `{self.table_id}` WHERE project_id = @project_id",
+                job_config=bigquery.QueryJobConfig(
+                    query_parameters=[bigquery.ScalarQueryParameter("project_id", "STRING", self.project_id)]
+                )
+            ).result()
+
+        query = f"""
+        SELECT DISTINCT rls_type, dataset_id, table_id, field_id
+        FROM `{Config.FILTER_TABLE}`
+        WHERE project_id = @project_id
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("project_id", "STRING", self.project_id)]
+        )
+
+        total = 0
+        for row in self.client.query(query, job_config=job_config).result():
+            try:
+                total += self.refresh(row.dataset_id, row.table_id, row.field_id, row.rls_type)
+            except Exception as e:
+                print(f"[ERROR] Entitlements rebuild {row.dataset_id}.{row.table_id}.{row.field_id}: {e}")
+        return total
+
+
+_services: Dict[str, EntitlementsService] = {}
+_services_lock = threading.Lock()
+
+
+def get_entitlements_service(project_id: str = None) -> EntitlementsService:
+    """Process-wide EntitlementsService for a project"""
+    project_id = project_id or Config.PROJECT_ID
+
+    with _services_lock:
+        service = _services.get(project_id)
+        if service is None:
+            service = EntitlementsService(project_id)
+            _services[project_id] = service
+        return service
+
+
+def sync_entitlements(
+    project_id: str,
+    dataset_id: str,
+    table_id: str,
+    field_id: str,
+    rls_type: str,
+    identities: List[str] = None,
+    field_type: str = None,
+    revoke: bool = False
+):
+    """
+    Recompile entitlements after assignments change
+
+    No-op unless RLS_COMPILED_ENTITLEMENTS is enabled. When access is only
+    added, errors are logged, not raised: the assignment itself already
+    succeeded and the compiled views fail closed. When access is removed
+    (revoke=True) the MERGE is retried up to ENTITLEMENTS_REVOKE_MAX_RETRIES
+    times and then raised, since stale rows would keep granting the revoked
+    values.
+    """
+    if not is_compiled_mode():
+        return
+
+    attempts = Config.ENTITLEMENTS_REVOKE_MAX_RETRIES if revoke else 1
+    for attempt in range(1, attempts + 1):
+        try:
+            get_entitlements_service(project_id).refresh(
+                dataset_id, table_id, field_id, rls_type, identities, field_type
+            )
+            return
+        except Exception as e:
+            print(f"[ERROR] Failed to compile entitlements for {dataset_id}.{table_id}.{field_id} "
+                  f"(attempt {attempt}/{attempts}): {e}")
+            if revoke and attempt == attempts:
+                raise RuntimeError(
+                    f"Compiled entitlements for {dataset_id}.{table_id}.{field_id} were not updated "
+                    f"and may still grant the revoked access: {e}"
+                ) from e
+            if attempt < attempts:
+                time.sleep(2 ** (attempt - 1))
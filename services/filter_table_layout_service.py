@@ -0,0 +1,252 @@
+"""
+Filter Table Layout Service
+Owns the physical layout of rls_manager.policies_filters
+
+Every protected view filters through a subquery on policies_filters
+(dataset_id / table_id / field_id / username = SESSION_USER() or rls_group),
+so every end-user read of every RLS view scans this table. Clustering it by
+(dataset_id, table_id, username, rls_group) lets BigQuery prune blocks for
+those predicates instead of scanning the whole table.
+
+The table isn't time-partitioned: the view lookups never filter on a date,
+so partitioning would not prune anything.
+
+The service can:
+    - create the table with the clustered layout (ensure_table)
+    - migrate an existing table in place (clustering set with update_table,
+      existing rows reclustered by a no-op UPDATE; schema, column defaults
+      and table options are kept)
+    - measure bytes processed by the view lookup subquery per policy, before
+      and after the migration (measure_lookups / migrate_with_report)
+"""
+
+from google.cloud import bigquery
+from google.api_core.exceptions import NotFound
+from typing import Dict, List
+
+from config import Config
+from services.client_registry import get_bigquery_client
+from services.metadata_cache_service import get_metadata_cache
+
+CLUSTERING_FIELDS = ['dataset_id', 'table_id', 'username', 'rls_group']
+
+FILTER_TABLE_SCHEMA = [
+    bigquery.SchemaField('rls_type', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('policy_name', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('project_id', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('dataset_id', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('table_id', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('field_id', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('filter_value', 'STRING', mode='REQUIRED'),
+    bigquery.SchemaField('username', 'STRING'),
+    bigquery.SchemaField('rls_group', 'STRING'),
+    bigquery.SchemaField('service_account', 'STRING'),
+    bigquery.SchemaField('domain', 'STRING'),
+    bigquery.SchemaField('created_at', 'TIMESTAMP', default_value_expression='CURRENT_TIMESTAMP()'),
+    bigquery.SchemaField('updated_at', 'TIMESTAMP', default_value_expression='CURRENT_TIMESTAMP()'),
+    bigquery.SchemaField('id', 'STRING', default_value_expression='GENERATE_UUID()'),
+]
+
+
+class FilterTableLayoutService:
+    def __init__(self, project_id: str, table_id: str = None):
+        self.project_id = project_id
+        self.table_id = table_id or Config.FILTER_TABLE
+        self.client = get_bigquery_client(project_id)
+        self.metadata_cache = get_metadata_cache(project_id)
+
+    # ==================== LAYOUT ====================
+
+    def get_layout(self) -> Dict:
+        """Current clustering/partitioning and size of the filter table"""
+        table = self.client.get_table(self.table_id)
+        return {
+            'clustering_fields': list(table.clustering_fields or []),
+            'time_partitioning': table.time_partitioning.field if table.time_partitioning else None,
+            'num_rows': table.num_rows,
+            'num_bytes': table.num_bytes,
+            'is_clustered': list(table.clustering_fields or []) == CLUSTERING_FIELDS
+        }
+
+    def ensure_table(self) -> bool:
+        """
+        Create the filter table with the clustered layout if it doesn't exist
+
+        Returns:
+            True if the table was created
+        """
+        try:
+            self.client.get_table(self.table_id)
+            return False
+        except NotFound:
+            table = bigquery.Table(self.table_id, schema=FILTER_TABLE_SCHEMA)
+            table.clustering_fields = CLUSTERING_FIELDS
+            self.client.create_table(table)
+            self.metadata_cache.invalidate_table(self.table_id)
+            print(f"[DEBUG] ✓ Created {self.table_id} clustered by {', '.join(CLUSTERING_FIELDS)}")
+            return True
+
+    def migrate(self) -> bool:
+        """
+        Rewrite the filter table in place with the clustered layout
+
+        Returns:
+            True if the table was migrated, False if it was already clustered
+        """
+        if self.ensure_table():
+            return True
+
+        layout = self.get_layout()
+        if layout['is_clustered']:
+            print(f"[DEBUG] {self.table_id} already clustered by {', '.join(CLUSTERING_FIELDS)}")
+            return False
+
+        print(f"[DEBUG] Migrating {self.table_id}: {layout['clustering_fields'] or 'not clustered'} "
+              f"-> {CLUSTERING_FIELDS} ({layout['num_rows']} rows)")
+
+        # Clustering is changed on the table itself, so the schema (REQUIRED
+        # modes, DEFAULT id/created_at/updated_at), options and IAM stay as
+        # they are. Rows written from now on are clustered; the no-op UPDATE
+        # rewrites the existing rows into clustered blocks.
+        table = self.client.get_table(self.table_id)
+        table.clustering_fields = CLUSTERING_FIELDS
+        self.metadata_cache.update_table(table, ['clustering_fields'])
+
+        job = self.client.query(f"UPDATE `{self.table_id}` SET dataset_id = dataset_id WHERE TRUE")
+        job.result()
+
+        print(f"[DEBUG] ✓ {self.table_id} migrated ({job.num_dml_affected_rows or 0} rows reclustered)")
+        return True
+
+    def check_layout(self, auto_migrate: bool = False):
+        """Startup check: warn (or migrate) if the filter table isn't clustered"""
+        try:
+            try:
+                layout = self.get_layout()
+            except NotFound:
+                # Criar a tabela não é papel do check de startup
+                print(f"⚠️ {self.table_id} not found; layout not checked")
+                return
+
+            if layout['is_clustered']:
+                print(f"✓ {self.table_id} clustered by {', '.join(CLUSTERING_FIELDS)}")
+            elif auto_migrate:
+                self.migrate()
+            else:
+                print(f"⚠️ {self.table_id} is not clustered by {', '.join(CLUSTERING_FIELDS)}; "
+                      f"every RLS view read scans the whole table "
+                      f"(set FILTER_TABLE_AUTO_CLUSTER=true to migrate)")
+        except Exception as e:
+            print(f"[ERROR] Could not check layout of {self.table_id}: {e}")
+
+    # ==================== MEASUREMENT ====================
+
+    def _lookup_samples(self, limit: int) -> List[Dict]:
+        """One representative identity per policy (view) in the filter table"""
+        query = f"""
+        SELECT policy_name, rls_type, dataset_id, table_id, field_id,
+               ANY_VALUE(username) AS username, ANY_VALUE(rls_group) AS rls_group
+        FROM `{self.table_id}`
+        WHERE project_id = @project_id
+        GROUP BY policy_name, rls_type, dataset_id, table_id, field_id
+        ORDER BY policy_name
+        LIMIT @limit
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("project_id", "STRING", self.project_id),
+                bigquery.ScalarQueryParameter("limit", "INT64", limit),
+            ]
+        )
+        return [dict(row) for row in self.client.query(query, job_config=job_config).result()]
+
+    def measure_lookup(self, sample: Dict) -> Dict:
+        """
+        Bytes processed by the view's filter subquery for one identity
+
+        Runs the same predicate the generated views use (with the identity
+        bound instead of SESSION_USER()), uncached, and reports both the
+        dry-run estimate and the bytes actually processed/billed.
+        """
+        if sample['rls_type'] == 'group':
+            identity_predicate = "rls_group = @identity"
+            identity = sample['rls_group']
+        else:
+            identity_predicate = "username = @identity"
+            identity = sample['username']
+
+        query = f"""
+        SELECT filter_value
+        FROM `{self.table_id}`
+        WHERE rls_type = @rls_type
+          AND project_id = @project_id
+          AND dataset_id = @dataset_id
+          AND table_id = @table_id
+          AND field_id = @field_id
+          AND {identity_predicate}
+        """
+        params = [
+            bigquery.ScalarQueryParameter("rls_type", "STRING", sample['rls_type']),
+            bigquery.ScalarQueryParameter("project_id", "STRING", self.project_id),
+            bigquery.ScalarQueryParameter("dataset_id", "STRING", sample['dataset_id']),
+            bigquery.ScalarQueryParameter("table_id", "STRING", sample['table_id']),
+            bigquery.ScalarQueryParameter("field_id", "STRING", sample['field_id']),
+            bigquery.ScalarQueryParameter("identity", "STRING", identity),
+        ]
+
+        dry_run = self.client.query(query, job_config=bigquery.QueryJobConfig(
+            query_parameters=params, dry_run=True, use_query_cache=False
+        ))
+
+        job = self.client.query(query, job_config=bigquery.QueryJobConfig(
+            query_parameters=params, use_query_cache=False
+        ))
+        job.result()
+
+        return {
+            'policy_name': sample['policy_name'],
+            'identity': identity,
+            'estimated_bytes': dry_run.total_bytes_processed,
+            'processed_bytes': job.total_bytes_processed,
+            'billed_bytes': job.total_bytes_billed,
+        }
+
+    def measure_lookups(self, limit: int = 20) -> List[Dict]:
+        """measure_lookup for up to `limit` policies"""
+        return [self.measure_lookup(sample) for sample in self._lookup_samples(limit)]
+
+    def migrate_with_report(self, limit: int = 20) -> Dict:
+        """
+        Migrate the table and report per-view lookup bytes before and after
+
+        Returns:
+            {'migrated': bool, 'layout_before', 'layout_after', 'views': [...]}
+        """
+        self.ensure_table()
+
+        layout_before = self.get_layout()
+        samples = self._lookup_samples(limit)
+        before = [self.measure_lookup(sample) for sample in samples]
+
+        migrated = self.migrate()
+
+        after = [self.measure_lookup(sample) for sample in samples]
+        layout_after = self.get_layout()
+
+        views = []
+        for b, a in zip(before, after):
+            views.append({
+                'policy_name': b['policy_name'],
+                'identity': b['identity'],
+                'processed_bytes_before': b['processed_bytes'],
+                'processed_bytes_after': a['processed_bytes'],
+                'billed_bytes_before': b['billed_bytes'],
+                'billed_bytes_after': a['billed_bytes'],
+            })
+
+        return {
+            'migrated': migrated,
+            'layout_before': layout_before,
+            'layout_after': layout_after,
+            'views': views
+        }
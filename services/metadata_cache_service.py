@@ -0,0 +1,201 @@
+"""
+Metadata Cache Service
+Process-wide cache for BigQuery dataset lists, table lists and Table objects
+
+Entries are keyed by fully qualified id (project / project.dataset /
+project.dataset.table), expire after a TTL and are evicted LRU when the
+cache is full. Every write done by the app (update_table, update_dataset,
+CREATE OR REPLACE VIEW, delete_table) must invalidate the affected entries,
+either through the write-through helpers below or invalidate_*().
+
+Read paths (wizards, browsers) should use the cache. Paths that mutate the
+returned object and write it back should keep calling client.get_table /
+client.get_dataset directly so they always work on a fresh etag.
+"""
+
+from google.cloud import bigquery
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+import threading
+import time
+
+from config import Config
+from services.client_registry import lazy_bigquery_client
+
+
+class MetadataCacheService:
+    """TTL + LRU cache in front of list_datasets / list_tables / get_table"""
+
+    def __init__(self, client: bigquery.Client, ttl_seconds: int = None, max_entries: int = None):
+        self.client = client
+        self.project_id = client.project
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.METADATA_CACHE_TTL_SECONDS
+        self.max_entries = max_entries if max_entries is not None else Config.METADATA_CACHE_MAX_ENTRIES
+
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        # Bumped on every invalidation; a load that overlapped one isn't stored
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    # ==================== KEYS ====================
+
+    def _dataset_key(self, dataset) -> str:
+        """Normalize str / DatasetReference / Dataset / DatasetListItem to 'project.dataset'"""
+        if isinstance(dataset, str):
+            dataset = bigquery.DatasetReference.from_string(dataset, default_project=self.project_id)
+        return f"{dataset.project}.{dataset.dataset_id}"
+
+    def _table_key(self, table) -> str:
+        """Normalize str / TableReference / Table / TableListItem to 'project.dataset.table'"""
+        if isinstance(table, str):
+            table = bigquery.TableReference.from_string(table, default_project=self.project_id)
+        return f"{table.project}.{table.dataset_id}.{table.table_id}"
+
+    # ==================== CORE ====================
+
+    def _get_or_load(self, key: tuple, loader: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            generation = self._generation
+
+        # Load outside the lock so a slow API call doesn't block other readers
+        value = loader()
+
+        with self._lock:
+            if self._generation != generation:
+                # A write invalidated entries while loading: the value may be pre-write
+                return value
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return value
+
+    def _invalidate_where(self, predicate: Callable[[tuple], bool]):
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    # ==================== READS ====================
+
+    def list_datasets(self) -> List:
+        """Cached client.list_datasets() for the client project"""
+        return self._get_or_load(
+            ('datasets', self.project_id),
+            lambda: list(self.client.list_datasets())
+        )
+
+    def list_tables(self, dataset) -> List:
+        """Cached client.list_tables(dataset)"""
+        dataset_key = self._dataset_key(dataset)
+        return self._get_or_load(
+            ('tables', dataset_key),
+            lambda: list(self.client.list_tables(dataset_key))
+        )
+
+    def get_table(self, table) -> bigquery.Table:
+        """Cached client.get_table(table) - treat the result as read-only"""
+        table_key = self._table_key(table)
+        return self._get_or_load(
+            ('table', table_key),
+            lambda: self.client.get_table(table_key)
+        )
+
+    def get_schema(self, table) -> List[bigquery.SchemaField]:
+        """Schema of a cached Table"""
+        return list(self.get_table(table).schema)
+
+    # ==================== INVALIDATION ====================
+
+    def invalidate_table(self, table):
+        """Drop a Table entry and the table list of its dataset"""
+        table_key = self._table_key(table)
+        dataset_key = table_key.rsplit('.', 1)[0]
+        self._invalidate_where(
+            lambda k: k == ('table', table_key) or k == ('tables', dataset_key)
+        )
+
+    def invalidate_dataset(self, dataset):
+        """Drop the dataset list, the table list and every Table of a dataset"""
+        dataset_key = self._dataset_key(dataset)
+        project = dataset_key.split('.', 1)[0]
+        self._invalidate_where(
+            lambda k: k == ('datasets', project)
+            or k == ('tables', dataset_key)
+            or (k[0] == 'table' and k[1].startswith(f"{dataset_key}."))
+        )
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'ttl_seconds': self.ttl_seconds,
+                'max_entries': self.max_entries
+            }
+
+    # ==================== WRITE-THROUGH HELPERS ====================
+
+    def update_table(self, table: bigquery.Table, fields: List[str]) -> bigquery.Table:
+        updated = self.client.update_table(table, fields)
+        self.invalidate_table(table)
+        return updated
+
+    def delete_table(self, table, not_found_ok: bool = False):
+        self.client.delete_table(table, not_found_ok=not_found_ok)
+        self.invalidate_table(table)
+
+    def update_dataset(self, dataset: bigquery.Dataset, fields: List[str]) -> bigquery.Dataset:
+        # Dataset properties only show up in the dataset listing, tables stay valid
+        updated = self.client.update_dataset(dataset, fields)
+        self._invalidate_where(lambda k: k == ('datasets', dataset.project))
+        return updated
+
+    def create_dataset(self, dataset: bigquery.Dataset, **kwargs) -> bigquery.Dataset:
+        created = self.client.create_dataset(dataset, **kwargs)
+        self.invalidate_dataset(created)
+        return created
+
+    def run_ddl(self, sql: str, table=None):
+        """Run a DDL statement (e.g. CREATE OR REPLACE VIEW) and invalidate its target"""
+        result = self.client.query(sql).result()
+        if table is not None:
+            self.invalidate_table(table)
+        return result
+
+
+_caches: Dict[str, MetadataCacheService] = {}
+_caches_lock = threading.Lock()
+
+
+def get_metadata_cache(project_id: str = None) -> MetadataCacheService:
+    """Process-wide MetadataCacheService for a project (created on first use)"""
+    project_id = project_id or Config.PROJECT_ID
+
+    with _caches_lock:
+        cache = _caches.get(project_id)
+        if cache is None:
+            cache = MetadataCacheService(lazy_bigquery_client(project_id))
+            _caches[project_id] = cache
+        return cache
@@ -0,0 +1,268 @@
+"""
+Policy Tag Coverage Service
+In-memory index of which columns carry which policy tag, project-wide
+
+Built from INFORMATION_SCHEMA.COLUMN_FIELD_PATHS (one query per region)
+instead of one get_table per table. Every column (nested fields by field
+path) is indexed by tag, by dataset and by column name, so lookups like
+"all columns tagged X" or "% tagged per dataset" don't touch BigQuery.
+
+Refresh is incremental: last_modified_time of every table comes from the
+datasets' __TABLES__ (one UNION ALL query per region); only tables that are
+new or changed since the last refresh are re-read from COLUMN_FIELD_PATHS,
+and dropped tables leave the index. Applying a policy tag updates the table
+schema, which moves last_modified_time.
+"""
+
+from google.cloud import bigquery
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+import threading
+import time
+
+from config import Config
+from services.client_registry import get_bigquery_client
+from services.dataset_inventory_service import DatasetInventoryService
+
+
+class PolicyTagCoverageIndex:
+    def __init__(self, project_id: str):
+        self.project_id = project_id
+        self.client = get_bigquery_client(project_id)
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+
+        # (dataset, table, field_path) -> column
+        self.columns: Dict[Tuple[str, str, str], Dict] = {}
+        self.by_tag: Dict[str, Set[Tuple]] = {}
+        self.by_dataset: Dict[str, Set[Tuple]] = {}
+        self.by_column: Dict[str, Set[Tuple]] = {}
+        self.by_table: Dict[Tuple[str, str], Set[Tuple]] = {}
+
+        # (dataset, table) -> last_modified_time (ms)
+        self.table_modified: Dict[Tuple[str, str], int] = {}
+
+        self.refreshed_at: Optional[float] = None
+        self.errors: List[Dict] = []
+
+    # ==================== QUERIES ====================
+
+    def _region_datasets(self) -> Dict[str, List[str]]:
+        """{location: [dataset_id]} for the datasets of the project"""
+        by_location = {}
+        for record in DatasetInventoryService(self.project_id).iter_datasets():
+            if record['error']:
+                self.errors.append({'dataset_id': record['dataset_id'], 'error': record['error']})
+                continue
+            by_location.setdefault(record['location'], []).append(record['dataset_id'])
+        return by_location
+
+    def _table_modified_times(self, location: str, dataset_ids: List[str]) -> Dict[Tuple[str, str], int]:
+        """last_modified_time of every table of the datasets in one region"""
+        query = "\nUNION ALL\n".join(
+            f"SELECT dataset_id, table_id, last_modified_time FROM `{self.project_id}.{dataset_id}.__TABLES__`"
+            for dataset_id in dataset_ids
+        )
+        rows = self.client.query(query, location=location).result()
+        return {(row.dataset_id, row.table_id): row.last_modified_time for row in rows}
+
+    def _column_rows(self, location: str, tables: List[Tuple[str, str]] = None) -> List:
+        """
+        COLUMN_FIELD_PATHS of the region; only `tables` when given
+        """
+        where = ""
+        params = []
+        if tables is not None:
+            where = "WHERE CONCAT(table_schema, '.', table_name) IN UNNEST(@tables)"
+            params = [bigquery.ArrayQueryParameter(
+                "tables", "STRING", [f"{dataset}.{table}" for dataset, table in tables]
+            )]
+
+        query = f"""
+        SELECT table_schema, table_name, column_name, field_path, data_type, policy_tags
+        FROM `{self.project_id}`.`region-{location.lower()}`.INFORMATION_SCHEMA.COLUMN_FIELD_PATHS
+        {where}
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        return list(self.client.query(query, job_config=job_config, location=location).result())
+
+    # ==================== INDEX MAINTENANCE ====================
+
+    def _remove_table(self, dataset_id: str, table_id: str):
+        for key in self.by_table.pop((dataset_id, table_id), ()):
+            column = self.columns.pop(key)
+            self.by_dataset[dataset_id].discard(key)
+            self.by_column.get(column['field_path'].lower(), set()).discard(key)
+            for tag in column['policy_tags']:
+                self.by_tag.get(tag, set()).discard(key)
+        self.table_modified.pop((dataset_id, table_id), None)
+
+    def _add_row(self, row):
+        key = (row.table_schema, row.table_name, row.field_path)
+        column = {
+            'dataset_id': row.table_schema,
+            'table_id': row.table_name,
+            'column_name': row.column_name,
+            'field_path': row.field_path,
+            'data_type': row.data_type,
+            'policy_tags': list(row.policy_tags or [])
+        }
+        self.columns[key] = column
+        self.by_dataset.setdefault(row.table_schema, set()).add(key)
+        self.by_table.setdefault((row.table_schema, row.table_name), set()).add(key)
+        self.by_column.setdefault(row.field_path.lower(), set()).add(key)
+        for tag in column['policy_tags']:
+            self.by_tag.setdefault(tag, set()).add(key)
+
+    def _refresh_region(self, location: str, dataset_ids: List[str], full: bool) -> Dict:
+        # Modified times first: a table changed after this point is picked up next time
+        modified = self._table_modified_times(location, dataset_ids)
+        datasets = set(dataset_ids)
+
+        with self._lock:
+            known = {k: v for k, v in self.table_modified.items() if k[0] in datasets}
+
+        dropped = [k for k in known if k not in modified]
+        changed = [k for k, ts in modified.items() if full or known.get(k) != ts]
+
+        rows = []
+        if changed:
+            rows = self._column_rows(location, None if full else changed)
+
+        with self._lock:
+            for dataset_id, table_id in dropped + changed:
+                self._remove_table(dataset_id, table_id)
+            for row in rows:
+                if row.table_schema in datasets:
+                    self._add_row(row)
+            for key in changed:
+                self.table_modified[key] = modified[key]
+
+        return {'location': location, 'tables_changed': len(changed), 'tables_dropped': len(dropped)}
+
+    def refresh(self, full: bool = False) -> Dict:
+        """
+        Bring the index up to date
+
+        Args:
+            full: re-read every column instead of only new/changed tables
+
+        Returns:
+            {'regions': [...], 'tables_changed', 'tables_dropped', 'columns', 'errors'}
+        """
+        with self._refresh_lock:
+            started = time.perf_counter()
+            full = full or self.refreshed_at is None
+            self.errors = []
+
+            by_location = self._region_datasets()
+
+            with self._lock:
+                # Datasets that no longer exist
+                current = {d for ids in by_location.values() for d in ids}
+                failed = {e['dataset_id'] for e in self.errors}
+                for dataset_id, table_id in list(self.table_modified):
+                    if dataset_id not in current and dataset_id not in failed:
+                        self._remove_table(dataset_id, table_id)
+
+            regions = []
+            if by_location:
+                with ThreadPoolExecutor(max_workers=min(len(by_location), Config.INVENTORY_MAX_WORKERS),
+                                        thread_name_prefix='tag-coverage') as executor:
+                    futures = {
+                        location: executor.submit(self._refresh_region, location, dataset_ids, full)
+                        for location, dataset_ids in by_location.items()
+                    }
+                    for location, future in futures.items():
+                        try:
+                            regions.append(future.result())
+                        except Exception as e:
+                            print(f"[ERROR] Coverage refresh failed in {location}: {e}")
+                            self.errors.append({'location': location, 'error': str(e)})
+
+            self.refreshed_at = time.time()
+
+            summary = {
+                'full': full,
+                'regions': regions,
+                'tables_changed': sum(r['tables_changed'] for r in regions),
+                'tables_dropped': sum(r['tables_dropped'] for r in regions),
+                'columns': len(self.columns),
+                'errors': list(self.errors),
+                'elapsed_seconds': round(time.perf_counter() - started, 2)
+            }
+            print(f"[DEBUG] ✓ Policy tag coverage refreshed ({'full' if full else 'incremental'}): "
+                  f"{summary['tables_changed']} table(s) re-read, {summary['columns']} column(s) indexed "
+                  f"in {summary['elapsed_seconds']}s")
+            return summary
+
+    def ensure_fresh(self, max_age_seconds: float = None) -> bool:
+        """Refresh if never built or older than max_age_seconds; True if it refreshed"""
+        max_age = Config.COVERAGE_INDEX_MAX_AGE_SECONDS if max_age_seconds is None else max_age_seconds
+        if self.refreshed_at is not None and time.time() - self.refreshed_at < max_age:
+            return False
+        self.refresh()
+        return True
+
+    # ==================== LOOKUPS ====================
+
+    def _columns(self, keys) -> List[Dict]:
+        with self._lock:
+            return sorted((dict(self.columns[k]) for k in keys if k in self.columns),
+                          key=lambda c: (c['dataset_id'], c['table_id'], c['field_path']))
+
+    def columns_with_tag(self, tag_name: str) -> List[Dict]:
+        """All columns carrying a policy tag (full resource name)"""
+        with self._lock:
+            keys = set(self.by_tag.get(tag_name, ()))
+        return self._columns(keys)
+
+    def columns_named(self, column_name: str) -> List[Dict]:
+        """Every column with this name (or nested field path), any dataset/table"""
+        with self._lock:
+            keys = set(self.by_column.get(column_name.lower(), ()))
+        return self._columns(keys)
+
+    def dataset_columns(self, dataset_id: str, tagged_only: bool = False) -> List[Dict]:
+        with self._lock:
+            keys = set(self.by_dataset.get(dataset_id, ()))
+        columns = self._columns(keys)
+        return [c for c in columns if c['policy_tags']] if tagged_only else columns
+
+    def tag_counts(self) -> Dict[str, int]:
+        """{tag: number of columns carrying it}"""
+        with self._lock:
+            return {tag: len(keys) for tag, keys in self.by_tag.items() if keys}
+
+    def dataset_coverage(self) -> List[Dict]:
+        """% of tagged columns per dataset"""
+        with self._lock:
+            result = []
+            for dataset_id, keys in sorted(self.by_dataset.items()):
+                if not keys:
+                    continue
+                tagged = sum(1 for k in keys if self.columns[k]['policy_tags'])
+                result.append({
+                    'dataset_id': dataset_id,
+                    'tables': len({k[1] for k in keys}),
+                    'total_columns': len(keys),
+                    'tagged_columns': tagged,
+                    'percentage_tagged': round(tagged / len(keys) * 100, 2)
+                })
+            return result
+
+
+_indexes: Dict[str, PolicyTagCoverageIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_coverage_index(project_id: str = None) -> PolicyTagCoverageIndex:
+    """Process-wide PolicyTagCoverageIndex for a project (built on first refresh)"""
+    project_id = project_id or Config.PROJECT_ID
+
+    with _indexes_lock:
+        index = _indexes.get(project_id)
+        if index is None:
+            index = PolicyTagCoverageIndex(project_id)
+            _indexes[project_id] = index
+        return index
@@ -0,0 +1,335 @@
+"""
+RLS Snapshot Service
+Streaming export / restore of the RLS state tables (policies, policies_filters)
+
+Export reads each table page by page (BigQuery Storage Read API when
+google-cloud-bigquery-storage is installed, paged list_rows otherwise) and
+writes every page as a record batch straight into a compressed Parquet or
+Arrow IPC file, so memory stays at one page regardless of table size.
+
+Restore loads each file into a staging table with the target's schema and
+copies it over with INSERT ... SELECT, so the tables keep their modes,
+defaults and clustering (Arrow IPC files are converted to Parquet batch by
+batch first, since load jobs don't read Arrow IPC). Compiled entitlements
+are rebuilt after policies_filters is restored.
+
+Command line:
+    python -m services.rls_snapshot_service export [directory] [--format arrow] [--project P]
+    python -m services.rls_snapshot_service restore <directory> [--append] [--project P]
+
+A snapshot is a directory:
+    manifest.json
+    policies.parquet
+    policies_filters.parquet
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable
+import json
+import os
+import tempfile
+
+from config import Config
+from services.client_registry import get_bigquery_client, get_credentials
+
+SNAPSHOT_TABLES = {
+    'policies': Config.POLICY_TABLE,
+    'policies_filters': Config.FILTER_TABLE,
+}
+
+FORMATS = {
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Snapshot export/restore requires pyarrow (pip install pyarrow)")
+
+
+class RLSSnapshotService:
+    def __init__(self, project_id: str, client=None, page_size: int = None):
+        self.project_id = project_id
+        self.client = client or get_bigquery_client(project_id)
+        self.page_size = page_size or Config.SNAPSHOT_PAGE_SIZE
+
+    # ==================== READING ====================
+
+    def _bqstorage_client(self):
+        """Storage Read API client if the optional package is installed"""
+        try:
+            from google.cloud import bigquery_storage
+        except ImportError:
+            return None
+        return bigquery_storage.BigQueryReadClient(credentials=get_credentials())
+
+    def iter_record_batches(self, table_id: str) -> Iterable:
+        """Yield pyarrow.RecordBatch pages of a table"""
+        _require_pyarrow()
+
+        table = self.client.get_table(table_id)
+        rows = self.client.list_rows(table, page_size=self.page_size)
+        return rows.to_arrow_iterable(bqstorage_client=self._bqstorage_client())
+
+    # ==================== WRITING ====================
+
+    @staticmethod
+    def write_batches(batches: Iterable, path: str, fmt: str = 'parquet',
+                      compression: str = 'zstd',
+                      progress: Callable[[int], None] = None) -> int:
+        """
+        Write record batches to a Parquet / Arrow IPC file as they arrive
+
+        Returns:
+            Number of rows written
+        """
+        _require_pyarrow()
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt} (use {', '.join(FORMATS)})")
+
+        writer = None
+        rows = 0
+        try:
+            for batch in batches:
+                if writer is None:
+                    if fmt == 'parquet':
+                        writer = pq.ParquetWriter(path, batch.schema, compression=compression)
+                    else:
+                        writer = pa.ipc.new_file(
+                            path, batch.schema,
+                            options=pa.ipc.IpcWriteOptions(compression=compression)
+                        )
+
+                if fmt == 'parquet':
+                    writer.write_batch(batch)
+                else:
+                    writer.write(batch)
+
+                rows += batch.num_rows
+                if progress:
+                    progress(rows)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if writer is None:
+            # Empty table: still leave a (schema-less) file so restore is symmetric
+            open(path, 'wb').close()
+
+        return rows
+
+    # ==================== EXPORT ====================
+
+    def export_table(self, table_id: str, path: str, fmt: str = 'parquet',
+                     compression: str = 'zstd') -> int:
+        print(f"[DEBUG] Exporting {table_id} -> {path}")
+        rows = self.write_batches(self.iter_record_batches(table_id), path, fmt, compression)
+        print(f"[DEBUG] ✓ {rows} rows exported from {table_id}")
+        return rows
+
+    def export_snapshot(self, directory: str = None, fmt: str = 'parquet',
+                        compression: str = 'zstd') -> Dict:
+        """
+        Export policies + policies_filters into a snapshot directory
+
+        Returns:
+            The manifest written to <directory>/manifest.json
+        """
+        if directory is None:
+            stamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+            directory = os.path.join(Config.SNAPSHOT_DIR, f"rls_snapshot_{stamp}")
+        os.makedirs(directory, exist_ok=True)
+
+        manifest = {
+            'created_at': datetime.utcnow().isoformat() + 'Z',
+            'project_id': self.project_id,
+            'format': fmt,
+            'compression': compression,
+            'tables': {}
+        }
+
+        for name, table_id in SNAPSHOT_TABLES.items():
+            file_name = name + FORMATS[fmt]
+            rows = self.export_table(table_id, os.path.join(directory, file_name), fmt, compression)
+            manifest['tables'][name] = {'table_id': table_id, 'file': file_name, 'rows': rows}
+
+        with open(os.path.join(directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        print(f"[DEBUG] ✓ RLS snapshot written to {directory}")
+        manifest['directory'] = directory
+        return manifest
+
+    # ==================== RESTORE ====================
+
+    @staticmethod
+    def _arrow_to_parquet(path: str) -> str:
+        """Convert an Arrow IPC file to a temporary Parquet file, batch by batch"""
+        import pyarrow as pa
+
+        reader = pa.ipc.open_file(path)
+        fd, parquet_path = tempfile.mkstemp(suffix='.parquet')
+        os.close(fd)
+
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        RLSSnapshotService.write_batches(batches, parquet_path, 'parquet', 'snappy')
+        return parquet_path
+
+    def _create_staging(self, path: str, target):
+        """
+        Empty staging table next to the target for a Parquet file
+
+        The staging schema is the target's (types and modes) restricted to the
+        columns present in the file, so the load never redefines the target.
+        It expires after an hour in case the restore dies before cleaning up.
+        """
+        from google.cloud import bigquery
+        import pyarrow.parquet as pq
+        import uuid
+
+        file_columns = set(pq.read_schema(path).names)
+        schema = [
+            bigquery.SchemaField(field.name, field.field_type, mode=field.mode, fields=field.fields)
+            for field in target.schema if field.name in file_columns
+        ]
+
+        staging = bigquery.Table(
+            f"{target.project}.{target.dataset_id}._restore_{target.table_id}_{uuid.uuid4().hex[:8]}",
+            schema=schema
+        )
+        staging.expires = datetime.now(timezone.utc) + timedelta(hours=1)
+        return self.client.create_table(staging)
+
+    def _load_staging(self, path: str, staging):
+        from google.cloud import bigquery
+
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+            schema=staging.schema
+        )
+        with open(path, 'rb') as f:
+            job = self.client.load_table_from_file(f, staging, job_config=job_config)
+        job.result()
+
+    def restore_table(self, path: str, table_id: str, replace: bool = True) -> int:
+        """
+        Load a snapshot file back into a table
+
+        The file goes through a staging table (load job with the target's
+        schema) and then into the target with INSERT ... SELECT, so the
+        target keeps its schema, REQUIRED modes, DEFAULT expressions and
+        clustering. With replace, DELETE + INSERT run in one transaction.
+
+        Args:
+            replace: replace the table's rows (default) or append to them
+
+        Returns:
+            Rows restored
+        """
+        if os.path.getsize(path) == 0:
+            # Table was empty when exported
+            if replace:
+                self.client.query(f"TRUNCATE TABLE `{table_id}`").result()
+            print(f"[DEBUG] {path} is empty, {table_id} {'truncated' if replace else 'unchanged'}")
+            return 0
+
+        _require_pyarrow()
+        temp_path = None
+        if path.endswith(FORMATS['arrow']):
+            temp_path = path = self._arrow_to_parquet(path)
+
+        staging_id = None
+        try:
+            target = self.client.get_table(table_id)
+            staging = self._create_staging(path, target)
+            staging_id = f"{staging.project}.{staging.dataset_id}.{staging.table_id}"
+            self._load_staging(path, staging)
+
+            columns = ", ".join(f"`{field.name}`" for field in staging.schema)
+            insert = f"INSERT INTO `{table_id}` ({columns}) SELECT {columns} FROM `{staging_id}`;"
+            if replace:
+                sql = f"""
+                BEGIN TRANSACTION;
+                DELETE FROM `{table_id}` WHERE TRUE;
+                {insert}
+                COMMIT TRANSACTION;
+                """
+            else:
+                sql = insert
+
+            self.client.query(sql).result()
+            rows = self.client.get_table(staging_id).num_rows
+
+            print(f"[DEBUG] ✓ {rows} rows restored into {table_id}")
+            return rows
+        finally:
+            if staging_id:
+                self.client.delete_table(staging_id, not_found_ok=True)
+            if temp_path:
+                os.remove(temp_path)
+
+    def restore_snapshot(self, directory: str, replace: bool = True) -> Dict[str, int]:
+        """Restore every table listed in a snapshot's manifest.json"""
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        restored = {}
+        for name, entry in manifest['tables'].items():
+            table_id = SNAPSHOT_TABLES.get(name, entry['table_id'])
+            restored[name] = self.restore_table(os.path.join(directory, entry['file']), table_id, replace)
+
+        from services.entitlements_service import get_entitlements_service, is_compiled_mode
+        if 'policies_filters' in restored and is_compiled_mode():
+            # Views compiladas leem rls_entitlements, não policies_filters
+            get_entitlements_service(self.project_id).rebuild_all(clear=replace)
+            print("[DEBUG] ✓ Compiled entitlements rebuilt from the restored policies_filters")
+
+        return restored
+
+
+# ==================== CLI ====================
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='python -m services.rls_snapshot_service',
+        description='Export / restore the RLS state tables (policies, policies_filters)'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    # Aceito depois do subcomando (export --project X)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--project', default=Config.PROJECT_ID)
+
+    export_parser = commands.add_parser('export', parents=[common], help='write a snapshot directory')
+    export_parser.add_argument('directory', nargs='?', help=f'default: {Config.SNAPSHOT_DIR}/rls_snapshot_<timestamp>')
+    export_parser.add_argument('--format', choices=list(FORMATS), default='parquet')
+    export_parser.add_argument('--compression', default='zstd')
+
+    restore_parser = commands.add_parser('restore', parents=[common], help='load a snapshot directory back')
+    restore_parser.add_argument('directory')
+    restore_parser.add_argument('--append', action='store_true', help='append instead of replacing the rows')
+
+    args = parser.parse_args(argv)
+
+    service = RLSSnapshotService(args.project)
+    if args.command == 'export':
+        manifest = service.export_snapshot(args.directory, args.format, args.compression)
+        for name, entry in manifest['tables'].items():
+            print(f"{name}: {entry['rows']} rows -> {os.path.join(manifest['directory'], entry['file'])}")
+    else:
+        restored = service.restore_snapshot(args.directory, replace=not args.append)
+        for name, rows in restored.items():
+            print(f"{name}: {rows} rows restored")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,17 +9,51 @@ Author: Lucas Carvalhal - Sys Manager
 
 from google.cloud import bigquery
 from typing import List, Dict, Optional
+from collections import namedtuple
 import json
 import re
 from datetime import datetime
 
+from services.client_registry import get_bigquery_client
+from services.metadata_cache_service import get_metadata_cache
+from services.authorized_view_registrar import get_view_registrar
+
+
+# Lightweight stand-in for bigquery.Table built from INFORMATION_SCHEMA rows.
+# Exposes the attributes read by detect_rls_view / description parsing.
+ViewMetadata = namedtuple(
+    'ViewMetadata',
+    ['table_id', 'dataset_id', 'table_type', 'view_query', 'description',
+     'created', 'modified', 'column_count']
+)
+
+
+def parse_option_string(option_value: Optional[str]) -> Optional[str]:
+    """
+    Decode a TABLE_OPTIONS string value (a quoted SQL literal like "abc\\n")
+    """
+    if option_value is None:
+        return None
+    
+    value = option_value.strip()
+    if len(value) < 2 or value[0] not in '"\'' or value[-1] != value[0]:
+        return value
+    
+    try:
+        return json.loads(value) if value[0] == '"' else json.loads(f'"{value[1:-1]}"')
+    except ValueError:
+        inner = value[1:-1]
+        return inner.replace('\\n', '\n').replace('\\"', '"').replace("\\'", "'")
+
 
 class RLSViewsService:
     """Service for managing RLS views"""
     
     def __init__(self, project_id: str):
         self.project_id = project_id
-        self.client = bigquery.Client(project=project_id)
+        self.client = get_bigquery_client(project_id)
+        self.metadata_cache = get_metadata_cache(project_id)
+        self.last_users_update = None
         self.views_dataset_suffix = "_views"
     
     def get_views_dataset(self, base_dataset: str) -> str:
@@ -33,7 +67,7 @@ class RLSViewsService:
             dataset = bigquery.Dataset(f"{self.project_id}.{views_dataset}")
             dataset.location = "us-central1"
             dataset.description = f"Protected RLS views from {base_dataset}"
-            self.client.create_dataset(dataset)
+            self.metadata_cache.create_dataset(dataset)
         
         return views_dataset
     
@@ -45,9 +79,10 @@ class RLSViewsService:
         """
         view_query = table_obj.view_query or ''
         
-        # Check for RLS pattern: vw_ prefix + policies_filters + SESSION_USER()
+        # Check for RLS pattern: vw_ prefix + policies_filters (or compiled
+        # rls_entitlements) + SESSION_USER()
         if (table_obj.table_id.startswith('vw_') and 
-            'policies_filters' in view_query.lower() and 
+            ('policies_filters' in view_query.lower() or 'rls_entitlements' in view_query.lower()) and 
             'session_user()' in view_query.lower()):
             return True
         
@@ -141,40 +176,242 @@ class RLSViewsService:
             print(f"[ERROR] extract_filters_from_query: {e}")
             return []
     
-    def list_rls_views(self, dataset: str) -> List[Dict]:
+    def list_view_metadata(self, dataset: str) -> List[ViewMetadata]:
+        """
+        ✅ Bulk metadata for every view in a dataset (single query)
+        
+        Reads INFORMATION_SCHEMA.TABLES/VIEWS/TABLE_OPTIONS/COLUMNS once
+        instead of calling get_table() per table. Rows expose the same
+        attributes used by detect_rls_view (table_id, view_query, description).
+        """
+        prefix = f"`{self.project_id}.{dataset}`"
+        query = f"""
+        SELECT
+            t.table_name,
+            t.table_type,
+            t.creation_time,
+            v.view_definition,
+            o.option_value AS description,
+            c.column_count,
+            TIMESTAMP_MILLIS(m.last_modified_time) AS last_modified_time
+        FROM {prefix}.INFORMATION_SCHEMA.TABLES t
+        LEFT JOIN {prefix}.INFORMATION_SCHEMA.VIEWS v
+            ON v.table_name = t.table_name
+        LEFT JOIN (
+            SELECT table_name, option_value
+            FROM {prefix}.INFORMATION_SCHEMA.TABLE_OPTIONS
+            WHERE option_name = 'description'
+        ) o ON o.table_name = t.table_name
+        LEFT JOIN (
+            SELECT table_name, COUNT(*) AS column_count
+            FROM {prefix}.INFORMATION_SCHEMA.COLUMNS
+            GROUP BY table_name
+        ) c ON c.table_name = t.table_name
+        LEFT JOIN `{self.project_id}.{dataset}.__TABLES__` m
+            ON m.table_id = t.table_name
+        WHERE t.table_type = 'VIEW'
+        ORDER BY t.table_name
+        """
+        
+        rows = self.client.query(query).result()
+        
+        return [
+            ViewMetadata(
+                table_id=row.table_name,
+                dataset_id=dataset,
+                table_type=row.table_type,
+                view_query=row.view_definition or '',
+                description=parse_option_string(row.description),
+                created=row.creation_time,
+                modified=row.last_modified_time,
+                column_count=row.column_count or 0
+            )
+            for row in rows
+        ]
+    
+    def get_rls_users_for_views(self, view_names: List[str]) -> Dict[str, List[str]]:
+        """
+        ✅ Get RLS users for many views with ONE grouped policies_filters query
+        
+        Same matching rule as get_rls_users_from_policies_table (policy_name
+        contains the view name without 'vw_'), joined in memory.
+        
+        Returns: {view_name: [username, ...]}
+        """
+        result = {name: [] for name in view_names}
+        if not view_names:
+            return result
+        
+        policy_bases = {name: name.replace('vw_', '') for name in view_names}
+        
+        query = f"""
+        SELECT policy_name, ARRAY_AGG(DISTINCT username IGNORE NULLS) AS usernames
+        FROM `{self.project_id}.rls_manager.policies_filters`
+        WHERE EXISTS (
+            SELECT 1 FROM UNNEST(@policy_bases) AS base
+            WHERE STRPOS(policy_name, base) > 0
+        )
+        GROUP BY policy_name
+        """
+        
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter(
+                    "policy_bases", "STRING", sorted(set(policy_bases.values()))
+                )
+            ]
+        )
+        
+        try:
+            rows = list(self.client.query(query, job_config=job_config).result())
+        except Exception as e:
+            print(f"[ERROR] get_rls_users_for_views: {e}")
+            return result
+        
+        for view_name, base in policy_bases.items():
+            users = set()
+            for row in rows:
+                if row.policy_name and base in row.policy_name:
+                    users.update(row.usernames or [])
+            result[view_name] = sorted(users)
+        
+        return result
+    
+    def _build_rls_view_entry(self, table_obj, view_dataset: str, dataset: str,
+                              users: List[str]) -> Dict:
+        """Build the UI dict for a detected RLS view (shared by bulk and per-table modes)"""
+        # Extract source table from query
+        base_dataset, base_table = self.extract_source_table_from_query(table_obj.view_query or '')
+        
+        # Convert users to format expected by UI: ["user:email@example.com"]
+        users_formatted = [f"user:{u}" for u in users]
+        
+        # Extract filters from query
+        filters = self.extract_filters_from_query(table_obj.view_query or '')
+        
+        # Check for OLD format metadata
+        old_format_data = None
+        if table_obj.description and 'RLS_METADATA:' in table_obj.description:
+            try:
+                metadata_str = table_obj.description.split('RLS_METADATA:')[1]
+                old_format_data = json.loads(metadata_str)
+                
+                # Use old format data if available
+                if not users_formatted and old_format_data.get('users'):
+                    users_formatted = old_format_data['users']
+                
+                if not filters and old_format_data.get('filters'):
+                    filters = old_format_data['filters']
+                
+                if not base_dataset and old_format_data.get('base_dataset'):
+                    base_dataset = old_format_data['base_dataset']
+                
+                if not base_table and old_format_data.get('base_table'):
+                    base_table = old_format_data['base_table']
+            except Exception as e:
+                print(f"[DEBUG] Could not parse old format metadata: {e}")
+        
+        # Check if view has CLS (COLUMN_PROTECTION in description)
+        has_cls = bool(table_obj.description and 'COLUMN_PROTECTION:' in table_obj.description)
+        
+        # Determine view type
+        if has_cls:
+            view_type = 'HYBRID'  # RLS + CLS
+        else:
+            view_type = 'RLS'
+        
+        print(f"[DEBUG] Added {view_type} view: {table_obj.table_id} ({len(users_formatted)} users)")
+        
+        return {
+            'view_name': table_obj.table_id,
+            'view_dataset': view_dataset,
+            'base_dataset': base_dataset or dataset,
+            'base_table': base_table or 'Unknown',
+            'filters': filters,
+            'users': users_formatted,
+            'created_at': table_obj.created.strftime('%Y-%m-%d %H:%M') if table_obj.created else 'Unknown',
+            'modified_at': table_obj.modified.strftime('%Y-%m-%d %H:%M') if table_obj.modified else 'Unknown',
+            'description': table_obj.description or '',
+            'has_cls': has_cls,
+            'view_type': view_type
+        }
+    
+    def _get_datasets_to_search(self, dataset: str) -> List[str]:
+        """Base dataset plus its _views dataset (if it exists)"""
+        datasets_to_search = [dataset]
+        views_dataset = f"{dataset}{self.views_dataset_suffix}"
+        
+        try:
+            self.client.get_dataset(views_dataset)
+            datasets_to_search.append(views_dataset)
+            print(f"[DEBUG] Found views dataset: {views_dataset}")
+        except Exception:
+            print(f"[DEBUG] No views dataset found for {dataset}")
+        
+        return datasets_to_search
+    
+    def list_rls_views(self, dataset: str, bulk: bool = True) -> List[Dict]:
         """
         ✅ FIXED: List all RLS views for a dataset
         
         Now supports BOTH formats:
         - NEW format: Uses policies_filters table
         - OLD format: Uses RLS_METADATA in description
+        
+        bulk=True reads INFORMATION_SCHEMA once per dataset and fetches the
+        users of all views in one grouped query. Falls back to the
+        per-table path if INFORMATION_SCHEMA is not readable.
         """
+        if bulk:
+            try:
+                return self._list_rls_views_bulk(dataset)
+            except Exception as e:
+                print(f"[WARNING] Bulk RLS view discovery failed, falling back to per-table: {e}")
+        
+        return self._list_rls_views_per_table(dataset)
+    
+    def _list_rls_views_bulk(self, dataset: str) -> List[Dict]:
+        """Bulk discovery: one metadata query per dataset + one users query"""
+        rls_views = []
+        
+        for ds in self._get_datasets_to_search(dataset):
+            print(f"[DEBUG] Searching RLS views in: {ds} (bulk)")
+            
+            for view_meta in self.list_view_metadata(ds):
+                # ✅ CRITICAL: Detect RLS view using NEW method
+                if self.detect_rls_view(view_meta):
+                    print(f"[DEBUG] 🔐 Found RLS view: {view_meta.table_id}")
+                    rls_views.append((ds, view_meta))
+        
+        users_by_view = self.get_rls_users_for_views(
+            [view_meta.table_id for _, view_meta in rls_views]
+        )
+        
+        views = [
+            self._build_rls_view_entry(view_meta, ds, dataset, users_by_view.get(view_meta.table_id, []))
+            for ds, view_meta in rls_views
+        ]
+        
+        print(f"[DEBUG] ===== TOTAL RLS VIEWS FOUND: {len(views)} =====")
+        return views
+    
+    def _list_rls_views_per_table(self, dataset: str) -> List[Dict]:
+        """Legacy discovery: list_tables + get_table per table"""
         try:
             views = []
             
-            # Search in both base dataset and views dataset
-            datasets_to_search = [dataset]
-            views_dataset = f"{dataset}{self.views_dataset_suffix}"
-            
-            try:
-                self.client.get_dataset(views_dataset)
-                datasets_to_search.append(views_dataset)
-                print(f"[DEBUG] Found views dataset: {views_dataset}")
-            except Exception:
-                print(f"[DEBUG] No views dataset found for {dataset}")
-            
-            for ds in datasets_to_search:
+            for ds in self._get_datasets_to_search(dataset):
                 print(f"[DEBUG] Searching RLS views in: {ds}")
                 
                 try:
-                    tables = list(self.client.list_tables(ds))
+                    tables = self.metadata_cache.list_tables(ds)
                 except Exception as e:
                     print(f"[DEBUG] Cannot list tables in {ds}: {e}")
                     continue
                 
                 for table in tables:
                     table_ref = self.client.dataset(ds).table(table.table_id)
-                    table_obj = self.client.get_table(table_ref)
+                    table_obj = self.metadata_cache.get_table(table_ref)
                     
                     # Check if it's a view
                     if table_obj.table_type != 'VIEW':
@@ -186,64 +423,10 @@ class RLSViewsService:
                     
                     print(f"[DEBUG] 🔐 Found RLS view: {table.table_id}")
                     
-                    # Extract source table from query
-                    base_dataset, base_table = self.extract_source_table_from_query(table_obj.view_query)
-                    
                     # ✅ Get users from policies_filters table (NEW format)
                     users = self.get_rls_users_from_policies_table(table.table_id)
                     
-                    # Convert users to format expected by UI: ["user:email@example.com"]
-                    users_formatted = [f"user:{u}" for u in users]
-                    
-                    # Extract filters from query
-                    filters = self.extract_filters_from_query(table_obj.view_query)
-                    
-                    # Check for OLD format metadata
-                    old_format_data = None
-                    if table_obj.description and 'RLS_METADATA:' in table_obj.description:
-                        try:
-                            metadata_str = table_obj.description.split('RLS_METADATA:')[1]
-                            old_format_data = json.loads(metadata_str)
-                            
-                            # Use old format data if available
-                            if not users_formatted and old_format_data.get('users'):
-                                users_formatted = old_format_data['users']
-                            
-                            if not filters and old_format_data.get('filters'):
-                                filters = old_format_data['filters']
-                            
-                            if not base_dataset and old_format_data.get('base_dataset'):
-                                base_dataset = old_format_data['base_dataset']
-                            
-                            if not base_table and old_format_data.get('base_table'):
-                                base_table = old_format_data['base_table']
-                        except Exception as e:
-                            print(f"[DEBUG] Could not parse old format metadata: {e}")
-                    
-                    # Check if view has CLS (COLUMN_PROTECTION in description)
-                    has_cls = bool(table_obj.description and 'COLUMN_PROTECTION:' in table_obj.description)
-                    
-                    # Determine view type
-                    if has_cls:
-                        view_type = 'HYBRID'  # RLS + CLS
-                    else:
-                        view_type = 'RLS'
-                    
-                    views.append({
-                        'view_name': table.table_id,
-                        'view_dataset': ds,
-                        'base_dataset': base_dataset or dataset,
-                        'base_table': base_table or 'Unknown',
-                        'filters': filters,
-                        'users': users_formatted,
-                        'created_at': table_obj.created.strftime('%Y-%m-%d %H:%M') if table_obj.created else 'Unknown',
-                        'modified_at': table_obj.modified.strftime('%Y-%m-%d %H:%M') if table_obj.modified else 'Unknown',
-                        'description': table_obj.description or '',
-                        'has_cls': has_cls,
-                        'view_type': view_type
-                    })
-                    
-                    print(f"[DEBUG] Added {view_type} view: {table.table_id} ({len(users_formatted)} users)")
+                    views.append(self._build_rls_view_entry(table_obj, ds, dataset, users))
             
             print(f"[DEBUG] ===== TOTAL RLS VIEWS FOUND: {len(views)} =====")
             return views
@@ -275,6 +458,52 @@ class RLSViewsService:
             print(f"Error getting policies: {e}")
             return []
     
+    def replace_policy_users(self, policy_name: str, usernames: List[str]) -> Dict:
+        """
+        Replace the user set of a policy in policies_filters with one MERGE
+        
+        Rows for users not in `usernames` are deleted and missing users are
+        inserted, atomically, so readers never see an empty policy.
+        
+        Returns:
+            Dict with inserted / removed counts
+        """
+        usernames = sorted(set(u for u in usernames if u))
+        
+        merge_query = f"""
+        MERGE `{self.project_id}.rls_manager.policies_filters` T
+        USING (
+            SELECT username FROM UNNEST(@usernames) AS username
+        ) S
+        ON T.policy_name = @policy_name AND T.username = S.username
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT (policy_name, username, filter_type, filter_value, created_at)
+            VALUES (@policy_name, S.username, 'USER', '', CURRENT_TIMESTAMP())
+        WHEN NOT MATCHED BY SOURCE AND T.policy_name = @policy_name THEN
+            DELETE
+        """
+        
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("policy_name", "STRING", policy_name),
+                bigquery.ArrayQueryParameter("usernames", "STRING", usernames)
+            ]
+        )
+        
+        job = self.client.query(merge_query, job_config=job_config)
+        job.result()
+        
+        dml_stats = getattr(job, 'dml_stats', None)
+        result = {
+            'policy_name': policy_name,
+            'inserted': dml_stats.inserted_row_count if dml_stats else None,
+            'removed': dml_stats.deleted_row_count if dml_stats else None,
+            'total_users': len(usernames)
+        }
+        
+        print(f"[DEBUG] Policy {policy_name}: +{result['inserted']} / -{result['removed']} user row(s)")
+        return result
+    
     def update_rls_view_users(
         self,
         view_dataset: str,
@@ -284,27 +513,35 @@ class RLSViewsService:
         """
         ✅ Update users with access to RLS view
         
-        For NEW format views, this updates the policies_filters table
+        For NEW format views, this updates the policies_filters table with a
+        single MERGE (see replace_policy_users); counts of the last update are
+        kept in self.last_users_update.
         """
         try:
-            print(f"[DEBUG] update_rls_view_users: {view_name}, users: {users}")
+            print(f"[DEBUG] update_rls_view_users: {view_name}, users: {len(users)}")
             
             # Extract policy name from view name
             policy_base = view_name.replace('vw_', '')
             
-            # Get existing users from policies_filters
-            existing_users_query = f"""
-            SELECT DISTINCT username, policy_name
+            # Find the existing policy_name for this view (if any)
+            existing_policy_query = f"""
+            SELECT policy_name
             FROM `{self.project_id}.rls_manager.policies_filters`
-            WHERE policy_name LIKE '%{policy_base}%'
+            WHERE STRPOS(policy_name, @policy_base) > 0
+            LIMIT 1
             """
             
-            existing_users = {}
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=[
+                    bigquery.ScalarQueryParameter("policy_base", "STRING", policy_base)
+                ]
+            )
+            
+            policy_name = None
             try:
-                results = self.client.query(existing_users_query).result()
-                for row in results:
-                    existing_users[row.username] = row.policy_name
-                print(f"[DEBUG] Found {len(existing_users)} existing users")
+                results = list(self.client.query(existing_policy_query, job_config=job_config).result())
+                if results:
+                    policy_name = results[0].policy_name
             except Exception as e:
                 print(f"[DEBUG] No existing users found: {e}")
             
@@ -319,42 +556,12 @@ class RLSViewsService:
                 else:
                     new_users.append(u)
             
-            # Determine which policy_name to use
-            if existing_users:
-                # Use existing policy_name
-                policy_name = list(existing_users.values())[0]
-            else:
-                # Create new policy_name
-                policy_name = policy_base
-            
+            # Use existing policy_name or create a new one
+            policy_name = policy_name or policy_base
             print(f"[DEBUG] Using policy_name: {policy_name}")
             
-            # Delete old entries for this policy
-            delete_query = f"""
-            DELETE FROM `{self.project_id}.rls_manager.policies_filters`
-            WHERE policy_name = '{policy_name}'
-            """
-            
-            try:
-                self.client.query(delete_query).result()
-                print(f"[DEBUG] Deleted old entries")
-            except Exception as e:
-                print(f"[DEBUG] Could not delete old entries: {e}")
-            
-            # Insert new entries
-            if new_users:
-                for user in new_users:
-                    insert_query = f"""
-                    INSERT INTO `{self.project_id}.rls_manager.policies_filters`
-                    (policy_name, username, filter_type, filter_value, created_at)
-                    VALUES ('{policy_name}', '{user}', 'USER', '', CURRENT_TIMESTAMP())
-                    """
-                    
-                    try:
-                        self.client.query(insert_query).result()
-                        print(f"[DEBUG] Inserted user: {user}")
-                    except Exception as e:
-                        print(f"[ERROR] Could not insert user {user}: {e}")
+            # Diff + apply in one atomic MERGE
+            self.last_users_update = self.replace_policy_users(policy_name, new_users)
             
             # Also update OLD format metadata if present
             try:
@@ -370,7 +577,7 @@ class RLSViewsService:
                     
                     desc_parts = table.description.split('RLS_METADATA:')[0]
                     table.description = f"{desc_parts}RLS_METADATA:{json.dumps(metadata)}"
-                    self.client.update_table(table, ['description'])
+                    self.metadata_cache.update_table(table, ['description'])
                     print(f"[DEBUG] Updated OLD format metadata")
             except Exception as e:
                 print(f"[DEBUG] No OLD format metadata to update: {e}")
@@ -449,7 +656,7 @@ class RLSViewsService:
             """
             
             print(f"[DEBUG] Updating view SQL")
-            self.client.query(view_sql).result()
+            self.metadata_cache.run_ddl(view_sql, view_full_name)
             
             # Update OLD format metadata if present
             try:
@@ -465,7 +672,7 @@ class RLSViewsService:
                     
                     desc_parts = table.description.split('RLS_METADATA:')[0]
                     table.description = f"{desc_parts}RLS_METADATA:{json.dumps(metadata)}"
-                    self.client.update_table(table, ['description'])
+                    self.metadata_cache.update_table(table, ['description'])
             except Exception as e:
                 print(f"[DEBUG] No OLD format metadata to update: {e}")
             
@@ -481,7 +688,7 @@ class RLSViewsService:
         """Delete an RLS view"""
         try:
             table_ref = self.client.dataset(view_dataset).table(view_name)
-            self.client.delete_table(table_ref)
+            self.metadata_cache.delete_table(table_ref)
             
             # Also delete entries from policies_filters table
             policy_base = view_name.replace('vw_', '')
@@ -507,7 +714,7 @@ class RLSViewsService:
         """Get schema of a table"""
         try:
             table_ref = self.client.dataset(dataset).table(table)
-            table_obj = self.client.get_table(table_ref)
+            table_obj = self.metadata_cache.get_table(table_ref)
             
             schema = []
             for field in table_obj.schema:
@@ -567,7 +774,7 @@ class RLSViewsService:
             WHERE {where_clause};
             """
             
-            self.client.query(view_sql).result()
+            self.metadata_cache.run_ddl(view_sql, view_full_name)
             
             # Update description with metadata (OLD format)
             table_ref = self.client.dataset(views_dataset).table(view_name)
@@ -587,7 +794,7 @@ class RLSViewsService:
             if description:
                 table.description = f"{description}\n\n{table.description}"
             
-            self.client.update_table(table, ['description'])
+            self.metadata_cache.update_table(table, ['description'])
             
             # Configure as Authorized View
             self.configure_authorized_view(views_dataset, view_name, base_dataset)
@@ -603,34 +810,8 @@ class RLSViewsService:
     def configure_authorized_view(self, views_dataset: str, view_name: str, base_dataset: str):
         """Configure view as Authorized View on base dataset"""
         try:
-            from google.cloud.bigquery import AccessEntry
-            
-            dataset_ref = self.client.dataset(base_dataset)
-            dataset = self.client.get_dataset(dataset_ref)
-            
-            authorized_view = {
-                'projectId': self.project_id,
-                'datasetId': views_dataset,
-                'tableId': view_name
-            }
-            
-            view_entry = AccessEntry(
-                role=None,
-                entity_type='view',
-                entity_id=authorized_view
-            )
-            
-            access_entries = list(dataset.access_entries or [])
-            
-            exists = any(
-                e.entity_type == 'view' and e.entity_id == authorized_view
-                for e in access_entries
-            )
-            
-            if not exists:
-                access_entries.append(view_entry)
-                dataset.access_entries = access_entries
-                self.client.update_dataset(dataset, ['access_entries'])
+            result = get_view_registrar(self.project_id).authorize_view(base_dataset, views_dataset, view_name)
+            if result['status'] == 'updated':
                 print(f"✅ Configured {view_name} as Authorized View")
             
         except Exception as e:
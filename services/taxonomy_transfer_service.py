@@ -0,0 +1,361 @@
+"""
+Taxonomy Transfer Service
+Bulk export/import of policy tag taxonomies (PolicyTagManagerSerialization)
+
+Creating a taxonomy tag by tag costs one RPC per policy tag. Here:
+    - export: one ExportTaxonomies call for any number of taxonomies
+    - import: one ImportTaxonomies call (inline source) for all new
+      taxonomies, one ReplaceTaxonomy per existing taxonomy that changed
+so the RPC count depends on the number of taxonomies, not of tags.
+
+Local representation (JSON, or YAML when PyYAML is installed) is project
+independent: taxonomies and tags are identified by display name, children
+are nested and sorted so two exports can be diffed:
+
+    {"taxonomies": [{"display_name": "PII", "description": "",
+                     "activated_policy_types": ["FINE_GRAINED_ACCESS_CONTROL"],
+                     "policy_tags": [{"display_name": "High", "description": "",
+                                      "child_policy_tags": [...]}]}]}
+
+Command line:
+    python -m services.taxonomy_transfer_service export <file> [--taxonomy NAME]
+    python -m services.taxonomy_transfer_service diff <file>
+    python -m services.taxonomy_transfer_service import <file> [--replace] [--dry-run]
+    python -m services.taxonomy_transfer_service promote --target-project P [--taxonomy NAME] [--replace] [--dry-run]
+"""
+
+from google.cloud import datacatalog_v1
+from typing import Dict, List, Optional
+import json
+
+from services.client_registry import get_policy_tag_manager_client, get_policy_tag_serialization_client
+from services.datacatalog_service import invalidate_taxonomy_snapshot
+
+
+class TaxonomyTransferService:
+    def __init__(self, project_id: str, location: str = "us-central1",
+                 client=None, serialization_client=None):
+        self.project_id = project_id
+        self.location = location
+        self.parent = f"projects/{project_id}/locations/{location}"
+        self.client = client or get_policy_tag_manager_client()
+        self.serialization_client = serialization_client or get_policy_tag_serialization_client()
+
+    # ==================== LOCAL FORMAT ====================
+
+    @staticmethod
+    def _tag_to_local(tag) -> Dict:
+        return {
+            "display_name": tag.display_name,
+            "description": tag.description or "",
+            "child_policy_tags": sorted(
+                (TaxonomyTransferService._tag_to_local(child) for child in tag.child_policy_tags),
+                key=lambda t: t["display_name"]
+            )
+        }
+
+    @staticmethod
+    def to_local(serialized_taxonomy) -> Dict:
+        """SerializedTaxonomy -> local dict (no resource names)"""
+        return {
+            "display_name": serialized_taxonomy.display_name,
+            "description": serialized_taxonomy.description or "",
+            "activated_policy_types": sorted(
+                datacatalog_v1.Taxonomy.PolicyType(policy_type).name
+                for policy_type in serialized_taxonomy.activated_policy_types
+            ),
+            "policy_tags": sorted(
+                (TaxonomyTransferService._tag_to_local(tag) for tag in serialized_taxonomy.policy_tags),
+                key=lambda t: t["display_name"]
+            )
+        }
+
+    @staticmethod
+    def _tag_from_local(tag: Dict):
+        return datacatalog_v1.SerializedPolicyTag(
+            display_name=tag["display_name"],
+            description=tag.get("description", ""),
+            child_policy_tags=[
+                TaxonomyTransferService._tag_from_local(child)
+                for child in tag.get("child_policy_tags", [])
+            ]
+        )
+
+    @staticmethod
+    def from_local(taxonomy: Dict):
+        """Local dict -> SerializedTaxonomy"""
+        return datacatalog_v1.SerializedTaxonomy(
+            display_name=taxonomy["display_name"],
+            description=taxonomy.get("description", ""),
+            activated_policy_types=[
+                datacatalog_v1.Taxonomy.PolicyType[name]
+                for name in taxonomy.get("activated_policy_types", ["FINE_GRAINED_ACCESS_CONTROL"])
+            ],
+            policy_tags=[TaxonomyTransferService._tag_from_local(tag) for tag in taxonomy.get("policy_tags", [])]
+        )
+
+    @staticmethod
+    def count_tags(taxonomy: Dict) -> int:
+        def count(tags):
+            return sum(1 + count(tag.get("child_policy_tags", [])) for tag in tags)
+        return count(taxonomy.get("policy_tags", []))
+
+    # ==================== FILES ====================
+
+    @staticmethod
+    def save(document: Dict, path: str):
+        """Write an export to .json or .yaml/.yml"""
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith(('.yaml', '.yml')):
+                try:
+                    import yaml
+                except ImportError:
+                    raise RuntimeError("YAML export requires PyYAML (pip install pyyaml); use .json")
+                yaml.safe_dump(document, f, sort_keys=False, allow_unicode=True)
+            else:
+                json.dump(document, f, indent=2, ensure_ascii=False)
+
+    @staticmethod
+    def load(path: str) -> Dict:
+        with open(path, encoding='utf-8') as f:
+            if path.endswith(('.yaml', '.yml')):
+                try:
+                    import yaml
+                except ImportError:
+                    raise RuntimeError("YAML import requires PyYAML (pip install pyyaml); use .json")
+                return yaml.safe_load(f)
+            return json.load(f)
+
+    # ==================== EXPORT ====================
+
+    def _remote_taxonomies(self) -> Dict[str, str]:
+        """{display_name: resource name} of the taxonomies in the project/location"""
+        request = datacatalog_v1.ListTaxonomiesRequest(parent=self.parent)
+        return {t.display_name: t.name for t in self.client.list_taxonomies(request=request)}
+
+    def export_taxonomies(self, taxonomy_names: List[str] = None) -> Dict:
+        """
+        Export taxonomies (all of the project/location if None) in one RPC
+
+        Returns:
+            {"source": parent, "taxonomies": [local dicts sorted by display name]}
+        """
+        if taxonomy_names is None:
+            taxonomy_names = list(self._remote_taxonomies().values())
+
+        taxonomies = []
+        if taxonomy_names:
+            response = self.serialization_client.export_taxonomies(
+                request=datacatalog_v1.ExportTaxonomiesRequest(
+                    parent=self.parent,
+                    taxonomies=taxonomy_names,
+                    serialized_taxonomies=True
+                )
+            )
+            taxonomies = [self.to_local(t) for t in response.taxonomies]
+
+        print(f"[DEBUG] ✓ Exported {len(taxonomies)} taxonomies "
+              f"({sum(self.count_tags(t) for t in taxonomies)} policy tags) from {self.parent}")
+        return {"source": self.parent, "taxonomies": sorted(taxonomies, key=lambda t: t["display_name"])}
+
+    # ==================== DIFF ====================
+
+    @staticmethod
+    def _tag_paths(tags: List[Dict], prefix: str = "") -> Dict[str, str]:
+        paths = {}
+        for tag in tags:
+            path = f"{prefix}{tag['display_name']}"
+            paths[path] = tag.get("description", "")
+            paths.update(TaxonomyTransferService._tag_paths(tag.get("child_policy_tags", []), f"{path}/"))
+        return paths
+
+    def diff(self, document: Dict, remote: Dict = None) -> List[Dict]:
+        """
+        Compare a local document with the project
+
+        Returns one entry per local taxonomy:
+            {'display_name', 'status': 'new'|'unchanged'|'changed',
+             'tags_added', 'tags_removed', 'tags_changed'}  (tag paths "Parent/Child")
+        """
+        remote = remote or self.export_taxonomies()
+        remote_by_name = {t["display_name"]: t for t in remote["taxonomies"]}
+
+        result = []
+        for local in document["taxonomies"]:
+            local = self.to_local(self.from_local(local))  # normalized (sorted, defaults)
+            current = remote_by_name.get(local["display_name"])
+            if current is None:
+                result.append({
+                    'display_name': local["display_name"], 'status': 'new',
+                    'tags_added': sorted(self._tag_paths(local["policy_tags"])),
+                    'tags_removed': [], 'tags_changed': []
+                })
+                continue
+
+            local_paths = self._tag_paths(local["policy_tags"])
+            remote_paths = self._tag_paths(current["policy_tags"])
+            entry = {
+                'display_name': local["display_name"],
+                'tags_added': sorted(set(local_paths) - set(remote_paths)),
+                'tags_removed': sorted(set(remote_paths) - set(local_paths)),
+                'tags_changed': sorted(p for p in set(local_paths) & set(remote_paths)
+                                       if local_paths[p] != remote_paths[p])
+            }
+            entry['status'] = 'unchanged' if local == current else 'changed'
+            result.append(entry)
+
+        return result
+
+    # ==================== IMPORT ====================
+
+    def import_taxonomies(self, document: Dict, replace: bool = False, dry_run: bool = False) -> Dict:
+        """
+        Apply a local document to the project
+
+        New taxonomies are created with one ImportTaxonomies call. Existing
+        ones (same display name) that differ are replaced with ReplaceTaxonomy
+        when replace=True (tags missing from the document are deleted),
+        otherwise skipped. Unchanged taxonomies cost nothing.
+
+        Returns:
+            {'created': [...], 'replaced': [...], 'skipped': [...], 'unchanged': [...], 'diff': [...]}
+        """
+        remote_names = self._remote_taxonomies()
+        remote = self.export_taxonomies(list(remote_names.values()))
+        changes = self.diff(document, remote)
+        local_by_name = {t["display_name"]: t for t in document["taxonomies"]}
+
+        result = {'created': [], 'replaced': [], 'skipped': [], 'unchanged': [], 'diff': changes}
+
+        new = [c['display_name'] for c in changes if c['status'] == 'new']
+        changed = [c['display_name'] for c in changes if c['status'] == 'changed']
+        result['unchanged'] = [c['display_name'] for c in changes if c['status'] == 'unchanged']
+
+        if dry_run:
+            result['created'] = new
+            result[('replaced' if replace else 'skipped')] = changed
+            return result
+
+        if new:
+            response = self.serialization_client.import_taxonomies(
+                request=datacatalog_v1.ImportTaxonomiesRequest(
+                    parent=self.parent,
+                    inline_source=datacatalog_v1.InlineSource(
+                        taxonomies=[self.from_local(local_by_name[name]) for name in new]
+                    )
+                )
+            )
+            result['created'] = [t.name for t in response.taxonomies]
+
+        for name in changed:
+            if not replace:
+                print(f"⚠️ Taxonomy '{name}' differs from the document; skipped (replace=False)")
+                result['skipped'].append(name)
+                continue
+            self.serialization_client.replace_taxonomy(
+                request=datacatalog_v1.ReplaceTaxonomyRequest(
+                    name=remote_names[name],
+                    serialized_taxonomy=self.from_local(local_by_name[name])
+                )
+            )
+            result['replaced'].append(remote_names[name])
+
+        if result['created'] or result['replaced']:
+            invalidate_taxonomy_snapshot(self.parent)
+
+        print(f"[DEBUG] ✓ Taxonomy import into {self.parent}: {len(result['created'])} created, "
+              f"{len(result['replaced'])} replaced, {len(result['skipped'])} skipped, "
+              f"{len(result['unchanged'])} unchanged")
+        return result
+
+    def resolve_names(self, display_names: List[str]) -> List[str]:
+        """Display names -> resource names in this project/location"""
+        remote = self._remote_taxonomies()
+        missing = [name for name in display_names if name not in remote]
+        if missing:
+            raise ValueError(f"Taxonomies not found in {self.parent}: {', '.join(missing)}")
+        return [remote[name] for name in display_names]
+
+    def promote(self, taxonomy_names: List[str], target_project_id: str,
+                target_location: Optional[str] = None, replace: bool = False,
+                dry_run: bool = False) -> Dict:
+        """Copy taxonomies from this project/location into another one"""
+        document = self.export_taxonomies(taxonomy_names)
+        target = TaxonomyTransferService(
+            target_project_id, target_location or self.location,
+            client=self.client, serialization_client=self.serialization_client
+        )
+        return target.import_taxonomies(document, replace=replace, dry_run=dry_run)
+
+
+# ==================== CLI ====================
+
+def _print_diff(changes: List[Dict]):
+    for change in changes:
+        print(f"{change['status']:>9}  {change['display_name']}")
+        for key, sign in (('tags_added', '+'), ('tags_removed', '-'), ('tags_changed', '~')):
+            for path in change[key]:
+                print(f"{'':>11}{sign} {path}")
+
+
+def _print_import(result: Dict, dry_run: bool):
+    _print_diff(result['diff'])
+    prefix = "would be " if dry_run else ""
+    print(f"{len(result['created'])} {prefix}created, {len(result['replaced'])} {prefix}replaced, "
+          f"{len(result['skipped'])} skipped{' (use --replace)' if result['skipped'] else ''}, "
+          f"{len(result['unchanged'])} unchanged")
+
+
+def main(argv=None):
+    import argparse
+    from config import Config
+
+    parser = argparse.ArgumentParser(
+        prog='python -m services.taxonomy_transfer_service',
+        description='Export, diff, import and promote policy tag taxonomies'
+    )
+    parser.add_argument('--project', default=Config.PROJECT_ID)
+    parser.add_argument('--location', default=Config.LOCATION)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help='write taxonomies to a .json/.yaml file')
+    export_parser.add_argument('file')
+    export_parser.add_argument('--taxonomy', action='append', help='display name (repeatable); default: all')
+
+    diff_parser = commands.add_parser('diff', help='compare a file with the project')
+    diff_parser.add_argument('file')
+
+    import_parser = commands.add_parser('import', help='apply a file to the project')
+    import_parser.add_argument('file')
+    import_parser.add_argument('--replace', action='store_true', help='replace existing taxonomies that differ')
+    import_parser.add_argument('--dry-run', action='store_true')
+
+    promote_parser = commands.add_parser('promote', help='copy taxonomies into another project')
+    promote_parser.add_argument('--target-project', required=True)
+    promote_parser.add_argument('--target-location', help='default: --location')
+    promote_parser.add_argument('--taxonomy', action='append', help='display name (repeatable); default: all')
+    promote_parser.add_argument('--replace', action='store_true', help='replace existing taxonomies that differ')
+    promote_parser.add_argument('--dry-run', action='store_true')
+
+    args = parser.parse_args(argv)
+    service = TaxonomyTransferService(args.project, args.location)
+
+    if args.command == 'export':
+        names = service.resolve_names(args.taxonomy) if args.taxonomy else None
+        document = service.export_taxonomies(names)
+        service.save(document, args.file)
+        print(f"{len(document['taxonomies'])} taxonomies written to {args.file}")
+    elif args.command == 'diff':
+        _print_diff(service.diff(service.load(args.file)))
+    elif args.command == 'import':
+        result = service.import_taxonomies(service.load(args.file), replace=args.replace, dry_run=args.dry_run)
+        _print_import(result, args.dry_run)
+    else:
+        names = service.resolve_names(args.taxonomy) if args.taxonomy else None
+        result = service.promote(names, args.target_project, args.target_location,
+                                 replace=args.replace, dry_run=args.dry_run)
+        _print_import(result, args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
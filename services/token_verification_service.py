@@ -0,0 +1,181 @@
+"""
+Token Verification Service
+Google ID-token verification with cached signing certificates
+
+The Google certificate endpoint is fetched through one pooled requests
+session and kept until its Cache-Control max-age expires. Verified tokens are
+memoized until their own `exp`, so repeated verifications of the same token
+are a dict lookup and new tokens only cost the local signature check.
+
+The certificate URL is configurable (GOOGLE_CERTS_URL) so a local stand-in
+endpoint can be used in tests.
+"""
+
+from google.auth import exceptions as google_exceptions
+from google.auth import jwt
+from google.auth.transport import requests as google_requests
+from typing import Dict, Optional
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import requests
+
+GOOGLE_CERTS_URL = os.getenv('GOOGLE_CERTS_URL', 'https://www.googleapis.com/oauth2/v1/certs')
+GOOGLE_ISSUERS = ['accounts.google.com', 'https://accounts.google.com']
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+class TokenVerificationService:
+    def __init__(
+        self,
+        client_id: str,
+        certs_url: str = GOOGLE_CERTS_URL,
+        session: requests.Session = None,
+        default_certs_ttl: int = 300,
+        max_cached_tokens: int = 1024,
+        clock_skew_in_seconds: int = 0
+    ):
+        self.client_id = client_id
+        self.certs_url = certs_url
+        self.default_certs_ttl = default_certs_ttl
+        self.max_cached_tokens = max_cached_tokens
+        self.clock_skew_in_seconds = clock_skew_in_seconds
+
+        # Pooled HTTP session shared by every certificate fetch
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self._request = google_requests.Request(session=session)
+
+        self._certs = None
+        self._certs_expires_at = 0.0
+        self._certs_lock = threading.Lock()
+
+        self._tokens: Dict[str, tuple] = {}  # sha256(token) -> (exp, idinfo)
+        self._tokens_lock = threading.Lock()
+
+        self.cert_fetches = 0
+        self.token_hits = 0
+
+    # ==================== CERTIFICATES ====================
+
+    def _fetch_certs(self):
+        response = self._request(self.certs_url, method='GET', timeout=10)
+        if response.status != 200:
+            raise google_exceptions.TransportError(
+                f"Could not fetch certificates at {self.certs_url}"
+            )
+
+        ttl = self.default_certs_ttl
+        match = _MAX_AGE_RE.search(response.headers.get('cache-control', '') or '')
+        if match:
+            ttl = int(match.group(1))
+
+        self.cert_fetches += 1
+        return json.loads(response.data.decode('utf-8')), ttl
+
+    def get_certs(self, force_refresh: bool = False) -> Dict[str, str]:
+        """Return {key id: x509 cert}, re-fetched only after max-age expires"""
+        with self._certs_lock:
+            if force_refresh or self._certs is None or time.monotonic() >= self._certs_expires_at:
+                try:
+                    certs, ttl = self._fetch_certs()
+                    self._certs = certs
+                    self._certs_expires_at = time.monotonic() + ttl
+                except Exception as e:
+                    # Keep serving the previous set if the endpoint is unavailable
+                    if self._certs is None:
+                        raise
+                    print(f"[ERROR] Failed to refresh Google certificates: {e}")
+            return self._certs
+
+    # ==================== VERIFICATION ====================
+
+    @staticmethod
+    def _token_key(token) -> str:
+        if isinstance(token, str):
+            token = token.encode('utf-8')
+        return hashlib.sha256(token).hexdigest()
+
+    def _remember(self, key: str, idinfo: Dict):
+        now = time.time()
+        with self._tokens_lock:
+            if len(self._tokens) >= self.max_cached_tokens:
+                for expired in [k for k, (exp, _) in self._tokens.items() if exp <= now]:
+                    del self._tokens[expired]
+                while len(self._tokens) >= self.max_cached_tokens:
+                    del self._tokens[next(iter(self._tokens))]
+            self._tokens[key] = (idinfo.get('exp', now), idinfo)
+
+    def verify(self, token) -> Optional[Dict]:
+        """
+        Verify a Google ID token
+
+        Returns:
+            Decoded token claims, or None if the token is invalid/expired
+        """
+        key = self._token_key(token)
+
+        with self._tokens_lock:
+            entry = self._tokens.get(key)
+            if entry is not None:
+                exp, idinfo = entry
+                if exp > time.time():
+                    self.token_hits += 1
+                    return dict(idinfo)
+                del self._tokens[key]
+
+        try:
+            certs = self.get_certs()
+
+            # Unknown key id: Google rotated keys before our max-age expired
+            kid = jwt.decode_header(token).get('kid')
+            if kid and kid not in certs:
+                certs = self.get_certs(force_refresh=True)
+
+            idinfo = jwt.decode(
+                token,
+                certs=certs,
+                audience=self.client_id,
+                clock_skew_in_seconds=self.clock_skew_in_seconds
+            )
+
+            if idinfo.get('iss') not in GOOGLE_ISSUERS:
+                return None
+
+        except ValueError:
+            return None
+
+        self._remember(key, idinfo)
+        return dict(idinfo)
+
+    def stats(self) -> Dict:
+        with self._tokens_lock:
+            cached_tokens = len(self._tokens)
+        return {
+            'cert_fetches': self.cert_fetches,
+            'token_hits': self.token_hits,
+            'cached_tokens': cached_tokens,
+            'certs_expire_in': max(0.0, round(self._certs_expires_at - time.monotonic(), 1))
+        }
+
+
+_verifiers: Dict[str, TokenVerificationService] = {}
+_verifiers_lock = threading.Lock()
+
+
+def get_token_verifier(client_id: str) -> TokenVerificationService:
+    """Process-wide TokenVerificationService per OAuth client id"""
+    with _verifiers_lock:
+        verifier = _verifiers.get(client_id)
+        if verifier is None:
+            verifier = TokenVerificationService(client_id)
+            _verifiers[client_id] = verifier
+        return verifier
@@ -1114,13 +1114,21 @@ LANGUAGE_FLAGS = {
 
 
 # ============================================
-# VALIDATION ON IMPORT
+# VALIDATION (on demand - not at import)
 # ============================================
 
-_missing = validate_translations()
-if _missing:
-    import warnings
-    warnings.warn(
-        f"Missing translations detected: {_missing}",
-        UserWarning
-    )
+def warn_missing_translations() -> dict:
+    """
+    Warn about keys missing in pt/es
+    
+    Used to run at import; now called by the /health page and by
+    benchmarks/startup_imports.py so it stays off the cold-start path.
+    """
+    missing = validate_translations()
+    if missing:
+        import warnings
+        warnings.warn(
+            f"Missing translations detected: {missing}",
+            UserWarning
+        )
+    return missing